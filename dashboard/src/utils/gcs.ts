@@ -6,10 +6,51 @@ const storage = new Storage({
 
 const BUCKET_NAME = 'haratch-ocr';
 
+// Maintained by the runner (src/progress.py): one small object instead of a bucket listing
+const PROGRESS_BLOB = 'status/progress.json';
+
+type IssueStatus = { pages: number[], isComplete: boolean, totalPages: number, completedAt?: string | null };
+
+async function getComputationStatusFromIndex(): Promise<Record<string, IssueStatus>> {
+    const [content] = await storage.bucket(BUCKET_NAME).file(PROGRESS_BLOB).download();
+    const progress = JSON.parse(content.toString());
+    if (progress.version !== 1 || !progress.issues) {
+        throw new Error(`Unsupported progress index version: ${progress.version}`);
+    }
+
+    const status: Record<string, IssueStatus> = {};
+    for (const [issueId, entry] of Object.entries<any>(progress.issues)) {
+        // Pages are stored as inclusive [first, last] ranges
+        const pages: number[] = [];
+        for (const [first, last] of entry.pages) {
+            for (let page = first; page <= last; page++) {
+                pages.push(page);
+            }
+        }
+        const totalPages = entry.total || 0;
+        status[issueId] = {
+            pages,
+            totalPages,
+            isComplete: totalPages > 0 && pages.length >= totalPages,
+            completedAt: entry.completed ?? null,
+        };
+    }
+    return status;
+}
+
 export async function getComputationStatus() {
-    const [blobs] = await storage.bucket(BUCKET_NAME).getFiles();
+    try {
+        return await getComputationStatusFromIndex();
+    } catch (error) {
+        console.warn('Progress index not found or invalid, listing the bucket instead');
+        return getComputationStatusFromListing();
+    }
+}
+
+async function getComputationStatusFromListing() {
+    const [blobs] = await storage.bucket(BUCKET_NAME).getFiles({ prefix: 'ocr/' });
 
-    const status: Record<string, { pages: number[], isComplete: boolean, totalPages: number }> = {};
+    const status: Record<string, IssueStatus> = {};
     const metadataBlobs: any[] = [];
 
     blobs.forEach((blob) => {
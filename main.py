@@ -1,14 +1,22 @@
 import fire
-from src.pipeline import simple_ocr_pipeline, full_ocr_pipeline
-from src.runner import run_archive
+
+# Commands import what they need: OCR and detection workers are spawned processes
+# that re-import this module, and must not pull in torch and the layout model.
 
 
 class Cli:
-    def simple(self, year: int, month: int):
-        return simple_ocr_pipeline(year, month)
+    def simple(self, year: int, month: int, cache_images: bool = False):
+        from src.pipeline import simple_ocr_pipeline
+
+        return simple_ocr_pipeline(year, month, cache_images=cache_images)
+
+    def full(self, year: int, month: int, cache_images: bool = False):
+        from src.pipeline import full_ocr_pipeline
+        from src.translation_stage import wait_for_translations
 
-    def full(self, year: int, month: int):
-        return full_ocr_pipeline(year, month)
+        results = full_ocr_pipeline(year, month, cache_images=cache_images)
+        wait_for_translations()
+        return results
 
     def archive(
         self,
@@ -17,9 +25,183 @@ class Cli:
         end_year: int = 2009,
         end_month: int = 5,
         skip_sync: bool = False,
+        prefetch: int = 2,
+        metrics_port: int = None,
+    ):
+        """Process the entire archive month by month (--metrics_port serves live metrics locally)."""
+        from src.runner import run_archive
+
+        return run_archive(
+            start_year, start_month, end_year, end_month, skip_sync, prefetch=prefetch, metrics_port=metrics_port
+        )
+
+    def worker(
+        self,
+        start_year: int = 1925,
+        start_month: int = 8,
+        end_year: int = 2009,
+        end_month: int = 5,
+        skip_sync: bool = False,
+        worker_id: str = None,
+        lease_seconds: int = None,
+        reseed: bool = False,
+    ):
+        """Join a distributed archive run: claim issues from the shared queue until it is drained."""
+        from src.runner import run_worker
+        from src.workqueue import LEASE_SECONDS
+
+        return run_worker(
+            start_year, start_month, end_year, end_month, skip_sync,
+            worker_id=worker_id, lease_seconds=lease_seconds or LEASE_SECONDS, reseed=reseed,
+        )
+
+    def workers(
+        self,
+        count: int = 2,
+        start_year: int = 1925,
+        start_month: int = 8,
+        end_year: int = 2009,
+        end_month: int = 5,
+        skip_sync: bool = False,
+        reseed: bool = False,
+        shared_detector: bool = False,
     ):
-        """Process the entire archive month by month."""
-        return run_archive(start_year, start_month, end_year, end_month, skip_sync)
+        """Run `count` queue workers as local processes (--shared_detector: one layout model for all)."""
+        from src.runner import run_local_workers
+
+        return run_local_workers(
+            count, start_year, start_month, end_year, end_month,
+            shared_detector=shared_detector, skip_sync=skip_sync, reseed=reseed,
+        )
+
+    def detection_server(self, address: str = "127.0.0.1:7341", max_batch: int = None):
+        """
+        Serve layout detection to every pipeline on this machine; point them at it with
+        HARATCH_DETECTION_SERVER=<address>. Server and pipelines need the same
+        HARATCH_DETECTION_AUTHKEY; the server refuses to start without one.
+        """
+        from src.detection_server import serve_detection, MAX_BATCH
+
+        serve_detection(address, max_batch=max_batch or MAX_BATCH)
+
+    def queue(self):
+        """Show the shared work queue: planned, done, failed and currently leased issues."""
+        from src.gcs import get_gcs_client, BUCKET_NAME
+        from src.workqueue import WorkQueue
+
+        return WorkQueue(get_gcs_client().bucket(BUCKET_NAME)).summary()
+
+    def export_detector(self, backend: str = "onnx", int8: bool = False, images: str = None, limit: int = 8):
+        """
+        Export the layout model to a CPU runtime (onnx/openvino) and cache it next to the .pt.
+        With --images, check box/class parity against the PyTorch backend on those pages
+        (OpenVINO --int8 also calibrates on them, and requires them).
+        """
+        from pathlib import Path
+        from PIL import Image
+        from src.detector import export_model, load_detector, check_detector_parity
+        from src.pdf import make_thumbnail
+
+        artifact = export_model(backend, int8=int8, calibration_images=images)
+        if images:
+            paths = sorted(Path(images).glob("*.png"))[:limit]
+            pages = [make_thumbnail(Image.open(p)) for p in paths]
+            report = check_detector_parity(pages, load_detector("torch"), load_detector(backend, int8=int8))
+            print(f"[PARITY] {report}")
+            return report
+        return str(artifact)
+
+    def translate(self, year: int, month: int, end_year: int = None, end_month: int = None, min_length: int = 200):
+        """Backfill translations of already OCR'd issues (one issue, or a range up to end_year/end_month)."""
+        from src.runner import get_month_range
+        from src.translation_stage import backfill_translations
+
+        end_year, end_month = end_year or year, end_month or month
+        for y, m in get_month_range(year, month, end_year, end_month):
+            backfill_translations(y, m, min_length=min_length)
+
+    def reocr(
+        self,
+        year: int,
+        month: int,
+        end_year: int = None,
+        end_month: int = None,
+        lang: str = "hye-calfa-n",
+        config: str = "--psm 6",
+        skip_sync: bool = False,
+    ):
+        """
+        Re-run Tesseract (e.g. a new model or --config) on issues from their cached
+        layouts, skipping layout detection (one issue, or a range up to end_year/end_month).
+        """
+        from src.runner import get_month_range
+        from src.pipeline import reocr_pipeline
+        from src.sync_gcs import sync_all_jsons
+        from src.cleanup import cleanup_issue_data
+
+        end_year, end_month = end_year or year, end_month or month
+        results = []
+        for y, m in get_month_range(year, month, end_year, end_month):
+            try:
+                results.append(reocr_pipeline(y, m, lang=lang, config=config))
+                if not skip_sync:
+                    sync_all_jsons()
+            finally:
+                cleanup_issue_data(y, m)
+        return results
+
+    def export(self, year: int, month: int, page: int = None):
+        """
+        Export a processed issue from its compact JSONL results to the pretty
+        <issue>_complete.json, or print a single page with --page.
+        """
+        from src.paths import get_issue_id, get_output_dir
+        from src.results import export_pretty_json, read_issue_page
+
+        issue_id = get_issue_id(year, month)
+        output_dir = get_output_dir(year, month)
+        if page is not None:
+            return read_issue_page(output_dir, issue_id, page)
+        path = export_pretty_json(output_dir, issue_id)
+        print(f"[OK] Exported {issue_id} to {path}")
+        return str(path)
+
+    def benchmark(
+        self,
+        pages: int = 6,
+        seed: int = 0,
+        output: str = "data/benchmark/report.json",
+        baseline: str = "data/benchmark/baseline.json",
+        save_baseline: bool = False,
+        tolerance: float = 0.25,
+        trace: str = None,
+    ):
+        """
+        Time each stage on synthetic pages and write a JSON report. Exits non-zero if a
+        stage regressed against the baseline by more than `tolerance`.
+        """
+        import sys
+        import json
+        from pathlib import Path
+        from src.benchmark import run_benchmark, compare_to_baseline
+
+        if trace:
+            from src.tracing import enable_tracing
+            enable_tracing(trace)
+
+        report = run_benchmark(pages=pages, seed=seed, output=Path(output))
+        baseline_path = Path(baseline)
+        if save_baseline:
+            baseline_path.parent.mkdir(parents=True, exist_ok=True)
+            baseline_path.write_text(json.dumps(report, indent=2), encoding="utf-8")
+            print(f"[BENCH] Saved baseline to {baseline_path}")
+        elif baseline_path.exists():
+            regressions = compare_to_baseline(report, json.loads(baseline_path.read_text(encoding="utf-8")), tolerance)
+            for r in regressions:
+                print(f"[REGRESSION] {r['stage']} {r['metric']}: {r['baseline']} -> {r['current']}")
+            if regressions:
+                sys.exit(1)
+            print(f"[BENCH] No regressions against {baseline_path}")
 
     def reset(self):
         """Delete all files in GCS and local data to start fresh."""
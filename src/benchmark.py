@@ -0,0 +1,295 @@
+"""
+Stage-level benchmark on synthetic newspaper pages, independent of any local data.
+Pages of Armenian text are generated into a scanned-style PDF in a temporary
+directory, then each stage is timed on its own: rasterize, detect, preprocess,
+tesseract, json_write and sync (against the local storage stand-in).
+The report is JSON (throughput and p50/p95 latencies per stage) and can be
+compared with a saved baseline to flag regressions.
+"""
+import json
+import time
+import random
+import platform
+import tempfile
+import os
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+from pytesseract import TesseractNotFoundError
+
+from .pdf import PDFIUM_AVAILABLE, render_pdf_pages, convert_single_page, png_raster_page, RENDER_DPI
+from .ocr import prepare_page, binarize_region, run_tesseract, TESSERACT_BACKEND
+from .results import write_page_json
+
+REPORT_PATH = Path("data/benchmark/report.json")
+BASELINE_PATH = Path("data/benchmark/baseline.json")
+STAGES = ("rasterize", "detect", "preprocess", "tesseract", "json_write", "sync")
+PAGE_SIZE = (2480, 3508)  # A4 at 300 dpi
+ARMENIAN_LETTERS = "աբգդեզէըթժիլխծկհձղճմյնշոչպջռսվտրցւփքօֆ"
+
+
+def load_font(size: int):
+    """A font with Armenian glyphs (DejaVu ships them); Pillow's default otherwise."""
+    for name in ("DejaVuSerif.ttf", "DejaVuSans.ttf", "NotoSerifArmenian-Regular.ttf"):
+        try:
+            return ImageFont.truetype(name, size)
+        except OSError:
+            continue
+    return ImageFont.load_default(size=size)
+
+
+def random_words(rng: random.Random, count: int) -> list:
+    return ["".join(rng.choice(ARMENIAN_LETTERS) for _ in range(rng.randint(2, 9))) for _ in range(count)]
+
+
+def generate_page(rng: random.Random, columns: int = 3):
+    """
+    One synthetic page: a masthead and `columns` columns of paragraphs,
+    lightly noised like a scan. Returns (image, paragraph boxes).
+    """
+    width, height = PAGE_SIZE
+    image = Image.new("L", PAGE_SIZE, 235)
+    draw = ImageDraw.Draw(image)
+    title_font, body_font = load_font(150), load_font(34)
+
+    draw.text((width // 2, 120), "ՅԱՌԱՋ", font=title_font, fill=20, anchor="mt")
+    draw.line((120, 330, width - 120, 330), fill=20, width=6)
+
+    margin, gutter = 120, 60
+    column_width = (width - 2 * margin - (columns - 1) * gutter) // columns
+    line_height = 46
+    boxes = []
+    for column in range(columns):
+        x = margin + column * (column_width + gutter)
+        y = 380
+        while y < height - 300:
+            lines = rng.randint(4, 14)
+            top = y
+            for _ in range(lines):
+                words, line = random_words(rng, 12), ""
+                for word in words:
+                    candidate = f"{line} {word}".strip()
+                    if draw.textlength(candidate, font=body_font) > column_width:
+                        break
+                    line = candidate
+                draw.text((x, y), line, font=body_font, fill=25)
+                y += line_height
+            boxes.append((x, top, x + column_width, y))
+            y += line_height
+    noise = np.asarray(image, dtype=np.int16) + np.random.default_rng(rng.randint(0, 2**31)).normal(0, 12, image.size[::-1])
+    return Image.fromarray(np.clip(noise, 0, 255).astype(np.uint8)), boxes
+
+
+def generate_pdf(pages: int, path: Path, seed: int = 0):
+    """Write a scanned-style PDF (one image per page) and return the paragraph boxes of each page."""
+    rng = random.Random(seed)
+    images, boxes = zip(*(generate_page(rng) for _ in range(pages)))
+    images[0].save(path, save_all=True, append_images=list(images[1:]), resolution=RENDER_DPI)
+    return list(boxes)
+
+
+def summarize(latencies: list, items: int = None) -> dict:
+    """Throughput (items/s) and per-call latency percentiles of one stage."""
+    values = np.asarray(latencies, dtype=np.float64)
+    total = float(values.sum())
+    items = len(latencies) if items is None else items
+    return {
+        "n": len(latencies),
+        "items": items,
+        "total_s": round(total, 4),
+        "throughput_per_s": round(items / total, 3) if total > 0 else None,
+        "p50_ms": round(float(np.percentile(values, 50)) * 1000, 3),
+        "p95_ms": round(float(np.percentile(values, 95)) * 1000, 3),
+        "mean_ms": round(float(values.mean()) * 1000, 3),
+    }
+
+
+def _timed(fn, *args, **kwargs):
+    started = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - started
+
+
+def bench_rasterize(pdf_path: Path, workdir: Path):
+    """Per page: thumbnail + full-resolution decode (pdfium), or one pdftoppm call."""
+    latencies, pages = [], []
+    if PDFIUM_AVAILABLE:
+        stream = render_pdf_pages(pdf_path, workdir / "images")
+        while True:
+            started = time.perf_counter()
+            raster = next(stream, None)
+            if raster is None:
+                break
+            image = raster.load()
+            latencies.append(time.perf_counter() - started)
+            pages.append((raster, image))
+        return summarize(latencies), pages
+
+    from .pdf import get_pdf_page_count
+
+    (workdir / "images").mkdir(parents=True, exist_ok=True)
+    for i in range(get_pdf_page_count(pdf_path)):
+        page_path, seconds = _timed(convert_single_page, pdf_path, workdir / "images" / f"page_{i}.png", i + 1)
+        if page_path is None:
+            raise RuntimeError("pdftoppm failed")
+        latencies.append(seconds)
+        raster = png_raster_page(page_path)
+        pages.append((raster, raster.load()))
+    return summarize(latencies), pages
+
+
+def bench_detect(rasters: list, batch_size: int = 8):
+    """Per batch of thumbnails through the configured layout detector (model load excluded)."""
+    from .detector import get_layout_model
+    from .extract import batch_yolo_detect
+
+    model = get_layout_model()
+    latencies = []
+    for start in range(0, len(rasters), batch_size):
+        batch = rasters[start:start + batch_size]
+        _, seconds = _timed(batch_yolo_detect, batch, model)
+        latencies.append(seconds)
+    return summarize(latencies, items=len(rasters)), None
+
+
+def bench_preprocess(pages: list, boxes: list):
+    """Per paragraph: binarize_region on a page prepared once (prepare_page is included once per page)."""
+    latencies, crops = [], []
+    for (_, image), page_boxes in zip(pages, boxes):
+        gray, prepare_s = _timed(prepare_page, image)
+        for i, bbox in enumerate(page_boxes):
+            crop, seconds = _timed(binarize_region, gray, bbox)
+            latencies.append(seconds + (prepare_s if i == 0 else 0.0))
+            crops.append(crop)
+    return summarize(latencies), crops
+
+
+def bench_tesseract(crops: list, limit: int = 40):
+    """Per paragraph through run_tesseract with the configured backend."""
+    latencies = []
+    for crop in crops[:limit]:
+        _, seconds = _timed(run_tesseract, crop)
+        latencies.append(seconds)
+    return summarize(latencies), None
+
+
+def bench_json_write(boxes: list, workdir: Path):
+    """Per page: durable compact page JSON write (synthetic text of realistic size)."""
+    rng = random.Random(1)
+    latencies, paths = [], []
+    out_dir = workdir / "generated" / "ocr" / "1925-08"
+    for i, page_boxes in enumerate(boxes):
+        json_data = {
+            "metadata": {"width": PAGE_SIZE[0], "height": PAGE_SIZE[1]},
+            "paragraphs": [{"bbox": list(bbox), "hye": " ".join(random_words(rng, 120))} for bbox in page_boxes],
+        }
+        path = out_dir / f"page_{i}.json"
+        _, seconds = _timed(write_page_json, json_data, path, durable=True)
+        latencies.append(seconds)
+        paths.append(path)
+    return summarize(latencies), paths
+
+
+def bench_sync(paths: list, workdir: Path):
+    """Per file: journal check + upload to a filesystem-backed fake bucket."""
+    from .local_storage import LocalClient
+    from .sync_gcs import SyncJournal, _upload_if_changed
+
+    bucket = LocalClient(workdir / "store").create_bucket("haratch-ocr")
+    journal = SyncJournal(workdir / "sync_journal.jsonl", workdir / "sync_pending.txt")
+    latencies = []
+    for path in paths:
+        _, seconds = _timed(_upload_if_changed, bucket, journal, path, f"ocr/1925-08/{path.name}")
+        latencies.append(seconds)
+    return summarize(latencies), None
+
+
+def _environment() -> dict:
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "renderer": "pdfium" if PDFIUM_AVAILABLE else "pdftoppm",
+        "tesseract_backend": TESSERACT_BACKEND,
+    }
+
+
+def run_benchmark(pages: int = 6, seed: int = 0, stages=STAGES, output: Path = REPORT_PATH) -> dict:
+    """Run every requested stage on freshly generated pages and write the JSON report."""
+    report = {
+        "created": datetime.now().isoformat(),
+        "config": {"pages": pages, "seed": seed},
+        "environment": _environment(),
+        "stages": {},
+    }
+    results = report["stages"]
+
+    def run(name, fn, *args):
+        """
+        Run a stage (fn returns (summary, output)); missing dependencies mark it skipped.
+        Any other error is a real failure and propagates.
+        """
+        if name not in stages:
+            return None
+        try:
+            summary, output = fn(*args)
+        except (ImportError, TesseractNotFoundError) as e:
+            results[name] = {"skipped": f"{type(e).__name__}: {e}"}
+            print(f"[BENCH] {name}: skipped ({results[name]['skipped']})")
+            return None
+        results[name] = summary
+        print(f"[BENCH] {name}: p50 {summary['p50_ms']:.1f}ms, p95 {summary['p95_ms']:.1f}ms, {summary['throughput_per_s']}/s")
+        return output
+
+    with tempfile.TemporaryDirectory(prefix="haratch-bench-") as tmp:
+        workdir = Path(tmp)
+        pdf_path = workdir / "synthetic.pdf"
+        print(f"[BENCH] Generating {pages} synthetic pages...")
+        boxes = generate_pdf(pages, pdf_path, seed=seed)
+
+        rendered = run("rasterize", bench_rasterize, pdf_path, workdir)
+        if rendered is None:
+            # Later stages still need pages even when rasterization is not measured
+            _, rendered = bench_rasterize(pdf_path, workdir)
+        run("detect", bench_detect, [raster for raster, _ in rendered])
+        crops = run("preprocess", bench_preprocess, rendered, boxes)
+        if crops is not None:
+            run("tesseract", bench_tesseract, crops)
+        paths = run("json_write", bench_json_write, boxes, workdir)
+        if paths is not None:
+            run("sync", bench_sync, paths, workdir)
+
+    if output:
+        output = Path(output)
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"[BENCH] Report written to {output}")
+    return report
+
+
+def compare_to_baseline(report: dict, baseline: dict, tolerance: float = 0.25) -> list:
+    """
+    Stages that got slower than the baseline by more than `tolerance`: p95 latency
+    above baseline * (1 + tolerance) or throughput below baseline * (1 - tolerance).
+    A stage measured in the baseline but now skipped or missing counts as regressed.
+    """
+    regressions = []
+    for name, base in baseline.get("stages", {}).items():
+        if "p95_ms" not in base:
+            continue
+        current = report["stages"].get(name)
+        if not current or "p95_ms" not in current:
+            status = current.get("skipped", "skipped") if current else "missing"
+            regressions.append({"stage": name, "metric": "p95_ms", "baseline": base["p95_ms"], "current": status})
+            continue
+        if current["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+            regressions.append({"stage": name, "metric": "p95_ms", "baseline": base["p95_ms"], "current": current["p95_ms"]})
+        if base.get("throughput_per_s") and current.get("throughput_per_s") is not None:
+            if current["throughput_per_s"] < base["throughput_per_s"] * (1 - tolerance):
+                regressions.append({
+                    "stage": name, "metric": "throughput_per_s",
+                    "baseline": base["throughput_per_s"], "current": current["throughput_per_s"],
+                })
+    return regressions
@@ -1,18 +1,167 @@
+import os
+import time
 import shutil
+import threading
 from pathlib import Path
 
 from .paths import get_issue_id, get_pdf_path, get_image_dir
 
-def cleanup_issue_data(year: int, month: int):
+DATA_DIR = Path("data")
+DISK_LIMIT_MB = float(os.environ.get("HARATCH_DISK_LIMIT_MB", "1000"))
+# Longest a stage waits for evictions before going over budget anyway
+THROTTLE_TIMEOUT = 300.0
+
+
+class DiskBudget:
     """
-    Delete local generated images AND the source PDF for a specific issue.
-    Keep only the JSONs in data/generated/ocr and data/output.
+    Running total of the bytes under data/, kept up to date by the code that writes
+    and deletes files instead of walking the tree. The folder is scanned once on
+    first use (and on resync()). Files registered as evictable (page PNGs) are the
+    ones in-flight work will free, so producers wait for them when over budget.
     """
+
+    def __init__(self, data_dir: Path = DATA_DIR, limit_mb: float = DISK_LIMIT_MB):
+        self.data_dir = data_dir
+        self.limit_mb = limit_mb
+        self._root = os.path.abspath(data_dir)
+        self._sizes = {}
+        self._evictable = set()
+        self._used = 0
+        self._cond = threading.Condition()
+        self.resync()
+
+    def _key(self, path):
+        key = os.path.abspath(path)
+        if key != self._root and not key.startswith(self._root + os.sep):
+            return None  # Outside data/, not part of the budget
+        return key
+
+    def resync(self):
+        """Rebuild the totals from a full scan of the data folder."""
+        sizes = {}
+        if self.data_dir.exists():
+            for f in self.data_dir.rglob("*"):
+                try:
+                    if f.is_file():
+                        sizes[os.path.abspath(f)] = f.stat().st_size
+                except OSError:
+                    continue
+        with self._cond:
+            self._sizes = sizes
+            self._evictable &= sizes.keys()
+            self._used = sum(sizes.values())
+            self._cond.notify_all()
+
+    def record_write(self, path: Path, evictable: bool = False):
+        """Account for a file that was just created or rewritten."""
+        key = self._key(path)
+        if key is None:
+            return
+        try:
+            size = os.stat(key).st_size
+        except OSError:
+            return self.record_delete(path)
+        with self._cond:
+            self._used += size - self._sizes.get(key, 0)
+            self._sizes[key] = size
+            if evictable:
+                self._evictable.add(key)
+
+    def record_bytes(self, path: Path, nbytes: int):
+        """Account for bytes appended to a file (e.g. a download in progress)."""
+        key = self._key(path)
+        if key is None:
+            return
+        with self._cond:
+            self._sizes[key] = self._sizes.get(key, 0) + nbytes
+            self._used += nbytes
+
+    def record_move(self, src: Path, dst: Path):
+        src_key, dst_key = self._key(src), self._key(dst)
+        with self._cond:
+            size = self._sizes.pop(src_key, 0)
+            self._used -= self._sizes.pop(dst_key, 0)
+            if dst_key is None:
+                self._used -= size
+            else:
+                self._sizes[dst_key] = size
+            self._cond.notify_all()
+
+    def record_delete(self, path: Path):
+        key = self._key(path)
+        with self._cond:
+            self._used -= self._sizes.pop(key, 0)
+            self._evictable.discard(key)
+            self._cond.notify_all()
+
+    def record_tree_delete(self, directory: Path):
+        prefix = self._key(directory)
+        if prefix is None:
+            return
+        with self._cond:
+            for key in [k for k in self._sizes if k.startswith(prefix + os.sep)]:
+                self._used -= self._sizes.pop(key)
+                self._evictable.discard(key)
+            self._cond.notify_all()
+
+    def remove(self, path: Path) -> bool:
+        """Delete a file and release its bytes. Returns False if it was already gone."""
+        try:
+            Path(path).unlink()
+        except FileNotFoundError:
+            return False
+        finally:
+            self.record_delete(path)
+        return True
+
+    def used_mb(self) -> float:
+        with self._cond:
+            return max(self._used, 0) / (1024 * 1024)
+
+    def over_budget(self) -> bool:
+        return self.used_mb() >= self.limit_mb
+
+    def wait_for_space(self, timeout: float = THROTTLE_TIMEOUT) -> bool:
+        """
+        Block while data/ is over budget and in-flight pages still have PNGs to evict.
+        Returns False if it gave up after `timeout` seconds; callers then proceed anyway
+        rather than stall the issue on space they cannot free themselves.
+        """
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self._used / (1024 * 1024) >= self.limit_mb and self._evictable:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    print(f"[WARNING] Disk budget ({self.limit_mb}MB) still exceeded after {timeout:.0f}s, continuing.")
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+
+_budget = None
+_budget_lock = threading.Lock()
+
+
+def get_disk_budget() -> DiskBudget:
+    """Process-wide disk accounting for data/ (scans the folder on first use)."""
+    global _budget
+    with _budget_lock:
+        if _budget is None:
+            _budget = DiskBudget()
+        return _budget
+
+
+def evict_page_image(page_path: Path):
+    """Drop a rasterized page once its OCR JSON is on disk; it is never read again."""
+    page_path = Path(page_path)
+    if page_path.suffix == ".png" and get_disk_budget().remove(page_path):
+        print(f"[CLEANUP] Evicted {page_path.name}")
+
+
+def cleanup_issue_images(year: int, month: int):
+    """Delete the local generated images of one issue."""
     issue_id = get_issue_id(year, month)
     image_dir = get_image_dir(year, month)
-    pdf_path = get_pdf_path(year, month)
-    
-    # 1. Cleanup images
     if image_dir.exists():
         print(f"[CLEANUP] Removing local images in {image_dir}...")
         try:
@@ -20,19 +169,32 @@ def cleanup_issue_data(year: int, month: int):
             print(f"[OK] Cleaned up {issue_id} images.")
         except Exception as e:
             print(f"[ERROR] Failed to cleanup {issue_id} images: {e}")
+        get_disk_budget().record_tree_delete(image_dir)
+
+
+def cleanup_issue_data(year: int, month: int):
+    """
+    Delete local generated images AND the source PDF for a specific issue.
+    Keep only the JSONs in data/generated/ocr and data/output.
+    """
+    issue_id = get_issue_id(year, month)
+    pdf_path = get_pdf_path(year, month)
+    
+    # 1. Cleanup images
+    cleanup_issue_images(year, month)
     
     # 2. Cleanup PDF
     if pdf_path.exists():
         print(f"[CLEANUP] Removing local PDF {pdf_path}...")
         try:
-            pdf_path.unlink()
+            get_disk_budget().remove(pdf_path)
             print(f"[OK] Cleaned up {issue_id} PDF.")
         except Exception as e:
             print(f"[ERROR] Failed to cleanup {issue_id} PDF: {e}")
 
 def cleanup_all_images():
     """Wipe out the entire data/generated/images folder to reclaim space."""
-    image_root = Path("data") / "generated" / "images"
+    image_root = DATA_DIR / "generated" / "images"
     if image_root.exists():
         print(f"[CLEANUP] Purging ALL legacy images in {image_root}...")
         try:
@@ -41,23 +203,33 @@ def cleanup_all_images():
             print("[OK] Global image cleanup complete.")
         except Exception as e:
             print(f"[ERROR] Global image cleanup failed: {e}")
+        get_disk_budget().record_tree_delete(image_root)
 
 def get_data_folder_size_mb():
-    """Calculate the total size of the data/ folder in MB."""
-    data_dir = Path("data")
-    if not data_dir.exists():
-        return 0
-    total_size = sum(f.stat().st_size for f in data_dir.rglob('*') if f.is_file())
-    return total_size / (1024 * 1024)
-
-def enforce_disk_limit(limit_mb=1000):
+    """Size of the data/ folder in MB, from the incremental disk accounting."""
+    return get_disk_budget().used_mb()
+
+def enforce_disk_limit(limit_mb=DISK_LIMIT_MB, issue=None):
     """
-    Ensure the data/ folder is below the specified limit.
-    If not, this logs a warning. Note: The actual deletion happens
-    per issue in cleanup_issue_data to minimize peak usage.
+    Ensure the data/ folder is below the specified limit between issues.
+    Leftover page images are the only thing safe to drop at that point, so they
+    are purged when over the limit; returns False if that was not enough.
+    With `issue` ((year, month)), for workers sharing data/ with other processes,
+    the totals are rescanned (they include the other workers' files) and only the
+    images of that issue are purged, since the others may still be in use.
     """
+    if issue is not None:
+        get_disk_budget().resync()
     size = get_data_folder_size_mb()
     if size > limit_mb:
-        print(f"[WARNING] Data folder size ({size:.1f}MB) exceeds limit ({limit_mb}MB)!")
-        return False
+        if issue is None:
+            print(f"[WARNING] Data folder size ({size:.1f}MB) exceeds limit ({limit_mb}MB), purging page images...")
+            cleanup_all_images()
+        else:
+            print(f"[WARNING] Data folder size ({size:.1f}MB) exceeds limit ({limit_mb}MB), purging {get_issue_id(*issue)} images...")
+            cleanup_issue_images(*issue)
+        size = get_data_folder_size_mb()
+        if size > limit_mb:
+            print(f"[WARNING] Data folder is still {size:.1f}MB after purging images!")
+            return False
     return True
@@ -0,0 +1,294 @@
+"""
+Shared layout detection for several pipelines on one machine. A server process owns
+the only copy of the model; pipelines (threads or processes, e.g. `main.py workers`)
+send page thumbnails through shared memory and get boxes/classes/scores back. Requests
+from all clients go into one queue, so batches mix pages of different issues.
+Set HARATCH_DETECTION_SERVER=<host:port or socket path> to make get_layout_model
+callers in the pipeline use the server instead of loading their own model.
+Connections are authenticated with HARATCH_DETECTION_AUTHKEY, which server and
+clients must share; start_detection_server generates a fresh one for its children.
+"""
+import os
+import time
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from multiprocessing import get_context, shared_memory
+from multiprocessing.connection import Listener, Client
+from queue import Queue
+
+import numpy as np
+
+from .ocr_stage import SharedPage
+from .tracing import span
+
+SERVER_ENV = "HARATCH_DETECTION_SERVER"
+AUTHKEY_ENV = "HARATCH_DETECTION_AUTHKEY"
+DEFAULT_ADDRESS = "127.0.0.1:7341"
+MAX_BATCH = int(os.environ.get("HARATCH_DETECTION_BATCH", 16))
+# How long the first page of a batch waits for pages of other clients
+BATCH_WAIT = float(os.environ.get("HARATCH_DETECTION_WAIT_MS", 50)) / 1000
+# Longest a client waits for an answer before failing the request
+REQUEST_TIMEOUT = float(os.environ.get("HARATCH_DETECTION_TIMEOUT", 300))
+
+
+def get_authkey() -> bytes:
+    """The shared connection key; there is no default, since anyone who knows it can send the server requests."""
+    key = os.environ.get(AUTHKEY_ENV)
+    if not key:
+        raise RuntimeError(f"{AUTHKEY_ENV} is not set; use the same secret for the detection server and its clients")
+    return key.encode()
+
+
+def parse_address(address: str):
+    """"host:port" -> (host, port); anything else is a Unix socket path."""
+    host, sep, port = address.rpartition(":")
+    if sep and port.isdigit() and "/" not in address:
+        return host or "127.0.0.1", int(port)
+    return address
+
+
+class DetectionServer:
+    """Runs in the server process: one thread per client, one batching thread on the model."""
+
+    def __init__(self, address: str, max_batch: int = MAX_BATCH, batch_wait: float = BATCH_WAIT, authkey: bytes = None):
+        self.address = parse_address(address)
+        self.authkey = authkey or get_authkey()
+        self.max_batch = max_batch
+        self.batch_wait = batch_wait
+        self.stats = {"batches": 0, "pages": 0, "connections": 0, "max_batch": 0}
+        self._requests = Queue()
+
+    def _read_page(self, ref) -> np.ndarray:
+        name, shape, dtype = ref
+        shm = shared_memory.SharedMemory(name=name)
+        try:
+            # Copied out so the segment is released before the client hears back
+            return np.array(np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf))
+        finally:
+            shm.close()
+
+    def _serve_client(self, conn):
+        send_lock = threading.Lock()
+        self.stats["connections"] += 1
+
+        def reply(message):
+            with send_lock:
+                conn.send(message)
+
+        try:
+            while True:
+                message = conn.recv()
+                kind, request_id = message[0], message[1]
+                if kind == "detect":
+                    _, _, ref, conf, iou = message
+                    try:
+                        image = self._read_page(ref)
+                    except Exception as e:
+                        reply((request_id, None, f"{type(e).__name__}: {e}"))
+                        continue
+                    self._requests.put((image, conf, iou, request_id, reply))
+                elif kind == "stats":
+                    reply((request_id, dict(self.stats), None))
+        except (EOFError, ConnectionResetError, BrokenPipeError):
+            pass
+        finally:
+            conn.close()
+
+    def _run_batches(self, model):
+        from .pipeline import collect_batch
+
+        while True:
+            batch, finished = collect_batch(self._requests, self.max_batch, self.batch_wait)
+            if batch:
+                # One predict() per confidence threshold; the pipeline always uses one
+                groups = {}
+                for item in batch:
+                    groups.setdefault(item[1], []).append(item)
+                for conf, items in groups.items():
+                    try:
+                        replies = self._detect_group(model, conf, items)
+                    except Exception as e:
+                        # Answer every page of the group so no client waits on it, and keep serving
+                        print(f"[ERROR] Detection of {len(items)} pages failed: {e}")
+                        error = f"{type(e).__name__}: {e}"
+                        replies = [(reply, (request_id, None, error)) for _, _, _, request_id, reply in items]
+                    for reply, message in replies:
+                        try:
+                            reply(message)
+                        except (OSError, EOFError):
+                            pass  # Client went away
+            if finished:
+                return
+
+    def _detect_group(self, model, conf, items):
+        """(reply, message) for each request of one confidence threshold."""
+        import torch
+        from PIL import Image
+        from torchvision.ops import nms
+        from .detector import DEVICE, IMGSZ
+
+        with span("detection_server.batch", pages=len(items)), torch.no_grad():
+            results = model.predict(
+                [Image.fromarray(item[0]) for item in items],
+                imgsz=IMGSZ,
+                conf=conf,
+                device=DEVICE,
+                half=(DEVICE != "cpu"),
+                verbose=False,
+            )
+            replies = []
+            for (_, _, iou, request_id, reply), det_page in zip(items, results):
+                boxes, classes, scores = det_page.boxes.xyxy, det_page.boxes.cls, det_page.boxes.conf
+                keep = nms(torch.Tensor(boxes), torch.Tensor(scores), iou)
+                detection = tuple(t[keep].cpu().numpy() for t in (boxes, classes, scores))
+                replies.append((reply, (request_id, detection, None)))
+        if len(replies) != len(items):
+            raise RuntimeError(f"model returned {len(replies)} results for {len(items)} pages")
+        self.stats["batches"] += 1
+        self.stats["pages"] += len(items)
+        self.stats["max_batch"] = max(self.stats["max_batch"], len(items))
+        return replies
+
+    def serve_forever(self):
+        from .detector import get_layout_model
+
+        model = get_layout_model()
+        threading.Thread(target=self._run_batches, args=(model,), name="detect-batches", daemon=True).start()
+        with Listener(self.address, authkey=self.authkey) as listener:
+            print(f"[DETECT] Detection server listening on {self.address} (batch <= {self.max_batch})")
+            while True:
+                conn = listener.accept()
+                threading.Thread(target=self._serve_client, args=(conn,), name="detect-client", daemon=True).start()
+
+
+def serve_detection(
+    address: str = DEFAULT_ADDRESS, max_batch: int = MAX_BATCH, batch_wait: float = BATCH_WAIT, authkey: bytes = None
+):
+    DetectionServer(address, max_batch=max_batch, batch_wait=batch_wait, authkey=authkey).serve_forever()
+
+
+class DetectionClient:
+    """
+    Connection to a detection server, shared by all threads of a process.
+    detect() sends every page as its own request so the server can batch them
+    with pages of other pipelines.
+    """
+
+    def __init__(self, address: str, timeout: float = REQUEST_TIMEOUT, authkey: bytes = None):
+        self.address = address
+        self.timeout = timeout
+        self._conn = Client(parse_address(address), authkey=authkey or get_authkey())
+        self._send_lock = threading.Lock()
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+        self._next_id = 0
+        self._receiver = threading.Thread(target=self._receive, name="detect-receiver", daemon=True)
+        self._receiver.start()
+
+    def _receive(self):
+        try:
+            while True:
+                request_id, result, error = self._conn.recv()
+                with self._pending_lock:
+                    future = self._pending.pop(request_id, None)
+                if future is None:
+                    continue
+                if error is not None:
+                    future.set_exception(RuntimeError(f"Detection server: {error}"))
+                else:
+                    future.set_result(result)
+        except (EOFError, OSError):
+            with self._pending_lock:
+                pending, self._pending = self._pending, {}
+            for future in pending.values():
+                future.set_exception(ConnectionError("Detection server connection closed"))
+
+    def _request(self, *message):
+        """(request_id, future) of a message sent to the server."""
+        future = Future()
+        with self._pending_lock:
+            request_id = self._next_id
+            self._next_id += 1
+            self._pending[request_id] = future
+        with self._send_lock:
+            self._conn.send((message[0], request_id, *message[1:]))
+        return request_id, future
+
+    def _result(self, request_id: int, future: Future, deadline: float):
+        """The answer to a request, or TimeoutError once `deadline` (monotonic) has passed."""
+        try:
+            return future.result(timeout=max(0.0, deadline - time.monotonic()))
+        except FutureTimeoutError:
+            with self._pending_lock:
+                self._pending.pop(request_id, None)
+            raise TimeoutError(f"Detection server at {self.address} did not answer within {self.timeout:.0f}s")
+
+    def detect(self, images, conf_thres=0.25, iou_thres=0.45):
+        """(boxes [N, 4], classes [N], scores [N]) NumPy arrays per PIL image, NMS already applied."""
+        shared = [SharedPage(np.asarray(image.convert("RGB"))) for image in images]
+        try:
+            requests = [self._request("detect", page.ref, conf_thres, iou_thres) for page in shared]
+            deadline = time.monotonic() + self.timeout
+            try:
+                return [self._result(request_id, future, deadline) for request_id, future in requests]
+            finally:
+                # Drop requests left unanswered so late replies are ignored
+                with self._pending_lock:
+                    for request_id, _ in requests:
+                        self._pending.pop(request_id, None)
+        finally:
+            for page in shared:
+                page.close()
+
+    def server_stats(self) -> dict:
+        return self._result(*self._request("stats"), time.monotonic() + self.timeout)
+
+    def close(self):
+        self._conn.close()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_detection_client():
+    """The process-wide client if HARATCH_DETECTION_SERVER is set, else None."""
+    global _client
+    address = os.environ.get(SERVER_ENV)
+    if not address:
+        return None
+    with _client_lock:
+        if _client is None:
+            _client = DetectionClient(address)
+            print(f"[INIT] Using the shared detection server at {address}")
+        return _client
+
+
+def start_detection_server(address: str = DEFAULT_ADDRESS, timeout: float = 600.0):
+    """
+    Start the server in its own process and wait until it accepts connections
+    (the model is loaded by then). Child processes started afterwards use it,
+    with a key generated here for this server only.
+    """
+    authkey = os.urandom(32).hex()
+    process = get_context("spawn").Process(
+        target=serve_detection,
+        args=(address,),
+        kwargs={"authkey": authkey.encode()},
+        name="detection-server",
+        daemon=True,
+    )
+    process.start()
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            Client(parse_address(address), authkey=authkey.encode()).close()
+            break
+        except (ConnectionRefusedError, FileNotFoundError):
+            if not process.is_alive() or time.monotonic() > deadline:
+                process.terminate()
+                raise RuntimeError(f"Detection server did not start on {address}")
+            time.sleep(0.5)
+    os.environ[AUTHKEY_ENV] = authkey
+    os.environ[SERVER_ENV] = address
+    return process
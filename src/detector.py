@@ -0,0 +1,236 @@
+import os
+import json
+import time
+import shutil
+import threading
+from pathlib import Path
+
+import torch
+from doclayout_yolo import YOLOv10
+from torchvision.ops import nms, box_iou
+
+MODEL_PATH = Path(
+    "models/DocLayout-YOLO-DocStructBench/doclayout_yolo_docstructbench_imgsz1024.pt"
+)
+IMGSZ = 1024
+
+DEVICE = (
+    "cuda"
+    if torch.cuda.is_available()
+    else "mps" if torch.backends.mps.is_available() else "cpu"
+)
+
+# "torch" runs the .pt checkpoint eagerly; "onnx" / "openvino" run an exported
+# CPU artifact cached next to it (optionally INT8-quantized).
+DETECTOR_BACKEND = os.environ.get("HARATCH_DETECTOR_BACKEND", "torch")
+DETECTOR_INT8 = os.environ.get("HARATCH_DETECTOR_INT8", "0") == "1"
+BACKENDS = ("torch", "onnx", "openvino")
+CALIBRATION_PAGES = 64  # Page renders used to calibrate OpenVINO INT8 activations
+
+
+def get_exported_model_path(backend: str, int8: bool = False, model_path: Path = MODEL_PATH) -> Path:
+    """Where the exported artifact for a backend lives (next to the .pt checkpoint)."""
+    suffix = "_int8" if int8 else ""
+    if backend == "onnx":
+        return model_path.with_name(f"{model_path.stem}{suffix}.onnx")
+    if backend == "openvino":
+        return model_path.with_name(f"{model_path.stem}{suffix}_openvino_model")
+    raise ValueError(f"No exported artifact for backend {backend!r}")
+
+
+def build_calibration_data(images, names, out_dir: Path, limit: int = CALIBRATION_PAGES) -> Path:
+    """
+    Dataset YAML over detector-sized thumbnails of sample page renders (PNGs in
+    `images`), for INT8 calibration on newspaper pages. Unlabeled: calibration
+    only looks at activations.
+    """
+    from PIL import Image
+    from .pdf import make_thumbnail
+
+    paths = sorted(Path(images).glob("*.png"))[:limit]
+    if not paths:
+        raise ValueError(f"No page PNGs in {images} to calibrate on")
+    shutil.rmtree(out_dir, ignore_errors=True)  # Only this export's pages
+    image_dir = out_dir / "images" / "val"
+    image_dir.mkdir(parents=True, exist_ok=True)
+    for path in paths:
+        with Image.open(path) as page:
+            make_thumbnail(page).save(image_dir / path.name)
+    data = {
+        "path": str(out_dir.resolve()),
+        "train": "images/val",
+        "val": "images/val",
+        "names": [names[i] for i in sorted(names)],
+    }
+    data_path = out_dir / "data.yaml"
+    data_path.write_text(json.dumps(data, indent=2), encoding="utf-8")  # JSON is valid YAML
+    return data_path
+
+
+def export_model(backend: str, int8: bool = False, model_path: Path = MODEL_PATH, calibration_images=None) -> Path:
+    """
+    Export the checkpoint to an optimized CPU runtime format once and cache it.
+    Returns the cached artifact path (a .onnx file or an OpenVINO model directory).
+    OpenVINO INT8 needs `calibration_images`, a folder of page renders.
+    """
+    target = get_exported_model_path(backend, int8, model_path)
+    if target.exists():
+        return target
+    if backend == "openvino" and int8 and not calibration_images:
+        # Without data= ultralytics calibrates on (and downloads) COCO, the wrong domain for page layouts
+        raise ValueError(
+            "OpenVINO INT8 export needs sample pages to calibrate on: "
+            "run `main.py export_detector --backend openvino --int8 --images <folder of page PNGs>`"
+        )
+
+    print(f"[EXPORT] Exporting {model_path.name} to {backend}{' (INT8)' if int8 else ''}...")
+    model = YOLOv10(str(model_path))
+    if backend == "onnx":
+        exported = Path(model.export(format="onnx", imgsz=IMGSZ, dynamic=True, simplify=True))
+        if int8:
+            # Dynamic quantization needs no calibration data: weights INT8, activations at runtime.
+            from onnxruntime.quantization import quantize_dynamic, QuantType
+
+            quantize_dynamic(str(exported), str(target), weight_type=QuantType.QUInt8)
+        elif exported != target:
+            exported.rename(target)
+    elif backend == "openvino":
+        kwargs = {}
+        if int8:
+            calibration_dir = model_path.with_name(f"{model_path.stem}_calibration")
+            kwargs["data"] = str(build_calibration_data(calibration_images, model.names, calibration_dir))
+        exported = Path(model.export(format="openvino", imgsz=IMGSZ, dynamic=True, int8=int8, **kwargs))
+        if exported != target:
+            exported.rename(target)
+    else:
+        raise ValueError(f"Unknown detector backend {backend!r}, expected one of {BACKENDS}")
+
+    print(f"[EXPORT] Cached {backend} model at {target}")
+    return target
+
+
+class LayoutDetector:
+    """
+    A DocLayout-YOLO model bound to a runtime backend.
+    predict() takes the same arguments and returns the same Results objects as
+    YOLOv10.predict, so callers do not need to know which backend is in use.
+    """
+
+    def __init__(self, model, backend: str = "torch"):
+        self.model = model
+        self.backend = backend
+        self.timings = {}  # filled by the registry: load_s, warmup_s
+
+    def predict(self, source, **kwargs):
+        if self.backend != "torch":
+            # Exported artifacts are CPU-only and fp32/INT8.
+            kwargs["device"] = "cpu"
+            kwargs["half"] = False
+        return self.model.predict(source, **kwargs)
+
+
+def load_detector(backend: str = DETECTOR_BACKEND, int8: bool = DETECTOR_INT8, model_path: Path = MODEL_PATH) -> LayoutDetector:
+    """Load the layout model for a backend, exporting it first if needed."""
+    if backend == "torch":
+        return LayoutDetector(YOLOv10(str(model_path)).to(DEVICE), backend)
+    artifact = export_model(backend, int8=int8, model_path=model_path)
+    return LayoutDetector(YOLOv10(str(artifact), task="detect"), backend)
+
+
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+def warm_up(detector: LayoutDetector):
+    """Run one inference on a blank page so lazy init and kernel selection happen up front."""
+    from PIL import Image
+
+    blank = Image.new("RGB", (IMGSZ, IMGSZ), "white")
+    with torch.no_grad():
+        detector.predict(blank, imgsz=IMGSZ, device=DEVICE, half=(DEVICE != "cpu"), verbose=False)
+
+
+def get_layout_model(backend: str = DETECTOR_BACKEND, int8: bool = DETECTOR_INT8) -> LayoutDetector:
+    """
+    Process-wide layout model registry: the model for a backend is loaded and
+    warmed up once, then the same instance is handed to every pipeline entry point.
+    """
+    key = (backend, int8)
+    with _registry_lock:
+        detector = _registry.get(key)
+        if detector is None:
+            started = time.perf_counter()
+            detector = load_detector(backend, int8=int8)
+            loaded = time.perf_counter()
+            warm_up(detector)
+            warmed = time.perf_counter()
+            detector.timings = {
+                "load_s": round(loaded - started, 3),
+                "warmup_s": round(warmed - loaded, 3),
+            }
+            print(
+                f"[INIT] Layout model ({backend}{', int8' if int8 else ''}) on {DEVICE}: "
+                f"loaded in {detector.timings['load_s']:.2f}s, warm-up {detector.timings['warmup_s']:.2f}s"
+            )
+            _registry[key] = detector
+        return detector
+
+
+def get_detector_version(backend: str = DETECTOR_BACKEND, int8: bool = DETECTOR_INT8) -> str:
+    """Identifies the detections a model produces: checkpoint, runtime backend and input size."""
+    return f"{MODEL_PATH.stem}:{backend}{'-int8' if int8 else ''}:imgsz{IMGSZ}"
+
+
+def get_model_timings() -> dict:
+    """Load/warm-up timings of every model loaded in this process, keyed by backend."""
+    with _registry_lock:
+        return {
+            f"{backend}{'-int8' if int8 else ''}": dict(detector.timings)
+            for (backend, int8), detector in _registry.items()
+        }
+
+
+def _detect(model, images, conf_thres, iou_thres):
+    """Boxes and classes per image, filtered with the same NMS as the pipeline."""
+    with torch.no_grad():
+        results = model.predict(images, imgsz=IMGSZ, conf=conf_thres, device=DEVICE, half=False, verbose=False)
+    detections = []
+    for det_page in results:
+        boxes, classes, scores = det_page.boxes.xyxy.cpu(), det_page.boxes.cls.cpu(), det_page.boxes.conf.cpu()
+        keep = nms(boxes, scores, iou_thres)
+        detections.append((boxes[keep], classes[keep]))
+    return detections
+
+
+def check_detector_parity(images, reference, candidate, conf_thres=0.25, iou_thres=0.45, min_iou=0.9, min_recall=0.95):
+    """
+    Compare a candidate backend against the reference (PyTorch) detector.
+    A reference box is matched when the candidate has a box of the same class
+    with IoU >= min_iou. Returns a report dict with "ok" set when the match
+    rate in both directions is at least min_recall.
+    """
+    ref_detections = _detect(reference, images, conf_thres, iou_thres)
+    cand_detections = _detect(candidate, images, conf_thres, iou_thres)
+
+    report = {"pages": len(images), "reference_boxes": 0, "candidate_boxes": 0, "matched": 0, "mean_iou": 0.0}
+    iou_sum = 0.0
+    for (ref_boxes, ref_cls), (cand_boxes, cand_cls) in zip(ref_detections, cand_detections):
+        report["reference_boxes"] += len(ref_boxes)
+        report["candidate_boxes"] += len(cand_boxes)
+        if len(ref_boxes) == 0 or len(cand_boxes) == 0:
+            continue
+        ious = box_iou(ref_boxes, cand_boxes)
+        ious[ref_cls[:, None] != cand_cls[None, :]] = 0
+        best = ious.max(dim=1).values
+        matched = best >= min_iou
+        report["matched"] += int(matched.sum())
+        iou_sum += float(best[matched].sum())
+
+    if report["matched"]:
+        report["mean_iou"] = round(iou_sum / report["matched"], 4)
+    recall = report["matched"] / report["reference_boxes"] if report["reference_boxes"] else 1.0
+    precision = report["matched"] / report["candidate_boxes"] if report["candidate_boxes"] else 1.0
+    report["recall"] = round(recall, 4)
+    report["precision"] = round(precision, 4)
+    report["ok"] = recall >= min_recall and precision >= min_recall
+    return report
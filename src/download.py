@@ -1,25 +1,197 @@
+import os
+import time
+import threading
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from pathlib import Path
 
 
-from .paths import get_pdf_path
+from .paths import get_pdf_path, get_issue_id
+from .cleanup import DISK_LIMIT_MB, get_disk_budget
 
+# Overridable so downloads can be pointed at a local HTTP server.
+ARCHIVE_BASE_URL = os.environ.get(
+    "HARATCH_ARCHIVE_URL", "https://archives.webaram.com/presse/haratch/pdf"
+)
+CHUNK_SIZE = 1024 * 1024
+DOWNLOAD_ATTEMPTS = 5
 
-def download_issue(year: int, month: int) -> Path:
-    output_path = get_pdf_path(year, month)
-    
-    if output_path.exists():
-        return output_path
+_session = None
+_session_lock = threading.Lock()
+_path_locks = {}
+_path_locks_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """Return the process-wide pooled HTTP session (keep-alive + retries on transient errors)."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            retry = Retry(
+                total=DOWNLOAD_ATTEMPTS,
+                backoff_factor=1,
+                status_forcelist=[429, 500, 502, 503, 504],
+                allowed_methods=["GET", "HEAD"],
+            )
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=retry)
+            session = requests.Session()
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _session = session
+        return _session
+
+
+def _get_path_lock(path: Path) -> threading.Lock:
+    with _path_locks_lock:
+        return _path_locks.setdefault(str(path), threading.Lock())
+
+
+def get_issue_url(year: int, month: int) -> str:
+    return f"{ARCHIVE_BASE_URL}/{get_pdf_path(year, month).name}"
 
-    filename = output_path.name
-    url = f"https://archives.webaram.com/presse/haratch/pdf/{filename}"
-    
+
+def download_file(url: str, output_path: Path, session: requests.Session = None, chunk_size: int = CHUNK_SIZE) -> Path:
+    """
+    Stream `url` to `output_path` in chunks through a `.part` file.
+    An existing `.part` file is resumed with an HTTP Range request; the final
+    file only appears once the download is complete.
+    """
+    session = session or get_session()
+    budget = get_disk_budget()
+    part_path = output_path.with_name(output_path.name + ".part")
     output_path.parent.mkdir(parents=True, exist_ok=True)
-    
-    response = requests.get(url)
-    response.raise_for_status()
-    
-    with output_path.open("wb") as f:
-        f.write(response.content)
-    
+
+    for attempt in range(1, DOWNLOAD_ATTEMPTS + 1):
+        offset = part_path.stat().st_size if part_path.exists() else 0
+        headers = {"Range": f"bytes={offset}-"} if offset else {}
+        try:
+            with session.get(url, stream=True, headers=headers, timeout=(10, 60)) as response:
+                if offset and response.status_code == 416:
+                    # Nothing left to fetch: either the part file is complete or it is bogus.
+                    total = response.headers.get("Content-Range", "").rpartition("/")[2]
+                    if total.isdigit() and int(total) == offset:
+                        break
+                    budget.remove(part_path)
+                    continue
+                response.raise_for_status()
+
+                if offset and response.status_code != 206:
+                    print(f"[DOWNLOAD] Server ignored range request, restarting {output_path.name}")
+                    offset = 0
+                    budget.record_delete(part_path)
+                elif offset:
+                    print(f"[DOWNLOAD] Resuming {output_path.name} at {offset / (1024 * 1024):.1f}MB")
+
+                expected = response.headers.get("Content-Length")
+                written = 0
+                with part_path.open("ab" if offset else "wb") as f:
+                    for chunk in response.iter_content(chunk_size=chunk_size):
+                        if chunk:
+                            f.write(chunk)
+                            written += len(chunk)
+                            budget.record_bytes(part_path, len(chunk))
+
+                if expected is not None and written != int(expected):
+                    raise IOError(f"incomplete body ({written}/{expected} bytes)")
+                break
+        except requests.HTTPError:
+            raise
+        except (requests.ConnectionError, requests.Timeout, IOError) as e:
+            if attempt == DOWNLOAD_ATTEMPTS:
+                raise
+            print(f"[DOWNLOAD] {output_path.name} interrupted ({e}), retrying ({attempt}/{DOWNLOAD_ATTEMPTS})...")
+            time.sleep(min(2 ** attempt, 30))
+    else:
+        raise IOError(f"Could not download {url} after {DOWNLOAD_ATTEMPTS} attempts")
+
+    part_path.replace(output_path)
+    budget.record_move(part_path, output_path)
     return output_path
+
+
+def download_issue(year: int, month: int, session: requests.Session = None) -> Path:
+    output_path = get_pdf_path(year, month)
+
+    # Serialize with a concurrent prefetch of the same issue instead of downloading twice.
+    with _get_path_lock(output_path):
+        if output_path.exists():
+            return output_path
+        return download_file(get_issue_url(year, month), output_path, session=session)
+
+
+class IssuePrefetcher:
+    """
+    Background thread that downloads the next `depth` issues while the current one
+    is being processed. It pauses while the data/ folder is over `limit_mb`
+    (per the incremental disk accounting, so waiting costs no directory scans).
+    `skip(year, month)` lets the caller exclude issues that need no download.
+    """
+
+    def __init__(self, issues, depth: int = 2, limit_mb: float = None, skip=None, poll_interval: float = 5.0):
+        self.issues = list(issues)
+        self.depth = depth
+        self.limit_mb = DISK_LIMIT_MB if limit_mb is None else limit_mb
+        self.skip = skip
+        self.poll_interval = poll_interval
+        self._position = -1
+        self._done = set()
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name="prefetcher", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+
+    def set_current(self, year: int, month: int):
+        """Tell the prefetcher which issue the pipeline is working on now."""
+        with self._cond:
+            if (year, month) in self.issues:
+                self._position = self.issues.index((year, month))
+            self._cond.notify_all()
+
+    def _next_candidate(self):
+        window = self.issues[self._position + 1:self._position + 1 + self.depth]
+        for issue in window:
+            if issue not in self._done:
+                return issue
+        return None
+
+    def _run(self):
+        session = get_session()
+        budget = get_disk_budget()
+        while True:
+            with self._cond:
+                issue = self._next_candidate()
+                while issue is None and not self._stopped:
+                    self._cond.wait()
+                    issue = self._next_candidate()
+                if self._stopped:
+                    return
+                self._done.add(issue)
+
+            year, month = issue
+            issue_id = get_issue_id(year, month)
+            try:
+                if self.skip and self.skip(year, month):
+                    continue
+                while budget.used_mb() >= self.limit_mb:
+                    with self._cond:
+                        if self._stopped:
+                            return
+                        self._cond.wait(self.poll_interval)
+                with self._cond:
+                    if self.issues.index(issue) <= self._position:
+                        continue  # The pipeline caught up while we were waiting
+                print(f"[PREFETCH] Downloading {issue_id} in the background...")
+                download_issue(year, month, session=session)
+                print(f"[PREFETCH] {issue_id} ready.")
+            except Exception as e:
+                # The pipeline will retry the download itself when it gets there.
+                print(f"[PREFETCH] Failed to prefetch {issue_id}: {e}")
@@ -1,11 +1,15 @@
 import json
 import torch
 from pathlib import Path
-from PIL import Image, ImageEnhance
-from doclayout_yolo import YOLOv10
+from PIL import Image
 from torchvision.ops import nms
 from concurrent.futures import ThreadPoolExecutor
-from .ocr import run_tesseract
+from .pdf import RasterPage
+from .detector import DEVICE, get_layout_model
+from .detection_server import DetectionClient
+from .layout_cache import image_hash
+from .ocr import run_tesseract, enhance_and_binarize, prepare_page, binarize_region
+from .tracing import span, traced
 
 
 id_to_names = {
@@ -22,20 +26,33 @@ id_to_names = {
 }
 
 
-def enhance_and_binarize(img: Image.Image, contrast=2.5, brightness=2.5) -> Image.Image:
-    img = img.convert("L")
-    img = ImageEnhance.Contrast(img).enhance(contrast)
-    img = ImageEnhance.Brightness(img).enhance(brightness)
-    # Binarize: threshold at 180
-    img = img.point(lambda x: 0 if x < 180 else 255, mode="1")
-    return img
-
-
-DEVICE = (
-    "cuda"
-    if torch.cuda.is_available()
-    else "mps" if torch.backends.mps.is_available() else "cpu"
-)
+def _run_detection(model, images, conf_thres, iou_thres, page_names):
+    """(boxes, classes, scores) per image in detector-input coordinates, after NMS."""
+    if isinstance(model, DetectionClient):
+        with span("batch_yolo_detect", pages=page_names, server=True):
+            return [
+                tuple(torch.from_numpy(a) for a in detection)
+                for detection in model.detect(images, conf_thres, iou_thres)
+            ]
+    with span("batch_yolo_detect", pages=page_names), torch.no_grad():
+        results = model.predict(
+            images,
+            imgsz=1024,
+            conf=conf_thres,
+            device=DEVICE,
+            half=(DEVICE != "cpu"),
+            verbose=False
+        )
+    detections = []
+    for det_page in results:
+        boxes_p, classes_p, scores_p = (
+            det_page.boxes.xyxy,
+            det_page.boxes.cls,
+            det_page.boxes.conf,
+        )
+        idx_p = nms(torch.Tensor(boxes_p), torch.Tensor(scores_p), iou_thres)
+        detections.append((boxes_p[idx_p], classes_p[idx_p], scores_p[idx_p]))
+    return detections
 
 
 def batch_yolo_detect(
@@ -43,18 +60,33 @@ def batch_yolo_detect(
     model,
     conf_thres=0.25,
     iou_thres=0.45,
+    layout_cache=None,
 ):
     """
     Run YOLO detection on a batch of images in a single inference call.
-    Returns a list of (image_path, PIL.Image, boxes, classes) tuples.
+    Entries are either image paths or RasterPages; RasterPages are detected on their
+    thumbnail and their boxes are mapped back to full-resolution coordinates.
+    Returns a list of (image_path, page, boxes, classes) tuples, where page is a
+    PIL.Image for paths and the RasterPage itself (see load_page_image) otherwise.
+    `model` may also be a DetectionClient, which batches on the shared server.
+    With a LayoutCache, pages whose detector input was seen before skip inference
+    and new detections are stored.
     """
     # Load images
     images = []
+    pages = []
     valid_paths = []
-    for path in image_paths:
+    for entry in image_paths:
+        if isinstance(entry, RasterPage):
+            images.append(entry.thumbnail)
+            pages.append(entry)
+            valid_paths.append(entry.path)
+            continue
+        path = entry
         try:
             img = Image.open(path).convert("RGB")
             images.append(img)
+            pages.append(img)
             valid_paths.append(path)
         except Exception as e:
             print(f"[ERROR] Could not open image {path}: {e}")
@@ -62,47 +94,78 @@ def batch_yolo_detect(
     
     if not images:
         return []
+
+    page_names = [Path(p).stem for p in valid_paths]
+    cached = {}
+    hashes = []
+    if layout_cache is not None:
+        hashes = [image_hash(img) for img in images]
+        for i, name in enumerate(page_names):
+            record = layout_cache.get(name, hashes[i], conf_thres, iou_thres)
+            if record is not None:
+                cached[i] = record
     
-    # Batch inference
-    with torch.no_grad():
-        results = model.predict(
-            images,
-            imgsz=1024,
-            conf=conf_thres,
-            device=DEVICE,
-            half=(DEVICE != "cpu"),
-            verbose=False
-        )
+    # Batch inference (only for pages without a cached layout)
+    todo = [i for i in range(len(images)) if i not in cached]
+    detections = {}
+    if todo:
+        results = _run_detection(model, [images[i] for i in todo], conf_thres, iou_thres, [page_names[i] for i in todo])
+        detections = dict(zip(todo, results))
     
     # Process results
     batch_results = []
-    for i, det_page in enumerate(results):
-        boxes_p, classes_p, scores_p = (
-            det_page.boxes.xyxy,
-            det_page.boxes.cls,
-            det_page.boxes.conf,
-        )
-        idx_p = nms(torch.Tensor(boxes_p), torch.Tensor(scores_p), iou_thres)
-        boxes_p = boxes_p[idx_p]
-        classes_p = classes_p[idx_p]
+    for i in range(len(images)):
+        if i in cached:
+            # Stored in full-resolution coordinates already
+            boxes_p = torch.tensor(cached[i]["boxes"], dtype=torch.float32).reshape(-1, 4)
+            classes_p = torch.tensor(cached[i]["classes"], dtype=torch.float32)
+            batch_results.append((valid_paths[i], pages[i], boxes_p, classes_p))
+            continue
+
+        boxes_p, classes_p, scores_p = detections[i]
+        if isinstance(pages[i], RasterPage):
+            # Thumbnail -> full-resolution coordinates
+            sx = pages[i].size[0] / images[i].width
+            sy = pages[i].size[1] / images[i].height
+            boxes_p = boxes_p * boxes_p.new_tensor([sx, sy, sx, sy])
+
+        if layout_cache is not None:
+            page_size = pages[i].size
+            layout_cache.put(
+                page_names[i], hashes[i], page_size, boxes_p.tolist(), classes_p.tolist(), scores_p.tolist(),
+                conf_thres, iou_thres,
+            )
         
-        batch_results.append((valid_paths[i], images[i], boxes_p, classes_p))
+        batch_results.append((valid_paths[i], pages[i], boxes_p, classes_p))
     
     return batch_results
 
 
-def process_single_detection(page: Image.Image, boxes_p, classes_p, save_crops=False, para_output=None):
+def load_page_image(page) -> Image.Image:
+    """Full-resolution PIL image of a batch_yolo_detect page (decoded on demand for RasterPages)."""
+    return page.load() if isinstance(page, RasterPage) else page
+
+
+@traced("process_single_detection")
+def process_single_detection(page: Image.Image, boxes_p, classes_p, save_crops=False, para_output=None, ocr_stage=None):
     """
     Process YOLO detection results for a single page: crop, enhance, OCR.
+    If an OcrStage is given, paragraphs go through its shared process pool.
     Returns list of ((x1,y1,x2,y2), text) tuples.
     """
+    if ocr_stage is not None:
+        return ocr_stage.ocr_page(
+            page, boxes_p, classes_p, para_output=para_output if save_crops else None
+        )
+
+    gray = prepare_page(page)
+
     def process_paragraph(i, cls, bbox):
         if id_to_names[int(cls)] != "plain text":
             return None
         
         x1, y1, x2, y2 = bbox
-        crop = page.crop((int(x1), int(y1), int(x2), int(y2)))
-        enhanced = enhance_and_binarize(crop)
+        enhanced = binarize_region(gray, (x1, y1, x2, y2))
         
         if save_crops and para_output:
             para_path = Path(para_output) / f"paragraph_{i}.png"
@@ -132,9 +195,7 @@ def extract_paragraphs_and_lines(
     inference_lock=None,
 ):
     if model is None:
-        model = YOLOv10(
-            "models/DocLayout-YOLO-DocStructBench/doclayout_yolo_docstructbench_imgsz1024.pt"
-        ).to(DEVICE)
+        model = get_layout_model()
 
     try:
         page = Image.open(page_image_path).convert("RGB")
@@ -175,13 +236,15 @@ def extract_paragraphs_and_lines(
     boxes_p = boxes_p[idx_p]
     classes_p = classes_p[idx_p]
 
+    # Grayscale once; each paragraph is binarized from a slice of this page
+    gray = prepare_page(page)
+
     def process_paragraph(i, cls, bbox):
         if id_to_names[int(cls)] != "plain text":
             return None
 
         x1, y1, x2, y2 = bbox
-        crop = page.crop((int(x1), int(y1), int(x2), int(y2)))
-        enhanced = enhance_and_binarize(crop)
+        enhanced = binarize_region(gray, (x1, y1, x2, y2))
 
         if save_crops and para_output:
             para_path = Path(para_output) / f"paragraph_{i}.png"
@@ -2,15 +2,28 @@ from google.cloud import storage
 from pathlib import Path
 import os
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 import json
 
+from .cleanup import get_disk_budget
+from .tracing import traced
+
 PROJECT_ID = "haratch-ocr"
 BUCKET_NAME = "haratch-ocr"
 
 def get_gcs_client():
-    """Initialize GCS client."""
+    """
+    Initialize GCS client.
+    HARATCH_STORAGE_DIR switches to a local filesystem stand-in (see local_storage.py);
+    STORAGE_EMULATOR_HOST is honoured by the GCS client itself (e.g. fake-gcs-server).
+    """
+    local_dir = os.environ.get("HARATCH_STORAGE_DIR")
+    if local_dir:
+        from .local_storage import LocalClient
+        return LocalClient(local_dir)
     return storage.Client(project=PROJECT_ID)
 
+@traced("gcs.ensure_bucket_exists")
 def ensure_bucket_exists(client, bucket_name=BUCKET_NAME):
     """Ensure the bucket exists, create it if not."""
     try:
@@ -20,11 +33,54 @@ def ensure_bucket_exists(client, bucket_name=BUCKET_NAME):
         print(f"[INIT] Creating bucket: {bucket_name}...")
         return client.create_bucket(bucket_name)
 
+@traced("gcs.blob_exists")
 def blob_exists(bucket, blob_name):
     """Check if a blob exists in the bucket."""
     blob = bucket.blob(blob_name)
     return blob.exists()
 
+@traced("gcs.build_issue_manifest")
+def build_issue_manifest(bucket, issue_id):
+    """
+    List ocr/<issue>/ once and return {file name: blob} (e.g. "page_3.json"),
+    so per-page cache decisions are in-memory lookups instead of HEAD requests.
+    """
+    prefix = f"ocr/{issue_id}/"
+    return {blob.name[len(prefix):]: blob for blob in bucket.list_blobs(prefix=prefix)}
+
+@traced("gcs.download_cached_pages")
+def download_cached_pages(manifest, ocr_dir: Path, max_workers=16):
+    """Download the page JSONs of a manifest that are missing locally, in parallel."""
+    missing = [
+        (name, blob) for name, blob in manifest.items()
+        if name.startswith("page_") and name.endswith(".json") and not (ocr_dir / name).exists()
+    ]
+    if not missing:
+        return 0
+
+    print(f"[CLOUD] Downloading {len(missing)} cached OCR pages from GCS...")
+    ocr_dir.mkdir(parents=True, exist_ok=True)
+
+    def fetch(name, blob):
+        content = blob.download_as_bytes()
+        # Write-then-rename so a crash never leaves a truncated page behind
+        tmp_path = ocr_dir / f".{name}.tmp"
+        tmp_path.write_bytes(content)
+        tmp_path.replace(ocr_dir / name)
+        get_disk_budget().record_write(ocr_dir / name)
+
+    count = 0
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(fetch, name, blob): name for name, blob in missing}
+        for future, name in futures.items():
+            try:
+                future.result()
+                count += 1
+            except Exception as e:
+                print(f"[ERROR] Failed to download cached {name}: {e}")
+    return count
+
+@traced("gcs.upload_file")
 def upload_file(bucket, local_path, blob_name):
     """Upload a file to GCS if it hasn't changed (or doesn't exist)."""
     if blob_exists(bucket, blob_name):
@@ -34,6 +90,7 @@ def upload_file(bucket, local_path, blob_name):
     blob = bucket.blob(blob_name)
     blob.upload_from_filename(str(local_path))
     return True
+@traced("gcs.update_runner_status")
 def update_runner_status(client, status="idle", bucket_name=BUCKET_NAME, **kwargs):
     """Write current runner status and health metrics to GCS as JSON."""
     bucket = client.get_bucket(bucket_name)
@@ -67,6 +124,7 @@ def update_runner_status(client, status="idle", bucket_name=BUCKET_NAME, **kwarg
     
     blob.upload_from_string(json.dumps(status_data))
     print(f"[STATUS] Runner is {status.upper()} (RAM: {ram_mb:.1f}MB, Disk: {disk_mb:.1f}MB)")
+@traced("gcs.reset_bucket")
 def reset_bucket(client, bucket_name=BUCKET_NAME):
     """Delete all blobs in the bucket to start fresh."""
     bucket = client.get_bucket(bucket_name)
@@ -78,6 +136,7 @@ def reset_bucket(client, bucket_name=BUCKET_NAME):
         blob.delete()
         count += 1
     print(f"[OK] Deleted {count} files.")
+@traced("gcs.is_issue_complete_on_gcs")
 def is_issue_complete_on_gcs(client, issue_id, bucket_name=BUCKET_NAME):
     """
     Check if an issue is truly complete on GCS by comparing 
@@ -108,31 +167,76 @@ def is_issue_complete_on_gcs(client, issue_id, bucket_name=BUCKET_NAME):
         print(f"[ERROR] Error checking coherence for {issue_id}: {e}")
         return False
 
-def get_broken_issues(client, start_year, end_year, bucket_name=BUCKET_NAME):
+@traced("gcs.build_completeness_index")
+def build_completeness_index(client, bucket_name=BUCKET_NAME, max_workers=16):
+    """
+    Build an in-memory index of the bucket with a single listing of ocr/:
+    {issue_id: {"pages": set of page names, "total_pages": int, "has_metadata": bool}}.
+    The metadata.json files are then fetched in parallel for the expected totals.
+    """
+    bucket = client.bucket(bucket_name)
+    index = {}
+    metadata_blobs = {}
+
+    print("[SCAN] Indexing ocr/ on GCS...")
+    for blob in bucket.list_blobs(prefix="ocr/"):
+        # Path format: ocr/YYYY-MM/<file>
+        parts = blob.name.split("/")
+        if len(parts) != 3:
+            continue
+        issue_id, filename = parts[1], parts[2]
+        entry = index.setdefault(issue_id, {"pages": set(), "total_pages": 0, "has_metadata": False})
+        if filename == "metadata.json":
+            entry["has_metadata"] = True
+            metadata_blobs[issue_id] = blob
+        elif filename.startswith("page_") and filename.endswith(".json"):
+            entry["pages"].add(filename[:-len(".json")])
+
+    def fetch_total(issue_id, blob):
+        try:
+            return json.loads(blob.download_as_text()).get("total_pages", 0)
+        except Exception as e:
+            print(f"[ERROR] Error reading metadata for {issue_id}: {e}")
+            return 0
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(fetch_total, i, b): i for i, b in metadata_blobs.items()}
+        for future, issue_id in futures.items():
+            index[issue_id]["total_pages"] = future.result()
+
+    print(f"[SCAN] Indexed {len(index)} issues.")
+    return index
+
+def is_issue_complete(index, issue_id):
+    """Same rule as is_issue_complete_on_gcs, answered from a completeness index."""
+    entry = index.get(issue_id)
+    if not entry or entry["total_pages"] == 0:
+        return False
+    return len(entry["pages"]) >= entry["total_pages"]
+
+@traced("gcs.get_broken_issues")
+def get_broken_issues(client, start_year, end_year, bucket_name=BUCKET_NAME, index=None):
     """
     Scan the bucket for issues that are incomplete according to their metadata.
+    Uses `index` (see build_completeness_index) if given, otherwise builds one.
     Returns a list of issue_id strings.
     """
-    bucket = client.get_bucket(bucket_name)
+    if index is None:
+        index = build_completeness_index(client, bucket_name)
     broken = []
     
     print(f"[SCAN] Scanning for broken issues from {start_year} to {end_year}...")
     
-    # List all metadata files to find candidate issues
-    blobs = bucket.list_blobs(prefix="ocr/")
-    for blob in blobs:
-        if blob.name.endswith("metadata.json"):
-            # Path format: ocr/YYYY-MM/metadata.json
-            parts = blob.name.split("/")
-            if len(parts) == 3:
-                issue_id = parts[1]
-                try:
-                    year = int(issue_id.split("-")[0])
-                    if start_year <= year <= end_year:
-                        if not is_issue_complete_on_gcs(client, issue_id, bucket_name):
-                            broken.append(issue_id)
-                except (ValueError, IndexError):
-                    continue
+    # Issues with a metadata.json are candidates
+    for issue_id in sorted(index):
+        if not index[issue_id]["has_metadata"]:
+            continue
+        try:
+            year = int(issue_id.split("-")[0])
+        except (ValueError, IndexError):
+            continue
+        if start_year <= year <= end_year and not is_issue_complete(index, issue_id):
+            broken.append(issue_id)
     
     if broken:
         print(f"[SCAN] Found {len(broken)} broken issues: {', '.join(broken)}")
@@ -0,0 +1,110 @@
+"""
+Persisted layout detections, one JSON per page in data/generated/ocr/<issue>/layout/
+(synced to GCS next to the OCR results). A record is reused only for the same
+detector input (hash of the thumbnail the detector saw), the same detector version
+and the same thresholds, so re-OCR runs can skip detection without drifting.
+"""
+import json
+import hashlib
+from pathlib import Path
+
+from .results import compact_dumps
+from .sync_gcs import notify_written
+from .cleanup import get_disk_budget
+
+LAYOUT_VERSION = 1
+
+
+def image_hash(image) -> str:
+    """sha1 of a PIL image's mode, size and pixels."""
+    digest = hashlib.sha1(f"{image.mode}:{image.width}x{image.height}:".encode())
+    digest.update(image.tobytes())
+    return digest.hexdigest()
+
+
+def get_layout_dir(ocr_dir: Path) -> Path:
+    return Path(ocr_dir) / "layout"
+
+
+class LayoutCache:
+    """Layout records of one issue, keyed by page (page_N) and checked against the detector input."""
+
+    def __init__(self, ocr_dir: Path, detector_version: str = None):
+        if detector_version is None:
+            from .detector import get_detector_version
+            detector_version = get_detector_version()
+        self.layout_dir = get_layout_dir(ocr_dir)
+        self.detector_version = detector_version
+        self.stats = {"hits": 0, "misses": 0}
+
+    def path(self, page_stem: str) -> Path:
+        return self.layout_dir / f"{page_stem}.json"
+
+    def load(self, page_stem: str):
+        """The stored record of a page, whatever it was computed with; None if absent or unreadable."""
+        try:
+            with self.path(page_stem).open("r", encoding="utf-8") as f:
+                record = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return record if record.get("version") == LAYOUT_VERSION else None
+
+    def get(self, page_stem: str, image_sha1: str, conf_thres: float, iou_thres: float):
+        """The record if it was computed from this exact input with the current detector, else None."""
+        record = self.load(page_stem)
+        valid = (
+            record is not None
+            and record["image_sha1"] == image_sha1
+            and record["detector"] == self.detector_version
+            and record["conf"] == conf_thres
+            and record["iou"] == iou_thres
+        )
+        self.stats["hits" if valid else "misses"] += 1
+        return record if valid else None
+
+    def put(self, page_stem: str, image_sha1: str, page_size, boxes, classes, scores, conf_thres: float, iou_thres: float):
+        """Store detections (boxes in full-resolution page coordinates)."""
+        record = {
+            "version": LAYOUT_VERSION,
+            "detector": self.detector_version,
+            "image_sha1": image_sha1,
+            "conf": conf_thres,
+            "iou": iou_thres,
+            "page_size": list(page_size),
+            "boxes": [[round(float(v), 2) for v in box] for box in boxes],
+            "classes": [int(c) for c in classes],
+            "scores": [round(float(s), 4) for s in scores],
+        }
+        path = self.path(page_stem)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f".{path.name}.tmp")
+        tmp_path.write_text(compact_dumps(record), encoding="utf-8")
+        tmp_path.replace(path)
+        get_disk_budget().record_write(path)
+        notify_written(path)
+        return path
+
+
+def download_cached_layouts(manifest, ocr_dir: Path) -> int:
+    """Fetch layout records listed in a GCS issue manifest (layout/page_N.json) missing locally."""
+    layout_dir = get_layout_dir(ocr_dir)
+    count = 0
+    for name, blob in manifest.items():
+        if not (name.startswith("layout/page_") and name.endswith(".json")):
+            continue
+        path = Path(ocr_dir) / name
+        if path.exists():
+            continue
+        try:
+            layout_dir.mkdir(parents=True, exist_ok=True)
+            # Write-then-rename so a crash never leaves a truncated record behind
+            tmp_path = layout_dir / f".{path.name}.tmp"
+            tmp_path.write_bytes(blob.download_as_bytes())
+            tmp_path.replace(path)
+            get_disk_budget().record_write(path)
+            count += 1
+        except Exception as e:
+            print(f"[ERROR] Failed to download cached layout {name}: {e}")
+    if count:
+        print(f"[CLOUD] Downloaded {count} cached layouts from GCS.")
+    return count
@@ -0,0 +1,155 @@
+"""
+Filesystem-backed stand-in for the subset of google.cloud.storage used by the runner.
+Set HARATCH_STORAGE_DIR to run the pipeline (or several workers) against a local
+directory instead of GCS: gs://<bucket>/<name> maps to <dir>/<bucket>/<name>.
+Object generations are the files' nanosecond mtimes, kept strictly increasing, and
+if_generation_match preconditions are checked under a per-bucket file lock, so
+several processes can use it for compare-and-swap like with GCS.
+"""
+import os
+import time
+import fcntl
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+from google.api_core.exceptions import PreconditionFailed, NotFound
+
+
+class LocalBlob:
+    def __init__(self, bucket, name: str):
+        self.bucket = bucket
+        self.name = name
+        # Like GCS: known once the blob was listed, fetched, reloaded or uploaded
+        self.generation = None
+
+    @property
+    def _path(self) -> Path:
+        return self.bucket._root / self.name
+
+    @property
+    def size(self):
+        return self._path.stat().st_size if self._path.exists() else None
+
+    def exists(self, client=None) -> bool:
+        return self._path.is_file()
+
+    def _current_generation(self) -> int:
+        """0 when the object does not exist, as in GCS preconditions."""
+        try:
+            return self._path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return 0
+
+    def _check_generation(self, if_generation_match):
+        if if_generation_match is not None and self._current_generation() != if_generation_match:
+            raise PreconditionFailed(f"gs://{self.bucket.name}/{self.name}: generation does not match {if_generation_match}")
+
+    def reload(self, client=None):
+        if not self._path.is_file():
+            raise NotFound(f"gs://{self.bucket.name}/{self.name}")
+        self.generation = self._current_generation()
+
+    def upload_from_string(self, data, content_type=None, if_generation_match=None):
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        # Write-then-rename so readers never see a partial object
+        tmp_path = self._path.with_name(f".{self._path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp_path.write_bytes(data)
+        try:
+            with self.bucket._lock():
+                self._check_generation(if_generation_match)
+                # A new generation must differ from every earlier one of this object
+                generation = max(time.time_ns(), self._current_generation() + 1)
+                os.utime(tmp_path, ns=(generation, generation))
+                tmp_path.replace(self._path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+        self.generation = generation
+
+    def upload_from_filename(self, filename, content_type=None, if_generation_match=None):
+        self.upload_from_string(
+            Path(filename).read_bytes(), content_type=content_type, if_generation_match=if_generation_match
+        )
+
+    def download_as_bytes(self) -> bytes:
+        return self._path.read_bytes()
+
+    def download_as_text(self, encoding="utf-8") -> str:
+        return self.download_as_bytes().decode(encoding)
+
+    def delete(self, if_generation_match=None):
+        with self.bucket._lock():
+            self._check_generation(if_generation_match)
+            try:
+                self._path.unlink()
+            except FileNotFoundError:
+                raise NotFound(f"gs://{self.bucket.name}/{self.name}")
+
+
+class LocalBucket:
+    def __init__(self, root: Path, name: str):
+        self._root = Path(root) / name
+        self.name = name
+
+    def exists(self) -> bool:
+        return self._root.is_dir()
+
+    @contextmanager
+    def _lock(self):
+        """Serialize conditional writes of all processes sharing this bucket."""
+        self._root.mkdir(parents=True, exist_ok=True)
+        with (self._root / ".lock").open("a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def blob(self, name: str) -> LocalBlob:
+        return LocalBlob(self, name)
+
+    def get_blob(self, name: str):
+        """The blob with its generation, or None if it does not exist."""
+        blob = LocalBlob(self, name)
+        generation = blob._current_generation()
+        if not generation:
+            return None
+        blob.generation = generation
+        return blob
+
+    def list_blobs(self, prefix: str = None):
+        if not self._root.exists():
+            return
+        for path in sorted(self._root.rglob("*")):
+            if not path.is_file() or path.name.startswith("."):
+                continue
+            name = path.relative_to(self._root).as_posix()
+            if prefix is None or name.startswith(prefix):
+                blob = LocalBlob(self, name)
+                blob.generation = blob._current_generation()
+                yield blob
+
+
+class LocalClient:
+    def __init__(self, root):
+        self.root = Path(root)
+
+    def bucket(self, bucket_name: str) -> LocalBucket:
+        return LocalBucket(self.root, bucket_name)
+
+    def get_bucket(self, bucket_name: str) -> LocalBucket:
+        bucket = self.bucket(bucket_name)
+        if not bucket.exists():
+            raise FileNotFoundError(f"Bucket {bucket_name} does not exist in {self.root}")
+        return bucket
+
+    def create_bucket(self, bucket_name: str) -> LocalBucket:
+        bucket = self.bucket(bucket_name)
+        bucket._root.mkdir(parents=True, exist_ok=True)
+        return bucket
+
+    def list_blobs(self, bucket_or_name, prefix: str = None):
+        bucket = bucket_or_name if isinstance(bucket_or_name, LocalBucket) else self.bucket(bucket_or_name)
+        return bucket.list_blobs(prefix=prefix)
@@ -0,0 +1,283 @@
+"""
+Local monitoring endpoint for the runner, so live progress needs no GCS round-trip:
+  /metrics  Prometheus text format (pages, paragraphs, per-stage latency histograms,
+            queue depths, pages/hour, RSS, data/ disk usage)
+  /events   server-sent events, one "page" event per finished page
+  /status   the runner status as last published (same fields as status/runner.json)
+Stage latencies come from the tracing spans (a tracing listener), so nothing is
+measured twice. Queue depths are sampled at every scrape from the queues the pipeline
+registered with watch_queue(), so a queue that drained reads 0.
+"""
+import os
+import json
+import time
+import weakref
+import threading
+from queue import Queue, Full, Empty
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from . import tracing
+
+METRICS_HOST = os.environ.get("HARATCH_METRICS_HOST", "127.0.0.1")
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+SSE_KEEPALIVE = 15.0
+
+_watched_queues = {}  # name -> WeakSet of queues, dropped with their pipeline
+_watched_lock = threading.Lock()
+
+
+def watch_queue(name: str, queue):
+    """Report the size of `queue` as haratch_queue_depth{queue=name} whenever metrics are scraped."""
+    with _watched_lock:
+        _watched_queues.setdefault(name, weakref.WeakSet()).add(queue)
+
+
+def _queue_depths() -> dict:
+    with _watched_lock:
+        return {name: sum(q.qsize() for q in list(queues)) for name, queues in _watched_queues.items()}
+
+
+def _labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{str(v)}"' for k, v in sorted(labels.items())) + "}"
+
+
+class Metrics:
+    """In-memory counters, gauges and histograms rendered in the Prometheus text format."""
+
+    def __init__(self):
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._counters = {}    # (name, labels) -> value
+        self._gauges = {}      # (name, labels) -> value
+        self._histograms = {}  # (name, labels) -> [bucket counts..., sum, count]
+        self._help = {}
+
+    def describe(self, name: str, kind: str, help_text: str):
+        self._help[name] = (kind, help_text)
+
+    def inc(self, name: str, amount: float = 1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def set(self, name: str, value: float, **labels):
+        with self._lock:
+            self._gauges[(name, tuple(sorted(labels.items())))] = value
+
+    def observe(self, name: str, value: float, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            hist = self._histograms.setdefault(key, [0] * len(LATENCY_BUCKETS) + [0.0, 0])
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if value <= bound:
+                    hist[i] += 1
+            hist[-2] += value
+            hist[-1] += 1
+
+    def counter_value(self, name: str) -> float:
+        with self._lock:
+            return sum(v for (n, _), v in self._counters.items() if n == name)
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            series = {}
+            for (name, labels), value in self._counters.items():
+                series.setdefault(name, []).append(f"{name}{_labels(dict(labels))} {value}")
+            for (name, labels), value in self._gauges.items():
+                series.setdefault(name, []).append(f"{name}{_labels(dict(labels))} {value}")
+            for (name, labels), hist in self._histograms.items():
+                labels = dict(labels)
+                rows = series.setdefault(name, [])
+                for bound, count in zip(LATENCY_BUCKETS, hist):
+                    rows.append(f"{name}_bucket{_labels({**labels, 'le': bound})} {count}")
+                rows.append(f"{name}_bucket{_labels({**labels, 'le': '+Inf'})} {hist[-1]}")
+                rows.append(f"{name}_sum{_labels(labels)} {hist[-2]}")
+                rows.append(f"{name}_count{_labels(labels)} {hist[-1]}")
+        for name in sorted(series):
+            kind, help_text = self._help.get(name, ("untyped", name))
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(series[name])
+        return "\n".join(lines) + "\n"
+
+
+class MetricsCollector:
+    """Tracing listener turning spans and counter samples into metrics and page events."""
+
+    def __init__(self, metrics: Metrics, broadcast):
+        self.metrics = metrics
+        self.broadcast = broadcast
+
+    def on_span(self, name, seconds, args):
+        self.metrics.observe("haratch_stage_seconds", seconds, stage=name)
+        if name == "ocr_page" and "error" not in args:
+            source = "cached" if args.get("cached") else "ocr"
+            self.metrics.inc("haratch_pages_total", source=source)
+            if source == "ocr":
+                self.metrics.inc("haratch_paragraphs_total", args.get("paragraphs", 0))
+            self.broadcast("page", {
+                "issue": args.get("issue"),
+                "page": args.get("page"),
+                "paragraphs": args.get("paragraphs"),
+                "cached": bool(args.get("cached")),
+                "seconds": round(seconds, 3),
+                "time": time.time(),
+            })
+        elif name == "ocr_page":
+            self.metrics.inc("haratch_page_errors_total")
+
+    def on_counter(self, name, values):
+        # Queues the pipeline registered with watch_queue() are sampled at scrape time instead
+        if "depth" in values and name not in _watched_queues:
+            self.metrics.set("haratch_queue_depth", values["depth"], queue=name)
+
+
+class MetricsServer:
+    """The HTTP endpoint: a ThreadingHTTPServer on a daemon thread."""
+
+    def __init__(self, port: int, host: str = METRICS_HOST):
+        self.metrics = Metrics()
+        self._describe()
+        self._subscribers = []
+        self._sub_lock = threading.Lock()
+        self.collector = MetricsCollector(self.metrics, self.broadcast)
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name="metrics-http", daemon=True)
+
+    @property
+    def address(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _describe(self):
+        m = self.metrics
+        m.describe("haratch_pages_total", "counter", "Pages finished this session, by source (ocr or cached)")
+        m.describe("haratch_paragraphs_total", "counter", "Paragraphs OCR'd this session")
+        m.describe("haratch_page_errors_total", "counter", "Pages whose OCR failed")
+        m.describe("haratch_issues_total", "counter", "Issues finished this session, by status")
+        m.describe("haratch_stage_seconds", "histogram", "Latency of traced pipeline stages")
+        m.describe("haratch_queue_depth", "gauge", "Items waiting in a pipeline queue")
+        m.describe("haratch_pages_per_hour", "gauge", "Pages finished per hour since the runner started")
+        m.describe("haratch_process_rss_bytes", "gauge", "Resident memory of the runner process")
+        m.describe("haratch_data_disk_bytes", "gauge", "Bytes used under data/ (incremental accounting)")
+
+    def start(self):
+        tracing.add_listener(self.collector)
+        self._thread.start()
+        print(f"[METRICS] Serving /metrics, /events and /status on {self.address}")
+        return self
+
+    def stop(self):
+        tracing.remove_listener(self.collector)
+        with self._sub_lock:
+            for queue in self._subscribers:
+                self._offer(queue, None)
+        self._server.shutdown()
+        self._server.server_close()
+
+    @staticmethod
+    def _offer(queue, item):
+        try:
+            queue.put_nowait(item)
+        except Full:
+            pass  # Slow client: it misses events rather than slowing the pipeline
+
+    def broadcast(self, event: str, data: dict):
+        payload = f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+        with self._sub_lock:
+            for queue in self._subscribers:
+                self._offer(queue, payload)
+
+    def _refresh_gauges(self):
+        import psutil
+        from .cleanup import get_disk_budget
+
+        m = self.metrics
+        hours = (time.time() - m.started) / 3600
+        m.set("haratch_pages_per_hour", round(m.counter_value("haratch_pages_total") / hours, 2) if hours > 0 else 0)
+        m.set("haratch_process_rss_bytes", psutil.Process(os.getpid()).memory_info().rss)
+        m.set("haratch_data_disk_bytes", int(get_disk_budget().used_mb() * 1024 * 1024))
+        for name, depth in _queue_depths().items():
+            m.set("haratch_queue_depth", depth, queue=name)
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, body: str, content_type: str):
+                data = body.encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                path = self.path.split("?", 1)[0]
+                if path == "/metrics":
+                    server._refresh_gauges()
+                    self._send(server.metrics.render(), "text/plain; version=0.0.4")
+                elif path == "/status":
+                    from .status import get_status_publisher
+                    self._send(json.dumps(get_status_publisher().snapshot(), ensure_ascii=False), "application/json")
+                elif path == "/events":
+                    self._stream()
+                else:
+                    self.send_error(404)
+
+            def _stream(self):
+                queue = Queue(maxsize=1000)
+                with server._sub_lock:
+                    server._subscribers.append(queue)
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Cache-Control", "no-cache")
+                self.send_header("Access-Control-Allow-Origin", "*")
+                self.end_headers()
+                try:
+                    while True:
+                        try:
+                            payload = queue.get(timeout=SSE_KEEPALIVE)
+                        except Empty:
+                            payload = ": keep-alive\n\n"
+                        if payload is None:
+                            return
+                        self.wfile.write(payload.encode("utf-8"))
+                        self.wfile.flush()
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+                finally:
+                    with server._sub_lock:
+                        server._subscribers.remove(queue)
+
+        return Handler
+
+
+_server = None
+
+
+def start_metrics_server(port: int, host: str = METRICS_HOST) -> MetricsServer:
+    global _server
+    if _server is None:
+        _server = MetricsServer(port, host).start()
+    return _server
+
+
+def stop_metrics_server():
+    global _server
+    if _server is not None:
+        _server.stop()
+        _server = None
+
+
+def record_issue(status: str):
+    """Count a finished issue (status "ok" or "error") if the endpoint is running."""
+    if _server is not None:
+        _server.metrics.inc("haratch_issues_total", status=status)
@@ -1,6 +1,31 @@
+import os
+import shlex
+import threading
+from contextlib import contextmanager
+from queue import Queue, Empty
+
+import numpy as np
 from PIL import Image, ImageEnhance
 import pytesseract
 
+from .tracing import span
+
+try:
+    import tesserocr
+
+    TESSEROCR_AVAILABLE = True
+except ImportError:
+    TESSEROCR_AVAILABLE = False
+
+
+# "tesserocr" keeps initialized engines in-process, "subprocess" shells out to
+# the tesseract binary through pytesseract (one process per call).
+TESSERACT_BACKEND = os.environ.get(
+    "HARATCH_TESSERACT_BACKEND", "tesserocr" if TESSEROCR_AVAILABLE else "subprocess"
+)
+# Upper bound on live engines per (lang, config); each one holds its own traineddata.
+TESSERACT_POOL_SIZE = int(os.environ.get("HARATCH_TESSERACT_POOL_SIZE", os.cpu_count() or 4))
+
 
 def enhance(image: Image.Image, contrast=2.5, brightness=2.5) -> Image.Image:
     img = ImageEnhance.Contrast(image.convert("L")).enhance(contrast)
@@ -8,5 +33,201 @@ def enhance(image: Image.Image, contrast=2.5, brightness=2.5) -> Image.Image:
     return img
 
 
-def run_tesseract(image: Image.Image, lang="hye-calfa-n", config="--psm 6") -> str:
-    return pytesseract.image_to_string(image, lang=lang, config=config).strip()
+def enhance_and_binarize(img: Image.Image, contrast=2.5, brightness=2.5) -> Image.Image:
+    img = img.convert("L")
+    img = ImageEnhance.Contrast(img).enhance(contrast)
+    img = ImageEnhance.Brightness(img).enhance(brightness)
+    # Binarize: threshold at 180
+    img = img.point(lambda x: 0 if x < 180 else 255, mode="1")
+    return img
+
+
+_binarize_luts = {}
+
+
+def get_binarize_lut(contrast=2.5, brightness=2.5, threshold=180) -> np.ndarray:
+    """
+    Lookup table lut[mean][gray] -> bool (True = white) reproducing
+    enhance_and_binarize exactly: ImageEnhance.Contrast blends against the crop's
+    rounded mean, Brightness against black, both in float32 with clipping and
+    truncation like Pillow's ImagingBlend, then the threshold at `threshold`.
+    """
+    key = (contrast, brightness, threshold)
+    lut = _binarize_luts.get(key)
+    if lut is None:
+        levels = np.arange(256, dtype=np.float32)
+        mean = levels[:, None]
+        contrasted = mean + np.float32(contrast) * (levels[None, :] - mean)
+        contrasted = np.clip(contrasted, 0, 255).astype(np.uint8)
+        brightened = np.float32(brightness) * contrasted.astype(np.float32)
+        brightened = np.clip(brightened, 0, 255).astype(np.uint8)
+        lut = brightened >= threshold
+        _binarize_luts[key] = lut
+    return lut
+
+
+def prepare_page(page: Image.Image) -> np.ndarray:
+    """Grayscale a page once; paragraph crops are then zero-copy slices of it."""
+    return np.asarray(page.convert("L"))
+
+
+def binarize_region(gray: np.ndarray, bbox, contrast=2.5, brightness=2.5) -> Image.Image:
+    """
+    Bit-identical equivalent of enhance_and_binarize(page.crop(bbox)) computed from a
+    page prepared with prepare_page: one sum for the crop mean, one LUT gather.
+    """
+    x1, y1, x2, y2 = (int(v) for v in bbox)
+    height, width = gray.shape
+    if not (0 <= x1 < x2 <= width and 0 <= y1 < y2 <= height):
+        # PIL pads out-of-page crops; keep the reference behaviour for those.
+        return enhance_and_binarize(Image.fromarray(gray).crop((x1, y1, x2, y2)), contrast, brightness)
+    region = gray[y1:y2, x1:x2]
+    # Same rounding as ImageStat: float mean of the histogram, then int(mean + 0.5)
+    mean = int(int(region.sum(dtype=np.uint64)) / region.size + 0.5)
+    return Image.fromarray(get_binarize_lut(contrast, brightness)[mean][region])
+
+
+def verify_binarize_parity(page: Image.Image, boxes) -> bool:
+    """Check that binarize_region matches enhance_and_binarize for every box of a page."""
+    gray = prepare_page(page)
+    for bbox in boxes:
+        box = tuple(int(v) for v in bbox)
+        expected = enhance_and_binarize(page.crop(box))
+        actual = binarize_region(gray, box)
+        if expected.mode != actual.mode or expected.size != actual.size or expected.tobytes() != actual.tobytes():
+            print(f"[PARITY] Binarization mismatch for box {box}")
+            return False
+    return True
+
+
+def _parse_config(config: str):
+    """
+    Translate a tesseract CLI config string into (psm, variables).
+    Returns None if it contains flags the in-process API cannot honour.
+    """
+    psm = None
+    variables = {}
+    tokens = shlex.split(config or "")
+    i = 0
+    while i < len(tokens):
+        token = tokens[i]
+        if token == "--psm" and i + 1 < len(tokens):
+            psm = int(tokens[i + 1])
+            i += 2
+        elif token == "-c" and i + 1 < len(tokens) and "=" in tokens[i + 1]:
+            key, value = tokens[i + 1].split("=", 1)
+            variables[key] = value
+            i += 2
+        else:
+            return None
+    return psm, variables
+
+
+class TesseractEnginePool:
+    """
+    A bounded pool of initialized tesserocr engines sharing one language/config.
+    Engines are created lazily and reused, so the traineddata is loaded once per engine.
+    """
+
+    def __init__(self, lang: str, psm=None, variables=None, size: int = TESSERACT_POOL_SIZE):
+        self.lang = lang
+        self.psm = psm
+        self.variables = variables or {}
+        self.size = max(1, size)
+        self._idle = Queue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _create_engine(self):
+        kwargs = {"lang": self.lang}
+        if self.psm is not None:
+            kwargs["psm"] = self.psm
+        engine = tesserocr.PyTessBaseAPI(**kwargs)
+        for key, value in self.variables.items():
+            engine.SetVariable(key, value)
+        return engine
+
+    @contextmanager
+    def engine(self):
+        """Borrow an engine, creating one if the pool is not yet full."""
+        try:
+            api = self._idle.get_nowait()
+        except Empty:
+            with self._lock:
+                can_create = self._created < self.size
+                if can_create:
+                    self._created += 1
+            if can_create:
+                try:
+                    api = self._create_engine()
+                except Exception:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+            else:
+                api = self._idle.get()
+        try:
+            yield api
+        finally:
+            api.Clear()
+            self._idle.put(api)
+
+    def close(self):
+        """End all idle engines (engines currently borrowed are left alone)."""
+        while True:
+            try:
+                api = self._idle.get_nowait()
+            except Empty:
+                break
+            api.End()
+            with self._lock:
+                self._created -= 1
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_engine_pool(lang="hye-calfa-n", config="--psm 6"):
+    """Return the process-wide engine pool for a language/config, or None if unsupported."""
+    if TESSERACT_BACKEND != "tesserocr" or not TESSEROCR_AVAILABLE:
+        return None
+    parsed = _parse_config(config)
+    if parsed is None:
+        return None
+    key = (lang, config)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            psm, variables = parsed
+            pool = TesseractEnginePool(lang, psm=psm, variables=variables)
+            _pools[key] = pool
+        return pool
+
+
+def close_engine_pools():
+    """Release all pooled engines (e.g. before forking or at shutdown)."""
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.close()
+        _pools.clear()
+
+
+def _as_pil(image) -> Image.Image:
+    """Accept a PIL image or a uint8/bool NumPy array without touching the disk."""
+    if isinstance(image, Image.Image):
+        return image
+    if isinstance(image, np.ndarray):
+        return Image.fromarray(image)
+    raise TypeError(f"Unsupported image type for OCR: {type(image).__name__}")
+
+
+def run_tesseract(image, lang="hye-calfa-n", config="--psm 6") -> str:
+    image = _as_pil(image)
+    pool = get_engine_pool(lang, config)
+    with span("run_tesseract", backend="tesserocr" if pool is not None else "subprocess", size=image.size):
+        if pool is not None:
+            with pool.engine() as api:
+                api.SetImage(image)
+                return api.GetUTF8Text().strip()
+        return pytesseract.image_to_string(image, lang=lang, config=config).strip()
@@ -0,0 +1,144 @@
+import os
+import atexit
+import threading
+from pathlib import Path
+from multiprocessing import get_context, shared_memory
+from concurrent.futures import ProcessPoolExecutor, wait
+
+import numpy as np
+from PIL import Image
+
+from .ocr import run_tesseract, prepare_page, binarize_region
+from .tracing import span
+
+PLAIN_TEXT_CLASS = 1  # "plain text" in extract.id_to_names
+OCR_WORKERS_ENV = "HARATCH_OCR_WORKERS"
+
+
+def get_ocr_worker_count() -> int:
+    """
+    Number of OCR processes: HARATCH_OCR_WORKERS if set (e.g. a worker's share of
+    the machine, see runner.run_local_workers), else the physical cores available.
+    """
+    if os.environ.get(OCR_WORKERS_ENV):
+        return max(1, int(os.environ[OCR_WORKERS_ENV]))
+    count = None
+    try:
+        import psutil
+        count = psutil.cpu_count(logical=False)
+    except Exception:
+        pass
+    if hasattr(os, "sched_getaffinity"):
+        available = len(os.sched_getaffinity(0))
+        count = min(count, available) if count else available
+    return max(1, count or os.cpu_count() or 1)
+
+
+def _init_worker():
+    # Each worker runs a single Tesseract job at a time; keep OpenMP from
+    # spawning extra threads on top of the process-level parallelism.
+    os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+
+
+def _ocr_region(page_ref, index, bbox, lang, config, para_output=None):
+    """Worker: binarize a paragraph straight from the shared-memory grayscale page and OCR it."""
+    with span("ocr_region", paragraph=index, bbox=[int(v) for v in bbox]):
+        name, shape, dtype = page_ref
+        shm = shared_memory.SharedMemory(name=name)
+        try:
+            gray = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+            with span("binarize_region", paragraph=index):
+                enhanced = binarize_region(gray, bbox)
+            del gray
+        finally:
+            shm.close()
+
+        if para_output:
+            enhanced.save(Path(para_output) / f"paragraph_{index}.png")
+        return run_tesseract(enhanced, lang=lang, config=config)
+
+
+class SharedPage:
+    """A page array copied once into shared memory so workers can slice crops from it."""
+
+    def __init__(self, array: np.ndarray):
+        self._shm = shared_memory.SharedMemory(create=True, size=max(1, array.nbytes))
+        view = np.ndarray(array.shape, dtype=array.dtype, buffer=self._shm.buf)
+        view[...] = array
+        del view
+        self.ref = (self._shm.name, array.shape, array.dtype.str)
+
+    def close(self):
+        self._shm.close()
+        self._shm.unlink()
+
+
+class OcrStage:
+    """
+    Process pool that runs every paragraph crop of every page through one shared task queue,
+    so the number of concurrent Tesseract jobs never exceeds the worker count.
+    """
+
+    def __init__(self, max_workers: int = None, lang="hye-calfa-n", config="--psm 6"):
+        self.max_workers = max_workers or get_ocr_worker_count()
+        self.lang = lang
+        self.config = config
+        # "spawn" keeps torch/MPS state of the parent out of the workers.
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=get_context("spawn"),
+            initializer=_init_worker,
+        )
+
+    def ocr_page(self, page: Image.Image, boxes_p, classes_p, para_output=None):
+        """
+        OCR all plain-text boxes of a page.
+        Returns list of ((x1,y1,x2,y2), text) tuples, in detection order.
+        """
+        tasks = [
+            (i, tuple(float(v) for v in bbox))
+            for i, (cls, bbox) in enumerate(zip(classes_p, boxes_p))
+            if int(cls) == PLAIN_TEXT_CLASS
+        ]
+        if not tasks:
+            return []
+
+        # Grayscale once per page; workers only read their crop out of it.
+        shared = SharedPage(prepare_page(page))
+        futures = []
+        try:
+            for i, bbox in tasks:
+                future = self._executor.submit(
+                    _ocr_region, shared.ref, i, bbox, self.lang, self.config, para_output
+                )
+                futures.append((bbox, future))
+            return [(bbox, future.result().strip()) for bbox, future in futures]
+        finally:
+            # Workers must be done with the segment before it is unlinked.
+            wait([future for _, future in futures])
+            shared.close()
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+
+_stage = None
+_stage_lock = threading.Lock()
+
+
+def get_ocr_stage() -> OcrStage:
+    """Return the process-wide OCR stage, starting its workers on first use."""
+    global _stage
+    with _stage_lock:
+        if _stage is None:
+            _stage = OcrStage()
+            atexit.register(shutdown_ocr_stage)
+        return _stage
+
+
+def shutdown_ocr_stage():
+    global _stage
+    with _stage_lock:
+        if _stage is not None:
+            _stage.shutdown()
+            _stage = None
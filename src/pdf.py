@@ -1,6 +1,44 @@
+import os
+import math
+import time
+import weakref
+import threading
 import subprocess
 from pathlib import Path
+from typing import Callable, NamedTuple, Tuple
 from concurrent.futures import ThreadPoolExecutor, as_completed
+from PIL import Image
+
+from .cleanup import get_disk_budget
+from .tracing import span
+
+try:
+    import pypdfium2 as pdfium
+    import pypdfium2.raw as pdfium_c
+
+    PDFIUM_AVAILABLE = True
+except ImportError:
+    PDFIUM_AVAILABLE = False
+
+
+# "pdfium" renders in-process straight to memory, "pdftoppm" writes PNGs via subprocesses.
+PDF_RENDERER = os.environ.get(
+    "HARATCH_PDF_RENDERER", "pdfium" if PDFIUM_AVAILABLE else "pdftoppm"
+)
+RENDER_DPI = 300
+DETECT_SIZE = 1024  # Long side of the thumbnails used for layout detection (YOLO imgsz)
+
+# PDFium is not thread-safe: every call into it goes through this lock. Reentrant, since
+# a document may be closed by a finalizer that runs while the lock is held.
+_pdfium_lock = threading.RLock()
+
+
+class RasterPage(NamedTuple):
+    """A rasterized page: a small thumbnail for layout detection, full resolution on demand."""
+    path: Path  # page_N.png (only on disk when cached)
+    size: Tuple[int, int]  # full-resolution (width, height)
+    thumbnail: Image.Image
+    load: Callable[[], Image.Image]  # decodes the full-resolution RGB page
 
 
 def get_pdf_page_count(pdf_path: Path) -> int:
@@ -21,22 +59,26 @@ def get_pdf_page_count(pdf_path: Path) -> int:
 
 
 def convert_single_page(pdf_path: Path, output_path: Path, page_num: int):
-    """Convert a single page of a PDF to a PNG image."""
+    """Convert a single page of a PDF to a PNG image (waits while data/ is over budget)."""
+    budget = get_disk_budget()
+    budget.wait_for_space()
     try:
-        subprocess.run(
-            [
-                "pdftoppm", 
-                "-png", 
-                "-r", "300", 
-                "-f", str(page_num), 
-                "-l", str(page_num), 
-                "-singlefile", 
-                str(pdf_path), 
-                str(output_path.with_suffix(""))
-            ],
-            check=True,
-            capture_output=True
-        )
+        with span("rasterize_page", renderer="pdftoppm", page=page_num):
+            subprocess.run(
+                [
+                    "pdftoppm", 
+                    "-png", 
+                    "-r", "300", 
+                    "-f", str(page_num), 
+                    "-l", str(page_num), 
+                    "-singlefile", 
+                    str(pdf_path), 
+                    str(output_path.with_suffix(""))
+                ],
+                check=True,
+                capture_output=True
+            )
+        budget.record_write(output_path, evictable=True)
         return output_path
     except subprocess.CalledProcessError as e:
         print(f"[ERROR] Error converting page {page_num}: {e.stderr.decode()}")
@@ -79,3 +121,224 @@ def convert_pdf_pages(pdf_path: Path, output_dir: Path):
             res = future.result()
             if res:
                 yield res
+
+
+def make_thumbnail(image: Image.Image, max_side: int = DETECT_SIZE) -> Image.Image:
+    """Downscale an image so its long side is at most max_side pixels."""
+    scale = max_side / max(image.size)
+    if scale >= 1:
+        return image.convert("RGB")
+    size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+    return image.convert("RGB").resize(size, Image.Resampling.BILINEAR, reducing_gap=2.0)
+
+
+def png_raster_page(path: Path, image: Image.Image = None) -> RasterPage:
+    """
+    RasterPage backed by a PNG on disk; pass `image` if it is already decoded.
+    Only the thumbnail is kept: load() decodes the file again, so queued pages
+    never hold a full-resolution image.
+    """
+    if image is None:
+        with Image.open(path) as img:
+            image = img.convert("RGB")
+    return RasterPage(path, image.size, make_thumbnail(image), lambda: Image.open(path).convert("RGB"))
+
+
+def find_embedded_image(page):
+    """
+    Return the page's single embedded raster image object, or None if the page has
+    anything else on it (text, vectors, several images) or the image is rotated/flipped.
+    """
+    if page.get_rotation() != 0:
+        return None
+    objects = list(page.get_objects(max_depth=1))
+    if len(objects) != 1 or objects[0].type != pdfium_c.FPDF_PAGEOBJ_IMAGE:
+        return None
+    a, b, c, d, _, _ = objects[0].get_matrix().get()
+    if b != 0 or c != 0 or a <= 0 or d <= 0:
+        return None
+    return objects[0]
+
+
+def extract_embedded_image(page) -> Image.Image:
+    """
+    Return the page's single embedded raster image decoded at its native resolution,
+    or None for mixed-content pages.
+    """
+    embedded = find_embedded_image(page)
+    if embedded is None:
+        return None
+    return embedded.get_bitmap(render=False).to_pil()
+
+
+def _covers_page(image_obj, page, tolerance: float = 1.0) -> bool:
+    """Whether an image object spans the whole visible page (so page thumbnails match it)."""
+    left, bottom, right, top = image_obj.get_bounds()
+    c_left, c_bottom, c_right, c_top = page.get_cropbox()
+    return (
+        abs(left - c_left) <= tolerance and abs(bottom - c_bottom) <= tolerance
+        and abs(right - c_right) <= tolerance and abs(top - c_top) <= tolerance
+    )
+
+
+def summarize_render_report(report: dict) -> str:
+    """One-line summary of how pages were obtained, e.g. for logs."""
+    counts = {}
+    for source in report.get("pages", {}).values():
+        counts[source] = counts.get(source, 0) + 1
+    parts = []
+    for source, count in sorted(counts.items()):
+        seconds = report.get("seconds", {}).get(source, 0.0)
+        parts.append(f"{source}={count} ({seconds / count:.2f}s/page)")
+    return ", ".join(parts) or "no pages"
+
+
+def _record_source(report: dict, page_name: str, source: str, seconds: float):
+    report["pages"][page_name] = source
+    report["seconds"][source] = report["seconds"].get(source, 0.0) + seconds
+
+
+class _DocumentRefs:
+    """
+    Closes a PdfDocument once the renderer is done with it and every page loader
+    holding it has been dropped (loaders decode pages after rendering has moved on).
+    """
+
+    def __init__(self, pdf):
+        self.pdf = pdf
+        self._count = 1  # The renderer's own reference
+        self._lock = threading.Lock()
+
+    def attach(self, loader):
+        with self._lock:
+            self._count += 1
+        weakref.finalize(loader, self.release)
+        return loader
+
+    def release(self):
+        with self._lock:
+            self._count -= 1
+            if self._count:
+                return
+        with _pdfium_lock:
+            self.pdf.close()
+
+
+def _pdfium_loader(pdf, index: int, source: str, dpi: int, report: dict, page_name: str):
+    """Build the lazy full-resolution decoder for one page of an open document."""
+    def load() -> Image.Image:
+        started = time.perf_counter()
+        with span("load_page", page=page_name, source=source), _pdfium_lock:
+            page = pdf[index]
+            try:
+                if source == "extracted":
+                    image = extract_embedded_image(page)
+                else:
+                    image = page.render(scale=dpi / 72).to_pil()
+            finally:
+                page.close()
+            image = image.convert("RGB")
+            _record_source(report, page_name, source, time.perf_counter() - started)
+        return image
+
+    return load
+
+
+def render_pdf_pages(
+    pdf_path: Path,
+    output_dir: Path,
+    dpi: int = RENDER_DPI,
+    cache: bool = False,
+    extract_embedded: bool = True,
+    report: dict = None,
+):
+    """
+    Open the PDF once with pdfium and yield a RasterPage for every page.
+    Only a ~DETECT_SIZE px thumbnail is rendered up front; the full-resolution page
+    is decoded when RasterPage.load() is called for OCR. Scanned pages made of one
+    embedded image are decoded at native resolution, other pages rendered at `dpi`.
+    With cache=True the full page is decoded immediately and written as a PNG, and
+    already-cached PNGs are reused instead (resume).
+    If given, `report` is filled with {"pages": {name: source}, "seconds": {source: total}}
+    where source is "extracted", "rendered" or "cached".
+    """
+    if not PDFIUM_AVAILABLE:
+        raise RuntimeError("pypdfium2 is not installed, use convert_pdf_pages instead.")
+
+    if cache:
+        output_dir.mkdir(parents=True, exist_ok=True)
+    if report is None:
+        report = {}
+    report.setdefault("pages", {})
+    report.setdefault("seconds", {})
+
+    # The document stays open for as long as a page loader references it.
+    with _pdfium_lock:
+        pdf = pdfium.PdfDocument(str(pdf_path))
+        page_count = len(pdf)
+    refs = _DocumentRefs(pdf)
+    try:
+        if page_count == 0:
+            print(f"[WARNING] PDF {pdf_path.name} seems empty or unreadable.")
+            return
+
+        print(f"[INFO] Rasterizing {pdf_path.name} ({page_count} pages) in-process...")
+        for i in range(page_count):
+            page_path = output_dir / f"page_{i}.png"
+            started = time.perf_counter()
+            if page_path.exists():
+                try:
+                    raster = png_raster_page(page_path)
+                    with _pdfium_lock:
+                        _record_source(report, page_path.stem, "cached", time.perf_counter() - started)
+                    yield raster
+                    continue
+                except Exception as e:
+                    print(f"[WARNING] Ignoring unreadable cached {page_path.name}: {e}")
+
+            try:
+                with span("rasterize_page", renderer="pdfium", page=page_path.stem), _pdfium_lock:
+                    page = pdf[i]
+                    try:
+                        embedded = find_embedded_image(page) if extract_embedded else None
+                        if embedded is not None:
+                            source = "extracted"
+                            size = tuple(embedded.get_px_size())
+                        else:
+                            source = "rendered"
+                            size = (math.ceil(page.get_width() * dpi / 72), math.ceil(page.get_height() * dpi / 72))
+                        if embedded is not None and not _covers_page(embedded, page):
+                            thumbnail = make_thumbnail(embedded.get_bitmap(render=False).to_pil())
+                        else:
+                            thumb_scale = DETECT_SIZE / max(page.get_width(), page.get_height())
+                            thumbnail = page.render(scale=thumb_scale).to_pil().convert("RGB")
+                    finally:
+                        page.close()
+                    _record_source(report, page_path.stem, source, time.perf_counter() - started)
+            except Exception as e:
+                print(f"[ERROR] Error rasterizing page {i + 1}: {e}")
+                continue
+
+            load = refs.attach(_pdfium_loader(pdf, i, source, dpi, report, page_path.stem))
+            if cache:
+                get_disk_budget().wait_for_space()
+                image = load()
+                image.save(page_path)
+                get_disk_budget().record_write(page_path, evictable=True)
+                yield png_raster_page(page_path, image)
+            else:
+                yield RasterPage(page_path, size, thumbnail, load)
+    finally:
+        refs.release()
+
+
+def stream_pdf_pages(pdf_path: Path, output_dir: Path, cache_images: bool = False, report: dict = None):
+    """
+    Yield RasterPages using the configured renderer. pdftoppm always goes through
+    PNGs on disk; pdfium keeps pages in memory unless cache_images is set.
+    """
+    if PDF_RENDERER == "pdfium" and PDFIUM_AVAILABLE:
+        yield from render_pdf_pages(pdf_path, output_dir, cache=cache_images, report=report)
+        return
+    for page_path in convert_pdf_pages(pdf_path, output_dir):
+        yield png_raster_page(page_path)
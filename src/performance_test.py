@@ -3,15 +3,15 @@ import torch
 import json
 from pathlib import Path
 from PIL import Image
-from doclayout_yolo import YOLOv10
 from torchvision.ops import nms
 from src.extract import DEVICE, id_to_names, enhance_and_binarize
-from src.ocr import run_tesseract
+from src.detector import get_layout_model, get_model_timings
+from src.ocr import run_tesseract, verify_binarize_parity
 
 def run_performance_test(image_dir: Path):
     print(f"Loading model on {DEVICE}...")
     torch.set_grad_enabled(False)
-    model = YOLOv10("models/DocLayout-YOLO-DocStructBench/doclayout_yolo_docstructbench_imgsz1024.pt").to(DEVICE)
+    model = get_layout_model()
     # model.eval() and model.fuse() removed as they cause unexpected dataset loading in this environment
 
     image_paths = sorted(list(image_dir.glob("*.png")))[:5]
@@ -22,7 +22,8 @@ def run_performance_test(image_dir: Path):
     stats = {
         "total_time": 0.0,
         "total_paragraphs": 0,
-        "pages_processed": 0
+        "pages_processed": 0,
+        "parity_failures": 0,
     }
 
     print(f"Starting performance test on {len(image_paths)} images...")
@@ -47,6 +48,11 @@ def run_performance_test(image_dir: Path):
             stats["pages_processed"] += 1
             print(f"  Done in {duration:.2f}s ({len(results)} paragraphs)")
 
+            # Fused preprocessing must stay bit-identical to enhance_and_binarize
+            page = Image.open(img_path).convert("RGB")
+            if not verify_binarize_parity(page, [bbox for bbox, _ in results]):
+                stats["parity_failures"] += 1
+
     except KeyboardInterrupt:
         print("\nInterrupted. Printing partial results...")
 
@@ -56,6 +62,8 @@ def run_performance_test(image_dir: Path):
         print(f"Total paragraphs: {stats['total_paragraphs']}")
         print(f"Total time spent: {stats['total_time']:.2f}s")
         print(f"Average per page: {stats['total_time']/stats['pages_processed']:.2f}s")
+        print(f"Preprocessing parity failures: {stats['parity_failures']}")
+        print(f"Model load/warm-up: {get_model_timings()}")
     else:
         print("No pages processed.")
 
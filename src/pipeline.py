@@ -2,15 +2,19 @@ from pathlib import Path
 from typing import List, Dict, Any
 import json
 from PIL import Image
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from queue import Queue
+from queue import Queue, Empty
 import threading
+import time
 from doclayout_yolo import YOLOv10
 
 from .download import download_issue
-from .pdf import convert_pdf_pages, get_pdf_page_count
+from .pdf import convert_pdf_pages, stream_pdf_pages, get_pdf_page_count, summarize_render_report, RasterPage
 from .extract import extract_paragraphs_and_lines, DEVICE
-from .translate import translate_paragraph
+from .detector import get_layout_model
+from .detection_server import get_detection_client
+from .ocr_stage import get_ocr_stage, OcrStage
+from .layout_cache import LayoutCache, download_cached_layouts
+from .translation_stage import TranslationStage, translate_pages, get_translation_dir
 import datetime
 from .paths import get_issue_id, get_pdf_path, get_image_dir, get_ocr_dir, get_output_dir
 
@@ -25,7 +29,13 @@ def convert_pdf_task(pdf_path: Path, image_dir: Path) -> List[Path]:
     return convert_pdf_pages(pdf_path, image_dir)
 
 
-from .gcs import get_gcs_client, BUCKET_NAME, blob_exists, update_runner_status
+from .gcs import get_gcs_client, BUCKET_NAME, build_issue_manifest, download_cached_pages
+from .sync_gcs import notify_written
+from .status import get_status_publisher
+from .cleanup import get_disk_budget, evict_page_image
+from .results import IssueResultWriter, write_page_json, get_index_path, get_results_path
+from .tracing import span, counter
+from .metrics import watch_queue
 
 def _update_live_ocr_status(issue_id: str, page_name: str, json_data: Dict[str, Any]):
     """Helper to update the runner status with the full Armenian text from a page."""
@@ -38,9 +48,8 @@ def _update_live_ocr_status(issue_id: str, page_name: str, json_data: Dict[str,
             full_text = full_text[:3000] + "... (truncated)"
 
         if full_text:
-            client = get_gcs_client()
-            update_runner_status(
-                client, 
+            # Only merged in memory; the publisher thread uploads it at a bounded rate
+            get_status_publisher().publish(
                 status=f"processing {issue_id}", 
                 latest_ocr=full_text,
                 current_page=page_name,
@@ -49,10 +58,33 @@ def _update_live_ocr_status(issue_id: str, page_name: str, json_data: Dict[str,
     except Exception as e:
         print(f"[STATUS] Failed to update OCR snippet: {e}")
 
-def process_page_task(page_path: Path, output_dir: Path, model: YOLOv10 = None, issue_id: str = None, inference_lock: threading.Lock = None) -> Dict[str, Any]:
+def load_issue_manifest(issue_id: str) -> Dict[str, Any]:
+    """GCS manifest of ocr/<issue>/ (one listing), or an empty one if GCS is unreachable."""
+    try:
+        bucket = get_gcs_client().bucket(BUCKET_NAME)
+        return build_issue_manifest(bucket, issue_id)
+    except Exception as e:
+        print(f"[CLOUD] Could not list cached OCR for {issue_id}: {e}")
+        return {}
+
+
+def _download_cached_page(manifest: Dict[str, Any], page_stem: str, output_path: Path):
+    """Fetch one page JSON listed in the manifest and save it locally. None if not cached."""
+    blob = manifest.get(f"{page_stem}.json")
+    if blob is None:
+        return None
+    print(f"[CLOUD] Downloading cached OCR for {page_stem} from GCS...")
+    json_data = json.loads(blob.download_as_text())
+    # Save locally for future speed
+    write_page_json(json_data, output_path)
+    get_disk_budget().record_write(output_path)
+    return json_data
+
+
+def process_page_task(page_path: Path, output_dir: Path, model: YOLOv10 = None, issue_id: str = None, inference_lock: threading.Lock = None, manifest: Dict[str, Any] = None) -> Dict[str, Any]:
     """
     Process a single page for OCR extraction.
-    Checks for existing JSON locally and on GCS to support resuming.
+    Checks for existing JSON locally and in the issue's GCS manifest to support resuming.
     """
     output_path = output_dir / f"{page_path.stem}.json"
     
@@ -67,19 +99,10 @@ def process_page_task(page_path: Path, output_dir: Path, model: YOLOv10 = None,
 
     # 2. GCS Cache Check (Statelessness)
     if issue_id:
-        client = get_gcs_client()
-        bucket = client.get_bucket(BUCKET_NAME)
-        blob_name = f"ocr/{issue_id}/{page_path.stem}.json"
-        if blob_exists(bucket, blob_name):
-            print(f"[CLOUD] Downloading cached OCR for {page_path.name} from GCS...")
-            blob = bucket.blob(blob_name)
-            content = blob.download_as_text()
-            json_data = json.loads(content)
-            # Save locally for future speed
-            output_path.parent.mkdir(parents=True, exist_ok=True)
-            with output_path.open("w", encoding="utf-8") as f:
-                json.dump(json_data, f, ensure_ascii=False, indent=2)
-            
+        if manifest is None:
+            manifest = load_issue_manifest(issue_id)
+        json_data = _download_cached_page(manifest, page_path.stem, output_path)
+        if json_data is not None:
             _update_live_ocr_status(issue_id, page_path.stem, json_data)
             return json_data
 
@@ -104,9 +127,8 @@ def process_page_task(page_path: Path, output_dir: Path, model: YOLOv10 = None,
         json_data["paragraphs"].append({"bbox": int_bbox, "hye": text.strip()})
 
     # Save individual page result
-    output_path.parent.mkdir(parents=True, exist_ok=True)
-    with output_path.open("w", encoding="utf-8") as f:
-        json.dump(json_data, f, ensure_ascii=False, indent=2)
+    write_page_json(json_data, output_path)
+    notify_written(output_path)
 
     # Update status with latest OCR snippet (Armenian)
     if issue_id:
@@ -118,51 +140,19 @@ def process_page_task(page_path: Path, output_dir: Path, model: YOLOv10 = None,
 def translate_page_task(
     page_data: Dict[str, Any], min_length: int = 200
 ) -> Dict[str, Any]:
-    """Translate Armenian text to French for a single page."""
-    translated = {"metadata": page_data["metadata"], "paragraphs": []}
-
-    for para in page_data["paragraphs"]:
-        if len(para["hye"]) >= min_length:
-            try:
-                fr_text = translate_paragraph(para["hye"])
-                # Skip placeholder translation results
-                if fr_text and not fr_text.startswith("["):
-                    translated["paragraphs"].append(
-                        {
-                            "bbox": para["bbox"],
-                            "original": para["hye"],
-                            "translated": fr_text,
-                        }
-                    )
-                else:
-                    # Translation not available (no API key, etc)
-                    translated["paragraphs"].append(
-                        {
-                            "bbox": para["bbox"],
-                            "original": para["hye"],
-                            "translated": None,
-                        }
-                    )
-            except Exception as e:
-                # If translation fails, keep original text without translation
-                translated["paragraphs"].append(
-                    {
-                        "bbox": para["bbox"],
-                        "original": para["hye"],
-                        "translated": None,
-                    }
-                )
-        else:
-            # Keep short paragraphs without translation
-            translated["paragraphs"].append(
-                {
-                    "bbox": para["bbox"],
-                    "original": para["hye"],
-                    "translated": None,
-                }
-            )
-
-    return translated
+    """Translate Armenian text to French for a single page (one batched call per page)."""
+    try:
+        return translate_pages([page_data], min_length)[0][0]
+    except Exception as e:
+        # If translation fails, keep original text without translation
+        print(f"[ERROR] Page translation failed: {e}")
+        return {
+            "metadata": page_data["metadata"],
+            "paragraphs": [
+                {"bbox": para["bbox"], "original": para["hye"], "translated": None}
+                for para in page_data["paragraphs"]
+            ],
+        }
 
 
 def process_single_page_task(
@@ -173,10 +163,13 @@ def process_single_page_task(
     min_translation_length: int = 200,
     issue_id: str = None,
     inference_lock: threading.Lock = None,
+    manifest: Dict[str, Any] = None,
 ) -> Dict[str, Any]:
     """Process a single page for OCR and optionally translation."""
     # Process page for OCR (passing issue_id for GCS check)
-    page_data = process_page_task(page_path, ocr_dir, model=model, issue_id=issue_id, inference_lock=inference_lock)
+    page_data = process_page_task(
+        page_path, ocr_dir, model=model, issue_id=issue_id, inference_lock=inference_lock, manifest=manifest
+    )
 
     # Translate if requested
     if include_translation:
@@ -186,22 +179,34 @@ def process_single_page_task(
 
 
 def save_final_results_task(
-    issue_id: str, pages_data: List[Dict[str, Any]], output_dir: Path
+    issue_id: str, result_writer: IssueResultWriter, ocr_dir: Path, page_count: int
 ) -> Dict[str, Any]:
-    """Save the final results for the entire issue."""
-    final_results = {
-        "issue": issue_id,
-        "pages": pages_data,
-        "total_pages": len(pages_data),
-    }
-
-    output_path = output_dir / f"{issue_id}_complete.json"
-    output_path.parent.mkdir(parents=True, exist_ok=True)
+    """
+    Finish the streamed results of an issue: pages that never went through the
+    writer (local cache hits) are appended from their page JSONs, then the offset
+    index is written. Returns a summary; the pages stay on disk.
+    """
+    for i in range(page_count):
+        if i in result_writer.offsets:
+            continue
+        page_json = ocr_dir / f"page_{i}.json"
+        if page_json.exists():
+            with page_json.open("r", encoding="utf-8") as f:
+                result_writer.add_page(i, json.load(f))
+        else:
+            print(f"[WARNING] Missing OCR result for page_{i}")
 
-    with output_path.open("w", encoding="utf-8") as f:
-        json.dump(final_results, f, ensure_ascii=False, indent=2)
+    index_path = result_writer.close(page_count)
+    for path in (result_writer.path, index_path):
+        get_disk_budget().record_write(path)
+        notify_written(path)
 
-    return final_results
+    return {
+        "issue": issue_id,
+        "total_pages": len(result_writer.offsets),
+        "results": str(result_writer.path),
+        "index": str(index_path),
+    }
 
 
 def save_metadata_task(issue_id: str, page_count: int, output_dir: Path):
@@ -215,17 +220,74 @@ def save_metadata_task(issue_id: str, page_count: int, output_dir: Path):
     output_path.parent.mkdir(parents=True, exist_ok=True)
     with output_path.open("w", encoding="utf-8") as f:
         json.dump(metadata, f, ensure_ascii=False, indent=2)
+    get_disk_budget().record_write(output_path)
+    notify_written(output_path)
     return metadata
 
 
+def save_render_report_task(issue_id: str, report: Dict[str, Any], output_dir: Path):
+    """Save how each page was rasterized (embedded image extraction vs rendering)."""
+    print(f"[INFO] Rasterization for {issue_id}: {summarize_render_report(report)}")
+    report = {"issue": issue_id, **report}
+    output_path = output_dir / "render_report.json"
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with output_path.open("w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    get_disk_budget().record_write(output_path)
+    notify_written(output_path)
+    return report
+
+
+def page_entry_path(entry) -> Path:
+    """Path of a rasterized page entry (a PNG path or a RasterPage)."""
+    return entry.path if isinstance(entry, RasterPage) else entry
+
+
+def page_number(page_path: Path) -> int:
+    """page_12.png -> 12"""
+    return int(Path(page_path).stem.rsplit("_", 1)[1])
+
+
+def collect_batch(source: Queue, max_size: int, timeout: float):
+    """
+    Take up to `max_size` items from `source`, flushing early once `timeout` seconds
+    have passed since the first item arrived.
+    Returns (batch, finished); finished is True once the None end-of-stream marker was seen.
+    """
+    first = source.get()
+    if first is None:
+        return [], True
+    batch = [first]
+    deadline = time.monotonic() + timeout
+    while len(batch) < max_size:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        try:
+            item = source.get(timeout=remaining)
+        except Empty:
+            break
+        if item is None:
+            return batch, True
+        batch.append(item)
+    return batch, False
+
+
 def ocr_pipeline(
     year: int,
     month: int,
     include_translation: bool = False,
     min_translation_length: int = 200,
+    cache_images: bool = False,
 ) -> Dict[str, Any]:
     """
-    Optimized OCR pipeline that overlaps PDF conversion and AI processing.
+    Staged OCR pipeline: rasterize -> detect -> OCR -> write, connected by bounded
+    queues so every stage runs concurrently with the others.
+    With the pdfium renderer pages stay in memory; cache_images also writes
+    them as PNGs so an interrupted issue can resume without re-rendering.
+    Each page PNG is evicted as soon as its OCR JSON is safely on disk.
+    With include_translation, translation finishes in the background after the
+    issue returns; wait_for_translations() joins it.
     """
     issue_id = get_issue_id(year, month)
 
@@ -234,11 +296,17 @@ def ocr_pipeline(
     ocr_dir = get_ocr_dir(year, month)
     output_dir = get_output_dir(year, month)
     
-    final_output_path = output_dir / f"{issue_id}_complete.json"
-    if final_output_path.exists():
-        print(f"[OK] Issue {issue_id} is already complete. Loading results...")
-        with final_output_path.open("r", encoding="utf-8") as f:
-            return json.load(f)
+    index_path = get_index_path(output_dir, issue_id)
+    if index_path.exists():
+        print(f"[OK] Issue {issue_id} is already complete: {get_results_path(output_dir, issue_id)}")
+        with index_path.open("r", encoding="utf-8") as f:
+            index = json.load(f)
+        return {
+            "issue": issue_id,
+            "total_pages": len(index["pages"]),
+            "results": str(get_results_path(output_dir, issue_id)),
+            "index": str(index_path),
+        }
 
     # Step 1: Download PDF
     pdf_path = download_issue_task(year, month)
@@ -249,161 +317,334 @@ def ocr_pipeline(
         save_metadata_task(issue_id, page_count, ocr_dir)
         save_metadata_task(issue_id, page_count, output_dir)
 
-        print("[INIT] Initializing Layout Detection Model on DEVICE...")
+        # One listing of ocr/<issue>/ on GCS; pages already there are fetched in parallel
+        # so the pipeline below only has to look at the local cache.
+        manifest = load_issue_manifest(issue_id)
+        download_cached_pages(manifest, ocr_dir)
+        download_cached_layouts(manifest, ocr_dir)
+
         import torch
         # Global disable gradients for the entire session
         torch.set_grad_enabled(False)
 
-        model = YOLOv10(
-            "models/DocLayout-YOLO-DocStructBench/doclayout_yolo_docstructbench_imgsz1024.pt"
-        ).to(DEVICE)
+        # Loaded and warmed up once per process, shared across issues;
+        # with a detection server, every pipeline on the machine shares its model instead
+        model = get_detection_client() or get_layout_model()
         
-        BATCH_SIZE = 8  # Process 8 pages per YOLO batch
-        max_workers = 8  # For parallel Tesseract across pages
+        BATCH_SIZE = 8  # Max pages per YOLO batch
+        BATCH_TIMEOUT = 2.0  # Flush a partial batch after this many seconds
+        max_workers = 8  # Pages in flight; Tesseract concurrency is bounded by the OCR stage
+        ocr_stage = get_ocr_stage()
         
-        print(f"[PROCESS] Starting batched YOLO pipeline for {issue_id} (batch_size={BATCH_SIZE})...")
+        print(
+            f"[PROCESS] Starting staged pipeline for {issue_id} "
+            f"(batch_size={BATCH_SIZE}, ocr_workers={ocr_stage.max_workers})..."
+        )
         
-        image_queue = Queue(maxsize=20)  # Buffer 20 images in memory
+        # Bounded queues between stages: rasterize -> detect -> OCR -> write.
+        # A full queue blocks the stage upstream of it (backpressure).
+        image_queue = Queue(maxsize=20)  # Buffer 20 page thumbnails in memory
+        detection_queue = Queue(maxsize=max_workers)
+        write_queue = Queue(maxsize=2 * max_workers)
+        # Sampled on every metrics scrape, so drained queues read 0
+        watch_queue("image_queue", image_queue)
+        watch_queue("detection_queue", detection_queue)
+        watch_queue("write_queue", write_queue)
+        render_report = {}  # page -> "extracted" | "rendered" | "cached" (pdfium only)
+        disk_budget = get_disk_budget()
+        # Page results are streamed into <issue>_complete.jsonl as they arrive
+        result_writer = IssueResultWriter(output_dir, issue_id)
+        # Detections are kept per page, so reruns (and reocr) can skip the detector
+        layout_cache = LayoutCache(ocr_dir)
+        # Translation runs beside OCR and never blocks it (pages are offered, not queued)
+        translation_stage = None
+        if include_translation:
+            translation_stage = TranslationStage(
+                issue_id, ocr_dir, output_dir, min_length=min_translation_length
+            ).start()
         
+        # Set when the detector stops early, so the producer does not block on a queue nobody reads
+        stop_producer = threading.Event()
+
         def producer():
-            """Producer: Convert PDF pages to PNGs and put paths in the queue."""
+            """Producer: Rasterize PDF pages and put them (paths or decoded pages) in the queue."""
+            image_stream = None
             try:
-                image_stream = convert_pdf_pages(pdf_path, image_dir)
-                for img_path in image_stream:
-                    image_queue.put(img_path)
-                # Signal end of stream
-                image_queue.put(None)
+                image_stream = stream_pdf_pages(
+                    pdf_path, image_dir, cache_images=cache_images, report=render_report
+                )
+                for page in image_stream:
+                    if stop_producer.is_set():
+                        print("[PRODUCER] Detector stopped, abandoning the rest of the PDF.")
+                        break
+                    if Path(page_entry_path(page)).exists():
+                        # On-disk pages (fresh or resumed) are freed again after OCR
+                        disk_budget.record_write(page_entry_path(page), evictable=True)
+                    image_queue.put(page)
+                    counter("image_queue", depth=image_queue.qsize())
                 print("[PRODUCER] PDF conversion finished.")
             except Exception as e:
                 print(f"[ERROR] Producer failed: {e}")
+            finally:
+                if image_stream is not None:
+                    image_stream.close()  # Releases the PDF document when stopped early
+                # Signal end of stream
                 image_queue.put(None)
 
-        # Start producer thread
-        threading.Thread(target=producer, daemon=True).start()
-        
         # Import batch functions
-        from .extract import batch_yolo_detect, process_single_detection
+        from .extract import batch_yolo_detect, process_single_detection, load_page_image
         
-        def process_batch_ocr(page_img, boxes, classes, page_path, ocr_dir, issue_id):
-            """Process a single page's OCR after YOLO detection."""
+        def process_batch_ocr(page, boxes, classes, page_path, ocr_dir, issue_id):
+            """
+            Process a single page's OCR after YOLO detection.
+            The full-resolution page is only decoded here, once cached results are ruled out.
+            Returns (json_data, is_new); new results still have to be written.
+            """
             output_path = ocr_dir / f"{page_path.stem}.json"
             
             # Check local cache
             if output_path.exists():
                 print(f"[OK] Loading local cached OCR for {page_path.name}")
                 with output_path.open("r", encoding="utf-8") as f:
-                    return json.load(f)
+                    return json.load(f), False
             
-            # Check GCS cache
-            if issue_id:
-                client = get_gcs_client()
-                bucket = client.get_bucket(BUCKET_NAME)
-                blob_name = f"ocr/{issue_id}/{page_path.stem}.json"
-                if blob_exists(bucket, blob_name):
-                    print(f"[CLOUD] Downloading cached OCR for {page_path.name} from GCS...")
-                    blob = bucket.blob(blob_name)
-                    content = blob.download_as_text()
-                    json_data = json.loads(content)
-                    output_path.parent.mkdir(parents=True, exist_ok=True)
-                    with output_path.open("w", encoding="utf-8") as f:
-                        json.dump(json_data, f, ensure_ascii=False, indent=2)
-                    return json_data
+            # Check GCS cache (in-memory manifest; normally already downloaded above)
+            json_data = _download_cached_page(manifest, page_path.stem, output_path)
+            if json_data is not None:
+                return json_data, False
             
             print(f"[INFO] Running OCR on {page_path.name}...")
+            page_img = load_page_image(page)
             width, height = page_img.size
             
-            # Run Tesseract on paragraphs (already parallelized inside)
-            results = process_single_detection(page_img, boxes, classes)
+            # Run Tesseract on paragraphs through the shared OCR process pool
+            results = process_single_detection(page_img, boxes, classes, ocr_stage=ocr_stage)
             
             json_data = {"metadata": {"width": width, "height": height}, "paragraphs": []}
             for bbox, text in results:
                 int_bbox = list(map(int, bbox))
                 json_data["paragraphs"].append({"bbox": int_bbox, "hye": text.strip()})
             
-            # Save individual page result
-            output_path.parent.mkdir(parents=True, exist_ok=True)
-            with output_path.open("w", encoding="utf-8") as f:
-                json.dump(json_data, f, ensure_ascii=False, indent=2)
-            
-            # Update status
-            if issue_id:
-                _update_live_ocr_status(issue_id, page_path.stem, json_data)
-            
-            return json_data
-        
-        # Step 3b: Batched Consumer - Collect images, batch YOLO, parallel OCR
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            batch = []
-            done = False
-            
-            while not done:
-                # Collect a batch of images
-                while len(batch) < BATCH_SIZE:
-                    img_path = image_queue.get()
-                    if img_path is None:
-                        done = True
-                        break
-                    batch.append(img_path)
-                
-                if not batch:
-                    break
-                
-                # Run batched YOLO detection
-                print(f"[YOLO] Batch detecting {len(batch)} pages...")
-                detections = batch_yolo_detect(batch, model)
-                
-                # Submit OCR tasks in parallel for all detections
-                futures = []
-                for (page_path, page_img, boxes, classes) in detections:
-                    future = executor.submit(
-                        process_batch_ocr,
-                        page_img, boxes, classes, Path(page_path), ocr_dir, issue_id
-                    )
-                    futures.append(future)
-                
-                # Wait for this batch to complete before next
-                for future in as_completed(futures):
+            return json_data, True
+
+        def detector():
+            """Detect stage: dynamic YOLO batches, flushed on size or timeout."""
+            try:
+                finished = False
+                while not finished:
+                    batch, finished = collect_batch(image_queue, BATCH_SIZE, BATCH_TIMEOUT)
+                    # Pages with a local OCR result need neither detection nor OCR
+                    pending = []
+                    for page in batch:
+                        page_path = Path(page_entry_path(page))
+                        if (ocr_dir / f"{page_path.stem}.json").exists():
+                            evict_page_image(page_path)
+                        else:
+                            pending.append(page)
+                    batch = pending
+                    if not batch:
+                        continue
+                    print(f"[YOLO] Batch detecting {len(batch)} pages...")
+                    for detection in batch_yolo_detect(batch, model, layout_cache=layout_cache):
+                        detection_queue.put(detection)
+                        counter("detection_queue", depth=detection_queue.qsize())
+            except Exception as e:
+                print(f"[ERROR] Detector failed: {e}")
+            finally:
+                # Unblock a producer waiting on a full queue; it stops at its next page
+                stop_producer.set()
+                while True:
                     try:
-                        future.result()
-                    except Exception as e:
-                        print(f"[ERROR] Page processing failed: {e}")
-                
-                # Clear batch for next iteration
-                batch = []
+                        image_queue.get_nowait()
+                    except Empty:
+                        break
+                for _ in range(max_workers):
+                    detection_queue.put(None)
+
+        def ocr_worker():
+            """OCR stage: one page at a time; paragraphs fan out to the OCR process pool."""
+            while True:
+                detection = detection_queue.get()
+                if detection is None:
+                    return
+                page_path, page, boxes, classes = detection
+                page_path = Path(page_path)
+                try:
+                    with span("ocr_page", issue=issue_id, page=page_path.stem) as page_span:
+                        json_data, is_new = process_batch_ocr(
+                            page, boxes, classes, page_path, ocr_dir, issue_id
+                        )
+                        page_span.set(paragraphs=len(json_data["paragraphs"]), cached=not is_new)
+                    if is_new:
+                        write_queue.put((page_path, json_data))
+                    else:
+                        result_writer.add_page(page_number(page_path), json_data)
+                        evict_page_image(page_path)
+                        if translation_stage:
+                            translation_stage.offer(page_path.stem, json_data)
+                except Exception as e:
+                    print(f"[ERROR] Page processing failed for {page_path.name}: {e}")
+
+        def writer():
+            """Write stage: persist page results and publish the live status."""
+            while True:
+                item = write_queue.get()
+                if item is None:
+                    return
+                page_path, json_data = item
+                try:
+                    output_path = ocr_dir / f"{page_path.stem}.json"
+                    # Durable write: once the JSON is in place the PNG can go
+                    with span("write_page", issue=issue_id, page=page_path.stem):
+                        write_page_json(json_data, output_path, durable=True)
+                    disk_budget.record_write(output_path)
+                    notify_written(output_path)
+                    result_writer.add_page(page_number(page_path), json_data)
+                    evict_page_image(page_path)
+                    if translation_stage:
+                        translation_stage.offer(page_path.stem, json_data)
+                    if issue_id:
+                        _update_live_ocr_status(issue_id, page_path.stem, json_data)
+                except Exception as e:
+                    print(f"[ERROR] Failed to write OCR result for {page_path.name}: {e}")
+
+        # Step 3: Start all stages; detection of batch N+1 overlaps OCR of batch N
+        stage_threads = [
+            threading.Thread(target=producer, name="rasterize", daemon=True),
+            threading.Thread(target=detector, name="detect", daemon=True),
+        ]
+        ocr_threads = [
+            threading.Thread(target=ocr_worker, name=f"ocr-{i}", daemon=True)
+            for i in range(max_workers)
+        ]
+        writer_thread = threading.Thread(target=writer, name="write", daemon=True)
+        for t in stage_threads + ocr_threads + [writer_thread]:
+            t.start()
+
+        for t in ocr_threads:
+            t.join()
+        write_queue.put(None)
+        writer_thread.join()
+        for t in stage_threads:
+            t.join()
+
+        if render_report.get("pages"):
+            save_render_report_task(issue_id, render_report, output_dir)
+
+        if translation_stage:
+            # OCR is done; translation catches up on deferred and cached pages without
+            # holding up the issue (see wait_for_translations)
+            translation_stage.finish_in_background(page_count)
 
     finally:
         # Step 4: Cleanup PDF now that we have all PNGs (or if conversion failed)
         if pdf_path.exists():
             print(f"[CLEANUP] Deleting source PDF: {pdf_path.name}")
-            pdf_path.unlink()
-
-    # Re-list images to maintain consistent order in the final JSON
-    # This ensures page_0.json, page_1.json sequence
-    final_image_paths = sorted(list(image_dir.glob("page_*.png")))
-    pages_data = []
-    for p in final_image_paths:
-        page_json = ocr_dir / f"{p.stem}.json"
-        if page_json.exists():
-            with page_json.open("r", encoding="utf-8") as f:
-                pages_data.append(json.load(f))
-        else:
-            print(f"[WARNING] Missing OCR result for {p.name}")
+            get_disk_budget().remove(pdf_path)
 
-    # Step 5: Save final results
-    final_results = save_final_results_task(issue_id, pages_data, output_dir)
+    # Step 5: Complete the streamed results (cached pages + offset index)
+    final_results = save_final_results_task(issue_id, result_writer, ocr_dir, page_count)
 
     return final_results
 
 
-def simple_ocr_pipeline(year: int, month: int) -> Dict[str, Any]:
+def reocr_pipeline(
+    year: int, month: int, lang: str = "hye-calfa-n", config: str = "--psm 6", cache_images: bool = False
+) -> Dict[str, Any]:
+    """
+    Re-run Tesseract on an issue from its cached layouts only: pages are rasterized
+    again but never go through layout detection. Page JSONs are replaced and the
+    issue results rebuilt; pages without a layout record (or whose rasterized size
+    no longer matches it) keep their previous OCR. Translations of replaced pages are
+    dropped, so the next translation run or backfill redoes them from the new text.
+    """
+    from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+    from .extract import process_single_detection, load_page_image
+
+    issue_id = get_issue_id(year, month)
+    image_dir = get_image_dir(year, month)
+    ocr_dir = get_ocr_dir(year, month)
+    output_dir = get_output_dir(year, month)
+    translation_dir = get_translation_dir(output_dir)
+
+    download_cached_layouts(load_issue_manifest(issue_id), ocr_dir)
+    layout_cache = LayoutCache(ocr_dir)
+    if not layout_cache.layout_dir.exists() or not any(layout_cache.layout_dir.glob("page_*.json")):
+        print(f"[REOCR] No cached layouts for {issue_id}, run the full pipeline first.")
+        return {"issue": issue_id, "reocr": 0}
+
+    pdf_path = download_issue_task(year, month)
+    stats = {"reocr": 0, "no_layout": 0, "size_mismatch": 0, "failed": 0}
+    max_workers = 8  # Pages in flight, as in ocr_pipeline
+    ocr_stage = OcrStage(lang=lang, config=config)
+    result_writer = IssueResultWriter(output_dir, issue_id)
+    disk_budget = get_disk_budget()
+    print(f"[REOCR] Re-running OCR on {issue_id} from cached layouts (lang={lang}, config={config!r})...")
+
+    def reocr_page(page):
+        """Returns the key of `stats` to count the page under."""
+        page_path = Path(page_entry_path(page))
+        record = layout_cache.load(page_path.stem)
+        if record is None:
+            return "no_layout"
+        page_img = load_page_image(page)
+        if list(page_img.size) != record["page_size"]:
+            print(f"[WARNING] {page_path.stem}: page is {page_img.size}, layout was {record['page_size']}; skipped")
+            return "size_mismatch"
+        with span("reocr_page", issue=issue_id, page=page_path.stem):
+            results = process_single_detection(page_img, record["boxes"], record["classes"], ocr_stage=ocr_stage)
+        width, height = page_img.size
+        json_data = {"metadata": {"width": width, "height": height}, "paragraphs": []}
+        for bbox, text in results:
+            json_data["paragraphs"].append({"bbox": list(map(int, bbox)), "hye": text.strip()})
+
+        output_path = ocr_dir / f"{page_path.stem}.json"
+        write_page_json(json_data, output_path, durable=True)
+        disk_budget.record_write(output_path)
+        notify_written(output_path)
+        # The translation checkpoint was made from the old text
+        disk_budget.remove(translation_dir / f"{page_path.stem}.json")
+        result_writer.add_page(page_number(page_path), json_data)
+        evict_page_image(page_path)
+        return "reocr"
+
+    try:
+        page_count = get_pdf_page_count(pdf_path)
+        futures, in_flight = {}, set()
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for page in stream_pdf_pages(pdf_path, image_dir, cache_images=cache_images):
+                if len(in_flight) >= max_workers:
+                    # Bounded like the staged pipeline: rasterize only as fast as OCR keeps up
+                    _, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                future = executor.submit(reocr_page, page)
+                futures[future] = Path(page_entry_path(page)).name
+                in_flight.add(future)
+        for future, name in futures.items():
+            try:
+                stats[future.result()] += 1
+            except Exception as e:
+                print(f"[ERROR] Re-OCR failed for {name}: {e}")
+                stats["failed"] += 1
+    finally:
+        ocr_stage.shutdown()
+        if pdf_path.exists():
+            get_disk_budget().remove(pdf_path)
+
+    final_results = save_final_results_task(issue_id, result_writer, ocr_dir, page_count)
+    print(f"[REOCR] {issue_id}: {stats}")
+    return {**final_results, **stats}
+
+
+def simple_ocr_pipeline(year: int, month: int, cache_images: bool = False) -> Dict[str, Any]:
     """
     Simple OCR pipeline without translation for faster processing.
     """
-    return ocr_pipeline(year, month, include_translation=False)
+    return ocr_pipeline(year, month, include_translation=False, cache_images=cache_images)
 
 
-def full_ocr_pipeline(year: int, month: int) -> Dict[str, Any]:
+def full_ocr_pipeline(year: int, month: int, cache_images: bool = False) -> Dict[str, Any]:
     """
-    Full OCR pipeline with translation for complete processing.
+    Full OCR pipeline with translation for complete processing. Translation may
+    still be running when this returns; call wait_for_translations() before exiting.
     """
-    return ocr_pipeline(year, month, include_translation=True)
+    return ocr_pipeline(year, month, include_translation=True, cache_images=cache_images)
@@ -0,0 +1,195 @@
+"""
+Compact per-issue progress index kept in GCS at status/progress.json, so the
+dashboard reads one small object instead of listing the whole bucket:
+  {"version": 1, "updated": iso, "issues": {"YYYY-MM": {
+      "pages": [[first, last], ...],  # page numbers on GCS, as inclusive ranges
+      "done": int, "total": int, "completed": iso or null}}}
+It is rebuilt from the bucket listing when the runner starts and then updated
+incrementally as page JSONs and metadata.json files are uploaded. Uploads are
+conditional on the blob's generation: when another worker wrote it in between,
+its content is merged in and the upload retried.
+"""
+import json
+import time
+import threading
+from datetime import datetime
+from pathlib import Path
+
+from google.api_core.exceptions import PreconditionFailed
+
+PROGRESS_BLOB = "status/progress.json"
+PROGRESS_VERSION = 1
+FLUSH_INTERVAL = 60.0  # Seconds between uploads of the index while pages keep arriving
+FLUSH_ATTEMPTS = 5
+
+
+def encode_ranges(pages) -> list:
+    """Sorted page numbers -> [[first, last], ...] runs of consecutive pages."""
+    ranges = []
+    for page in sorted(set(pages)):
+        if ranges and page == ranges[-1][1] + 1:
+            ranges[-1][1] = page
+        else:
+            ranges.append([page, page])
+    return ranges
+
+
+def decode_ranges(ranges) -> set:
+    return {page for first, last in ranges for page in range(first, last + 1)}
+
+
+def _page_number(filename: str):
+    """page_12.json -> 12, None for anything else."""
+    if not (filename.startswith("page_") and filename.endswith(".json")):
+        return None
+    try:
+        return int(filename[len("page_"):-len(".json")])
+    except ValueError:
+        return None
+
+
+class ProgressIndex:
+    """In-memory progress of every issue, uploaded as one blob when it changed."""
+
+    def __init__(self):
+        self._issues = {}  # issue_id -> {"pages": set, "total": int, "completed": iso or None}
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._last_flush = 0.0
+        self._generation = None  # Generation of the blob this state is based on (None: unknown)
+
+    def _entry(self, issue_id: str) -> dict:
+        return self._issues.setdefault(issue_id, {"pages": set(), "total": 0, "completed": None})
+
+    def _update_completed(self, entry: dict):
+        if entry["completed"] is None and entry["total"] > 0 and len(entry["pages"]) >= entry["total"]:
+            entry["completed"] = datetime.now().isoformat()
+
+    def load(self, bucket):
+        """(issues, generation) of the blob as stored; generation 0 if it does not exist."""
+        try:
+            blob = bucket.get_blob(PROGRESS_BLOB)
+            if blob is None:
+                return {}, 0
+            data = json.loads(blob.download_as_text())
+        except Exception:
+            return {}, None
+        if data.get("version") != PROGRESS_VERSION:
+            return {}, blob.generation
+        return data.get("issues", {}), blob.generation
+
+    def _merge(self, issues: dict):
+        """Fold in another writer's view: union of pages, earliest completion time."""
+        for issue_id, remote in issues.items():
+            entry = self._entry(issue_id)
+            entry["pages"] |= decode_ranges(remote.get("pages", []))
+            entry["total"] = entry["total"] or remote.get("total", 0)
+            if remote.get("completed") and (entry["completed"] is None or remote["completed"] < entry["completed"]):
+                entry["completed"] = remote["completed"]
+            self._update_completed(entry)
+
+    def rebuild(self, bucket, index: dict):
+        """
+        Replace the state with a completeness index (see gcs.build_completeness_index),
+        the authoritative listing; completion times already recorded are kept.
+        """
+        previous, generation = self.load(bucket)
+        issues = {}
+        for issue_id, info in index.items():
+            pages = {n for n in (_page_number(f"{name}.json") for name in info["pages"]) if n is not None}
+            entry = {"pages": pages, "total": info["total_pages"], "completed": None}
+            if info["total_pages"] > 0 and len(pages) >= info["total_pages"]:
+                entry["completed"] = previous.get(issue_id, {}).get("completed")
+            issues[issue_id] = entry
+        with self._lock:
+            self._issues = issues
+            self._generation = generation
+            self._dirty = True
+
+    def record_blob(self, blob_name: str, local_path: Path = None):
+        """Account for a blob just uploaded: a page JSON or an issue's metadata.json."""
+        parts = blob_name.split("/")
+        if len(parts) != 3 or parts[0] != "ocr":
+            return
+        issue_id, filename = parts[1], parts[2]
+        if filename == "metadata.json":
+            try:
+                with Path(local_path).open("r", encoding="utf-8") as f:
+                    total = json.load(f).get("total_pages", 0)
+            except Exception:
+                return
+            with self._lock:
+                entry = self._entry(issue_id)
+                entry["total"] = total
+                self._update_completed(entry)
+                self._dirty = True
+            return
+        page = _page_number(filename)
+        if page is None:
+            return
+        with self._lock:
+            entry = self._entry(issue_id)
+            if page not in entry["pages"]:
+                entry["pages"].add(page)
+                self._update_completed(entry)
+                self._dirty = True
+
+    def to_json(self) -> dict:
+        with self._lock:
+            issues = {
+                issue_id: {
+                    "pages": encode_ranges(entry["pages"]),
+                    "done": len(entry["pages"]),
+                    "total": entry["total"],
+                    "completed": entry["completed"],
+                }
+                for issue_id, entry in sorted(self._issues.items())
+            }
+        return {"version": PROGRESS_VERSION, "updated": datetime.now().isoformat(), "issues": issues}
+
+    def flush(self, bucket, force: bool = False) -> bool:
+        """Upload the index if it changed (and, unless forced, FLUSH_INTERVAL has passed)."""
+        with self._lock:
+            if not self._dirty or (not force and time.monotonic() - self._last_flush < FLUSH_INTERVAL):
+                return False
+            self._dirty = False
+            self._last_flush = time.monotonic()
+        try:
+            for _ in range(FLUSH_ATTEMPTS):
+                if self._generation is None:
+                    issues, generation = self.load(bucket)
+                    if generation is None:
+                        raise RuntimeError("could not read the current index to merge with")
+                    with self._lock:
+                        self._merge(issues)
+                        self._generation = generation
+                blob = bucket.blob(PROGRESS_BLOB)
+                try:
+                    blob.upload_from_string(
+                        json.dumps(self.to_json(), separators=(",", ":")),
+                        content_type="application/json",
+                        if_generation_match=self._generation,
+                    )
+                except PreconditionFailed:
+                    self._generation = None  # Written by another worker: merge and retry
+                    continue
+                self._generation = blob.generation
+                return True
+            raise RuntimeError(f"still conflicting after {FLUSH_ATTEMPTS} attempts")
+        except Exception as e:
+            print(f"[ERROR] Failed to upload progress index: {e}")
+            with self._lock:
+                self._dirty = True
+            return False
+
+
+_progress = None
+_progress_lock = threading.Lock()
+
+
+def get_progress_index() -> ProgressIndex:
+    global _progress
+    with _progress_lock:
+        if _progress is None:
+            _progress = ProgressIndex()
+        return _progress
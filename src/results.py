@@ -0,0 +1,130 @@
+import os
+import json
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterator
+
+
+def compact_dumps(data) -> str:
+    """JSON without indentation or spaces, the on-disk format of page results."""
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+
+
+def to_page_record(json_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Normalize a page result: integer bbox arrays, nothing else changed."""
+    return {
+        **json_data,
+        "paragraphs": [
+            {**para, "bbox": [int(v) for v in para["bbox"]]} for para in json_data.get("paragraphs", [])
+        ],
+    }
+
+
+def write_page_json(json_data: Dict[str, Any], output_path: Path, durable: bool = False):
+    """Write a page result compactly, via a temp file so readers never see half a page."""
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = output_path.with_name(f".{output_path.name}.tmp")
+    with tmp_path.open("w", encoding="utf-8") as f:
+        f.write(compact_dumps(to_page_record(json_data)))
+        if durable:
+            f.flush()
+            os.fsync(f.fileno())
+    tmp_path.replace(output_path)
+
+
+def get_results_path(output_dir: Path, issue_id: str) -> Path:
+    return output_dir / f"{issue_id}_complete.jsonl"
+
+
+def get_index_path(output_dir: Path, issue_id: str) -> Path:
+    return output_dir / f"{issue_id}_complete.index.json"
+
+
+class IssueResultWriter:
+    """
+    Streams the page results of an issue into one JSONL file as they arrive (one
+    compact line per page, in completion order) and remembers where each line is.
+    close() writes a small offset index, {"pages": {page: [offset, length]}}, so a
+    single page can later be read with one seek instead of parsing the whole issue.
+    """
+
+    def __init__(self, output_dir: Path, issue_id: str):
+        self.issue_id = issue_id
+        self.path = get_results_path(output_dir, issue_id)
+        self.index_path = get_index_path(output_dir, issue_id)
+        self.offsets = {}
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # A previous run may have stopped mid-issue; page JSONs are the resume cache,
+        # so the stream is simply rebuilt.
+        self.index_path.unlink(missing_ok=True)
+        self._file = self.path.open("wb")
+
+    def add_page(self, page: int, json_data: Dict[str, Any]):
+        line = (compact_dumps({"page": page, **to_page_record(json_data)}) + "\n").encode("utf-8")
+        with self._lock:
+            if page in self.offsets:
+                return
+            self.offsets[page] = [self._file.tell(), len(line)]
+            self._file.write(line)
+
+    def close(self, total_pages: int) -> Path:
+        with self._lock:
+            self._file.close()
+            index = {
+                "issue": self.issue_id,
+                "total_pages": total_pages,
+                "pages": {str(page): self.offsets[page] for page in sorted(self.offsets)},
+            }
+            tmp_path = self.index_path.with_name(f".{self.index_path.name}.tmp")
+            tmp_path.write_text(compact_dumps(index), encoding="utf-8")
+            tmp_path.replace(self.index_path)
+        return self.index_path
+
+
+def load_issue_index(output_dir: Path, issue_id: str) -> Dict[str, Any]:
+    with get_index_path(output_dir, issue_id).open("r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def read_issue_page(output_dir: Path, issue_id: str, page: int, index: Dict[str, Any] = None) -> Dict[str, Any]:
+    """Read one page of a complete issue through the offset index. None if it is missing."""
+    index = index or load_issue_index(output_dir, issue_id)
+    entry = index["pages"].get(str(page))
+    if entry is None:
+        return None
+    offset, length = entry
+    with get_results_path(output_dir, issue_id).open("rb") as f:
+        f.seek(offset)
+        record = json.loads(f.read(length))
+    record.pop("page", None)
+    return record
+
+
+def iter_issue_pages(output_dir: Path, issue_id: str) -> Iterator[Dict[str, Any]]:
+    """Yield the pages of a complete issue in page order, one at a time."""
+    index = load_issue_index(output_dir, issue_id)
+    with get_results_path(output_dir, issue_id).open("rb") as f:
+        for page in sorted(index["pages"], key=int):
+            offset, length = index["pages"][page]
+            f.seek(offset)
+            record = json.loads(f.read(length))
+            record.pop("page", None)
+            yield record
+
+
+def export_pretty_json(output_dir: Path, issue_id: str, export_path: Path = None) -> Path:
+    """
+    Export a complete issue to the original pretty-printed <issue>_complete.json
+    ({"issue", "pages", "total_pages"}, indent=2), streaming one page at a time.
+    """
+    export_path = export_path or output_dir / f"{issue_id}_complete.json"
+    count = 0
+    with export_path.open("w", encoding="utf-8") as f:
+        f.write("{\n" + f'  "issue": {json.dumps(issue_id)},\n' + '  "pages": [')
+        for page in iter_issue_pages(output_dir, issue_id):
+            pretty = json.dumps(page, ensure_ascii=False, indent=2).replace("\n", "\n    ")
+            f.write(("," if count else "") + "\n    " + pretty)
+            count += 1
+        f.write(("\n  ]" if count else "]") + f',\n  "total_pages": {count}\n}}')
+    return export_path
@@ -2,13 +2,23 @@ import datetime
 import signal
 import sys
 from .pipeline import simple_ocr_pipeline
-from .sync_gcs import sync_all_jsons
-from .gcs import get_gcs_client, update_runner_status, get_broken_issues
+from .sync_gcs import sync_all_jsons, start_background_uploader, stop_background_uploader
+from .gcs import get_gcs_client, ensure_bucket_exists, get_broken_issues, build_completeness_index, is_issue_complete, BUCKET_NAME
+from .progress import get_progress_index
+from .workqueue import WorkQueue, LEASE_SECONDS
 from .cleanup import cleanup_issue_data, enforce_disk_limit, get_data_folder_size_mb, cleanup_all_images
 from .paths import get_issue_id
+from .download import IssuePrefetcher
+from .status import get_status_publisher, stop_status_publisher
+from .metrics import start_metrics_server, stop_metrics_server, record_issue
+from .ocr_stage import get_ocr_worker_count, OCR_WORKERS_ENV
 import psutil
 import os
 import time
+import socket
+import multiprocessing
+
+POLL_SECONDS = 30  # Idle workers re-check the queue for expired leases this often
 
 def get_month_range(start_year, start_month, end_year, end_month):
     """Generate (year, month) tuples for the target range."""
@@ -23,22 +33,61 @@ def get_month_range(start_year, start_month, end_year, end_month):
         else:
             current_date = datetime.date(current_date.year, current_date.month + 1, 1)
 
+def plan_archive(client, start_year, start_month, end_year, end_month):
+    """
+    Issues left to process in the range, as (issue_id, is_priority) pairs:
+    broken issues (metadata but missing pages) first, then incomplete ones in order.
+    """
+    # GCS Scan: one bulk listing answers every completeness question below
+    index = build_completeness_index(client)
+    # The dashboard's progress index starts from the same listing, then follows uploads
+    progress = get_progress_index()
+    progress.rebuild(client.bucket(BUCKET_NAME), index)
+    progress.flush(client.bucket(BUCKET_NAME), force=True)
+    broken_ids = get_broken_issues(client, start_year, end_year, index=index)
+    
+    # Generate the chronological list
+    all_tasks = []
+    for year, month in get_month_range(start_year, start_month, end_year, end_month):
+        all_tasks.append(get_issue_id(year, month))
+    
+    # Prioritize: Broken first, then everything else if not complete
+    tasks_to_run = []
+    # 1. Broken first
+    for b_id in broken_ids:
+        tasks_to_run.append((b_id, True)) # (id, is_priority)
+    
+    # 2. Chronological (skip if already in broken or already complete)
+    broken_set = set(broken_ids)
+    for t_id in all_tasks:
+        if t_id not in broken_set and not is_issue_complete(index, t_id):
+            tasks_to_run.append((t_id, False))
+    print(f"[SCAN] {len(tasks_to_run)} issues to process ({len(broken_ids)} broken).")
+    return tasks_to_run
+
 def run_archive(
     start_year=1925, 
     start_month=8, 
     end_year=2009, 
     end_month=5,
-    skip_sync=False
+    skip_sync=False,
+    prefetch=2,
+    metrics_port=None,
 ):
     """
     Process the entire Haratch archive month by month.
     Each month's result is synced to GCS to update the live dashboard.
+    The next `prefetch` issues are downloaded in the background while OCR runs.
+    With `metrics_port`, live metrics and page events are served locally (see metrics.py).
     """
     client = get_gcs_client()
+    # Status updates are coalesced and uploaded by a background thread
+    publisher = get_status_publisher()
     
     def signal_handler(sig, frame):
         print("\n[STOP] Interrupt received, signaling IDLE status...")
-        update_runner_status(client, "idle")
+        publisher.publish("idle")
+        publisher.flush()
         sys.exit(0)
 
     def get_health_stats():
@@ -48,6 +97,9 @@ def run_archive(
         disk_mb = get_data_folder_size_mb()
         return ram_mb, disk_mb
 
+    if metrics_port:
+        start_metrics_server(metrics_port)
+
     signal.signal(signal.SIGINT, signal_handler)
     signal.signal(signal.SIGTERM, signal_handler)
 
@@ -59,35 +111,27 @@ def run_archive(
     cleanup_all_images()
 
     print(f"[START] Starting archive processing from {start_year}-{start_month} to {end_year}-{end_month}")
-    update_runner_status(client, "active", pace=0, ram_mb=ram, disk_mb=disk)
-    
-    # GCS Scan: Find broken issues first
-    broken_ids = get_broken_issues(client, start_year, end_year)
-    
-    # Generate the chronological list
-    all_tasks = []
-    for year, month in get_month_range(start_year, start_month, end_year, end_month):
-        all_tasks.append(get_issue_id(year, month))
-    
-    # Prioritize: Broken first, then everything else if not complete
-    tasks_to_run = []
-    # 1. Broken first
-    for b_id in broken_ids:
-        tasks_to_run.append((b_id, True)) # (id, is_priority)
+    publisher.publish("active", pace=0, ram_mb=ram, disk_mb=disk)
     
-    # 2. Chronological (skip if already in broken or already complete)
-    from .gcs import is_issue_complete_on_gcs
-    for t_id in all_tasks:
-        if t_id not in broken_ids:
-            tasks_to_run.append((t_id, False))
+    tasks_to_run = plan_archive(client, start_year, start_month, end_year, end_month)
+
+    # Page JSONs are uploaded as soon as they are written; the per-issue
+    # sync below only picks up whatever is still pending.
+    if not skip_sync:
+        start_background_uploader()
+
+    prefetcher = None
+    if prefetch > 0:
+        prefetcher = IssuePrefetcher(
+            [tuple(map(int, t_id.split("-"))) for t_id, _ in tasks_to_run],
+            depth=prefetch,
+        ).start()
 
     try:
         for issue_id, is_priority in tasks_to_run:
             year, month = map(int, issue_id.split("-"))
-            
-            # Skip if already complete on cloud (unless it was marked as broken)
-            if not is_priority and is_issue_complete_on_gcs(client, issue_id):
-                continue
+            if prefetcher:
+                prefetcher.set_current(year, month)
 
             # Disk check
             if not enforce_disk_limit():
@@ -102,8 +146,7 @@ def run_archive(
             # Get current health stats
             ram, disk = get_health_stats()
             
-            update_runner_status(
-                client, 
+            publisher.publish(
                 f"processing {issue_id}", 
                 ram_mb=ram, 
                 disk_mb=disk, 
@@ -121,8 +164,10 @@ def run_archive(
                     sync_all_jsons()
                 
                 completed_count += 1
+                record_issue("ok")
                 print(f"[OK] Finished {issue_id}")
             except Exception as e:
+                record_issue("error")
                 print(f"[ERROR] Error processing {issue_id}: {str(e)}")
                 # We still cleanup even on error
             finally:
@@ -134,8 +179,7 @@ def run_archive(
                 elapsed = time.time() - start_time
                 pace = (completed_count / (elapsed / 3600)) if elapsed > 0 else 0
                 
-                update_runner_status(
-                    client, 
+                publisher.publish(
                     "active", 
                     ram_mb=ram, 
                     disk_mb=disk, 
@@ -144,5 +188,128 @@ def run_archive(
                 )
                 
     finally:
+        if prefetcher:
+            prefetcher.stop()
+        if not skip_sync:
+            stop_background_uploader()
         print("\n[DONE] Archive processing finished or stopped.")
-        update_runner_status(client, "idle")
+        publisher.publish("idle")
+        stop_status_publisher()
+        stop_metrics_server()
+
+def run_worker(
+    start_year=1925,
+    start_month=8,
+    end_year=2009,
+    end_month=5,
+    skip_sync=False,
+    worker_id=None,
+    lease_seconds=LEASE_SECONDS,
+    reseed=False,
+):
+    """
+    One node of a distributed archive run: claim issues from the shared work queue
+    (see workqueue.py) until every planned issue is done or failed. The first worker
+    to start seeds the queue with the same priorities as run_archive.
+    """
+    client = get_gcs_client()
+    bucket = ensure_bucket_exists(client)
+    queue = WorkQueue(bucket, worker_id=worker_id, lease_seconds=lease_seconds)
+    if reseed or not queue.plan():
+        queue.seed(plan_archive(client, start_year, start_month, end_year, end_month), replace=reseed)
+    print(f"[WORKER] {queue.worker_id} joining the queue: {queue.summary()}")
+
+    if not skip_sync:
+        start_background_uploader()
+
+    completed_count = 0
+    try:
+        while True:
+            lease = queue.claim()
+            if lease is None:
+                if queue.is_drained():
+                    break
+                # Everything left is leased by live workers; wait for them or for expiries
+                time.sleep(POLL_SECONDS)
+                continue
+
+            issue_id = lease.issue_id
+            year, month = map(int, issue_id.split("-"))
+            # Other workers may share data/: only this issue's leftovers are ours to purge
+            if not enforce_disk_limit(issue=(year, month)):
+                print("[WAIT] Disk limit reached, waiting for next cycle or manual intervention...")
+            if lease.lost:
+                print(f"[QUEUE] Lost {issue_id} before starting it, leaving it to its new holder")
+                continue
+            print(f"\n[RUN] --- {queue.worker_id} processing {issue_id} (attempt {lease.attempts}) ---")
+            abandoned = False
+            try:
+                simple_ocr_pipeline(year, month)
+                if lease.lost:
+                    abandoned = True
+                    print(f"[QUEUE] Lost {issue_id} while processing it, abandoning without marking it done")
+                    continue
+                if not skip_sync:
+                    print(f"[CLOUD] Syncing {issue_id} to GCS...")
+                    sync_all_jsons()
+                if not lease.complete():
+                    abandoned = True
+                    print(f"[QUEUE] Lost {issue_id} before completing it, abandoning without marking it done")
+                    continue
+                completed_count += 1
+                record_issue("ok")
+                print(f"[OK] Finished {issue_id}")
+            except Exception as e:
+                lease.release()
+                record_issue("error")
+                print(f"[ERROR] Error processing {issue_id}: {str(e)}")
+            finally:
+                # An abandoned issue's files may belong to its new holder on this machine
+                if not abandoned:
+                    cleanup_issue_data(year, month)
+    finally:
+        if not skip_sync:
+            stop_background_uploader()
+        print(f"[DONE] Worker {queue.worker_id} finished {completed_count} issues. Queue: {queue.summary()}")
+    return completed_count
+
+def run_local_workers(count=2, start_year=1925, start_month=8, end_year=2009, end_month=5, shared_detector=False, **kwargs):
+    """
+    Run `count` workers as separate processes on this machine, sharing data/, the
+    storage backend and the CPU (each gets cores // count OCR processes unless
+    HARATCH_OCR_WORKERS is set). The queue is seeded here first so the workers do not race for it.
+    With `shared_detector`, one detection server holds the layout model for all of them.
+    """
+    client = get_gcs_client()
+    queue = WorkQueue(ensure_bucket_exists(client))
+    if kwargs.pop("reseed", False) or not queue.plan():
+        queue.seed(plan_archive(client, start_year, start_month, end_year, end_month), replace=True)
+
+    detection_server = None
+    if shared_detector:
+        from .detection_server import start_detection_server
+        detection_server = start_detection_server()
+
+    # Split the cores between the workers instead of giving each its own full OCR pool
+    if not os.environ.get(OCR_WORKERS_ENV):
+        os.environ[OCR_WORKERS_ENV] = str(max(1, get_ocr_worker_count() // count))
+    print(f"[WORKER] Starting {count} workers with {os.environ[OCR_WORKERS_ENV]} OCR processes each")
+
+    ctx = multiprocessing.get_context("spawn")
+    processes = []
+    for i in range(count):
+        worker_kwargs = dict(kwargs, worker_id=f"{socket.gethostname()}-w{i}")
+        process = ctx.Process(
+            target=run_worker,
+            args=(start_year, start_month, end_year, end_month),
+            kwargs=worker_kwargs,
+            name=f"worker-{i}",
+        )
+        process.start()
+        processes.append(process)
+    for process in processes:
+        process.join()
+    if detection_server is not None:
+        detection_server.terminate()
+    print(f"[DONE] All local workers exited. Queue: {queue.summary()}")
+    return [process.exitcode for process in processes]
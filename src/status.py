@@ -0,0 +1,123 @@
+import os
+import time
+import threading
+
+from .gcs import get_gcs_client, update_runner_status
+
+# Minimum seconds between two uploads of status/runner.json (state changes bypass it).
+STATUS_MIN_INTERVAL = float(os.environ.get("HARATCH_STATUS_INTERVAL", "10"))
+
+# Health metrics are recomputed on every flush unless the caller provides them.
+_VOLATILE_FIELDS = ("ram_mb", "disk_mb")
+
+
+class StatusPublisher:
+    """
+    Background thread that owns the runner status. publish() only merges fields into
+    the latest in-memory status and returns immediately; the thread uploads it at most
+    every `min_interval` seconds, or right away when the status string changes.
+    """
+
+    def __init__(self, client=None, min_interval: float = STATUS_MIN_INTERVAL):
+        self.client = client
+        self.min_interval = min_interval
+        self._state = {"status": "idle"}
+        self._dirty = False
+        self._urgent = False
+        self._last_flush = 0.0
+        self._stopped = False
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="status-publisher", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def publish(self, status: str = None, **fields):
+        """Merge an update into the pending status. Never blocks on I/O."""
+        with self._cond:
+            if status is not None and status != self._state.get("status"):
+                self._urgent = True
+                self._state["status"] = status
+            self._state.update(fields)
+            self._dirty = True
+            self._cond.notify()
+
+    def snapshot(self) -> dict:
+        """The current merged status, as it will be (or was last) published."""
+        with self._cond:
+            return dict(self._state)
+
+    def flush(self):
+        """Upload the current status now (used for shutdown and signal handlers)."""
+        with self._cond:
+            if not self._dirty:
+                return
+            snapshot = self._take_snapshot()
+        self._upload(snapshot)
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+        self._thread.join(timeout=30)
+        self.flush()
+
+    def _take_snapshot(self):
+        snapshot = dict(self._state)
+        for field in _VOLATILE_FIELDS:
+            self._state.pop(field, None)
+        self._dirty = False
+        self._urgent = False
+        return snapshot
+
+    def _upload(self, snapshot):
+        with self._flush_lock:
+            try:
+                if self.client is None:
+                    self.client = get_gcs_client()
+                status = snapshot.pop("status")
+                update_runner_status(self.client, status, **snapshot)
+            except Exception as e:
+                print(f"[STATUS] Failed to publish runner status: {e}")
+            self._last_flush = time.monotonic()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._dirty and not self._stopped:
+                    self._cond.wait()
+                if self._stopped:
+                    return
+                # Coalesce: wait out the rate limit unless a state transition is pending
+                wait = self._last_flush + self.min_interval - time.monotonic()
+                while wait > 0 and not self._urgent and not self._stopped:
+                    self._cond.wait(wait)
+                    wait = self._last_flush + self.min_interval - time.monotonic()
+                if self._stopped:
+                    return
+                snapshot = self._take_snapshot()
+            self._upload(snapshot)
+
+
+_publisher = None
+_publisher_lock = threading.Lock()
+
+
+def get_status_publisher() -> StatusPublisher:
+    """Return the process-wide status publisher, starting it on first use."""
+    global _publisher
+    with _publisher_lock:
+        if _publisher is None:
+            _publisher = StatusPublisher().start()
+        return _publisher
+
+
+def stop_status_publisher():
+    """Upload the last pending status and stop the publisher thread."""
+    global _publisher
+    with _publisher_lock:
+        publisher, _publisher = _publisher, None
+    if publisher is not None:
+        publisher.stop()
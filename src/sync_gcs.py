@@ -1,52 +1,291 @@
+import json
+import fcntl
+import hashlib
+import threading
+from datetime import datetime
 from pathlib import Path
+from contextlib import contextmanager
+from queue import Queue
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from .gcs import get_gcs_client, ensure_bucket_exists, upload_file
+from .tracing import span, traced
+from .progress import get_progress_index
 
-def sync_all_jsons():
-    """Sync all OCR and Output JSON files to GCS in parallel."""
+DATA_DIR = Path("data")
+# Local root -> blob prefix
+SYNC_ROOTS = {
+    DATA_DIR / "generated" / "ocr": "ocr",
+    DATA_DIR / "output": "output",
+}
+JOURNAL_PATH = DATA_DIR / "sync_journal.jsonl"
+PENDING_PATH = DATA_DIR / "sync_pending.txt"
+
+
+def get_blob_name(local_path: Path):
+    """Blob name of a local JSON under one of the synced roots, or None."""
+    local_path = Path(local_path)
+    for root, prefix in SYNC_ROOTS.items():
+        try:
+            rel_path = local_path.relative_to(root)
+        except ValueError:
+            continue
+        return f"{prefix}/{rel_path.as_posix()}"
+    return None
+
+
+def file_fingerprint(path: Path):
+    """(size, sha1) of a file; JSONs are small so hashing them is cheap."""
+    data = Path(path).read_bytes()
+    return len(data), hashlib.sha1(data).hexdigest()
+
+
+class SyncJournal:
+    """
+    Append-only record of what was uploaded (path -> size/sha1) plus the list of
+    files written since the last sync, so a sync never has to rescan data/.
+    Writes take a file lock as well, since several processes may share the files.
+    """
+
+    def __init__(
+        self,
+        journal_path: Path = JOURNAL_PATH,
+        pending_path: Path = PENDING_PATH,
+        lock_path: Path = None,
+        scanned_path: Path = None,
+    ):
+        self.journal_path = journal_path
+        self.pending_path = pending_path
+        # Held around journal/pending writes: local workers (`main.py workers`) share data/
+        self.lock_path = lock_path or journal_path.with_suffix(".lock")
+        # Written once a full scan of data/ went through, so files from before the journal are covered
+        self.scanned_path = scanned_path or journal_path.with_suffix(".scanned")
+        self.uploaded = {}
+        self._thread_lock = threading.Lock()
+        # Not journal_path.exists(): background uploads create the journal before any scan
+        self.scanned = self.scanned_path.exists()
+        if journal_path.exists():
+            with journal_path.open("r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                        self.uploaded[entry["path"]] = (entry["size"], entry["sha1"])
+                    except (ValueError, KeyError):
+                        continue  # Torn last line after a crash
+
+    @contextmanager
+    def _lock(self):
+        with self._thread_lock:
+            self.lock_path.parent.mkdir(parents=True, exist_ok=True)
+            with self.lock_path.open("a") as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def needs_upload(self, path: Path, fingerprint=None) -> bool:
+        fingerprint = fingerprint or file_fingerprint(path)
+        with self._thread_lock:
+            return self.uploaded.get(str(path)) != fingerprint
+
+    def record_uploaded(self, path: Path, fingerprint):
+        size, sha1 = fingerprint
+        with self._lock():
+            self.uploaded[str(path)] = fingerprint
+            self.journal_path.parent.mkdir(parents=True, exist_ok=True)
+            with self.journal_path.open("a", encoding="utf-8") as f:
+                f.write(json.dumps({"path": str(path), "size": size, "sha1": sha1}) + "\n")
+
+    def mark_scanned(self):
+        """Record that a full scan of data/ completed; later syncs only read the pending list."""
+        with self._lock():
+            self.scanned_path.parent.mkdir(parents=True, exist_ok=True)
+            self.scanned_path.write_text(datetime.now().isoformat(), encoding="utf-8")
+            self.scanned = True
+
+    def add_pending(self, path: Path):
+        with self._lock():
+            self.pending_path.parent.mkdir(parents=True, exist_ok=True)
+            with self.pending_path.open("a", encoding="utf-8") as f:
+                f.write(f"{path}\n")
+
+    def take_pending(self):
+        """Return and clear the files written since the last sync."""
+        with self._lock():
+            if not self.pending_path.exists():
+                return []
+            paths = dict.fromkeys(
+                line.strip() for line in self.pending_path.read_text(encoding="utf-8").splitlines() if line.strip()
+            )
+            self.pending_path.unlink()
+        return [Path(p) for p in paths]
+
+
+_journal = None
+_journal_lock = threading.Lock()
+
+
+def get_sync_journal() -> SyncJournal:
+    global _journal
+    with _journal_lock:
+        if _journal is None:
+            _journal = SyncJournal()
+        return _journal
+
+
+def _upload_if_changed(bucket, journal: SyncJournal, local_path: Path, blob_name: str, skip_existing=False):
+    """Upload a file unless the journal says this exact content is already on GCS."""
+    fingerprint = file_fingerprint(local_path)
+    if not journal.needs_upload(local_path, fingerprint):
+        return False
+    with span("gcs.upload", blob=blob_name, bytes=fingerprint[0]):
+        if skip_existing:
+            uploaded = upload_file(bucket, local_path, blob_name)
+        else:
+            bucket.blob(blob_name).upload_from_filename(str(local_path))
+            uploaded = True
+    journal.record_uploaded(local_path, fingerprint)
+    get_progress_index().record_blob(blob_name, local_path)
+    return uploaded
+
+
+class BackgroundUploader:
+    """
+    Uploads JSONs as soon as the pipeline writes them: a bounded queue drained by a
+    few threads sharing one client. Files that fail stay pending for the next sync.
+    """
+
+    def __init__(self, max_workers: int = 4, max_queued: int = 256):
+        self.max_workers = max_workers
+        self._queue = Queue(maxsize=max_queued)
+        self._threads = []
+        self._bucket = None
+
+    def start(self):
+        self._bucket = ensure_bucket_exists(get_gcs_client())
+        for i in range(self.max_workers):
+            thread = threading.Thread(target=self._run, name=f"uploader-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def submit(self, local_path: Path):
+        self._queue.put(Path(local_path))
+
+    def _run(self):
+        journal = get_sync_journal()
+        while True:
+            local_path = self._queue.get()
+            if local_path is None:
+                return
+            blob_name = get_blob_name(local_path)
+            try:
+                if blob_name and local_path.exists():
+                    _upload_if_changed(self._bucket, journal, local_path, blob_name)
+            except Exception as e:
+                print(f"[ERROR] Background upload of {blob_name} failed: {e}")
+                journal.add_pending(local_path)
+            # Rate-limited: the dashboard sees partial issues without one upload per page
+            get_progress_index().flush(self._bucket)
+
+    def stop(self):
+        """Finish queued uploads and stop the worker threads."""
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        get_progress_index().flush(self._bucket, force=True)
+
+
+_uploader = None
+
+
+def start_background_uploader(max_workers: int = 4) -> BackgroundUploader:
+    global _uploader
+    if _uploader is None:
+        _uploader = BackgroundUploader(max_workers=max_workers).start()
+    return _uploader
+
+
+def stop_background_uploader():
+    global _uploader
+    if _uploader is not None:
+        _uploader.stop()
+        _uploader = None
+
+
+def notify_written(local_path: Path):
+    """
+    Called by the pipeline after writing a JSON that should reach GCS: records it as
+    pending and hands it to the background uploader if one is running.
+    """
+    if get_blob_name(local_path) is None:
+        return
+    get_sync_journal().add_pending(local_path)
+    if _uploader is not None:
+        _uploader.submit(local_path)
+
+
+def _scan_all_jsons():
+    for root in SYNC_ROOTS:
+        if root.exists():
+            yield from root.rglob("*.json")
+            yield from root.rglob("*.jsonl")
+
+
+@traced("sync_all_jsons")
+def sync_all_jsons(full_scan: bool = False):
+    """
+    Sync OCR and Output JSON files to GCS in parallel.
+    Only files written since the last sync are considered; a full scan of data/ happens
+    until one has completed (no scan marker yet) or when full_scan=True, and keeps the old
+    skip-if-exists check so files already on GCS are not uploaded again.
+    """
     client = get_gcs_client()
     bucket = ensure_bucket_exists(client)
-    
-    data_dir = Path("data")
-    
+    journal = get_sync_journal()
+
+    scan = full_scan or not journal.scanned
+    candidates = list(_scan_all_jsons()) if scan else journal.take_pending()
     files_to_sync = []
-    
-    # 1. Collect OCR files
-    ocr_root = data_dir / "generated" / "ocr"
-    if ocr_root.exists():
-        for json_file in ocr_root.rglob("*.json"):
-            rel_path = json_file.relative_to(ocr_root)
-            blob_name = f"ocr/{rel_path}"
-            files_to_sync.append((json_file, blob_name))
-    
-    # 2. Collect Output files
-    output_root = data_dir / "output"
-    if output_root.exists():
-        for json_file in output_root.rglob("*.json"):
-            rel_path = json_file.relative_to(output_root)
-            blob_name = f"output/{rel_path}"
+    for json_file in dict.fromkeys(candidates):
+        blob_name = get_blob_name(json_file)
+        if blob_name and json_file.exists():
             files_to_sync.append((json_file, blob_name))
 
     if not files_to_sync:
         print("[SYNC] No files found to sync.")
+        if scan:
+            journal.mark_scanned()
+        get_progress_index().flush(bucket, force=True)
         return
 
-    print(f"[SYNC] Syncing {len(files_to_sync)} files to GCS using parallel workers...")
-    
+    print(f"[SYNC] Syncing {len(files_to_sync)} {'scanned' if scan else 'new'} files to GCS using parallel workers...")
+
     # Use a ThreadPoolExecutor for parallel uploads
     # GCS Client is thread-safe for diverse operations
     with ThreadPoolExecutor(max_workers=16) as executor:
-        futures = {executor.submit(upload_file, bucket, f, b): b for f, b in files_to_sync}
-        
+        futures = {
+            executor.submit(_upload_if_changed, bucket, journal, f, b, skip_existing=scan): (f, b)
+            for f, b in files_to_sync
+        }
+
         count = 0
         for future in as_completed(futures):
+            local_path, blob_name = futures[future]
             try:
                 if future.result():
                     count += 1
             except Exception as e:
-                print(f"[ERROR] Failed to upload {futures[future]}: {e}")
+                print(f"[ERROR] Failed to upload {blob_name}: {e}")
+                journal.add_pending(local_path)
 
+    if scan:
+        # Files that failed are pending, so the next syncs still pick them up
+        journal.mark_scanned()
+    get_progress_index().flush(bucket, force=True)
     print(f"[DONE] Sync complete. Uploaded {count} new files.")
 
 if __name__ == "__main__":
-    sync_all_jsons()
+    sync_all_jsons(full_scan=True)
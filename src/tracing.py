@@ -0,0 +1,235 @@
+"""
+Lightweight span tracing exported as a Chrome/Perfetto trace (open it at ui.perfetto.dev).
+Enabled by HARATCH_TRACE=<path.json> or enable_tracing(path); when disabled, span()
+returns a shared no-op context and @traced functions cost one flag check.
+Listeners (see add_listener, used by the metrics endpoint) receive every finished
+span and counter sample of this process, whether or not a trace file is written.
+Every process (including OCR pool workers, which inherit the variable) buffers its
+events into <path>.parts/<pid>.jsonl; the main process merges them on exit.
+"""
+import os
+import json
+import time
+import atexit
+import functools
+import threading
+import multiprocessing
+from pathlib import Path
+
+TRACE_ENV = "HARATCH_TRACE"
+FLUSH_EVERY = 256  # Buffered events per process before they are appended to disk
+
+_trace_path = os.environ.get(TRACE_ENV)
+_enabled = bool(_trace_path)
+_events = []
+_merged = []  # Events already collected from part files by save_trace
+_named_threads = set()
+_lock = threading.Lock()
+_listeners = []
+_active = _enabled  # Spans are recorded when tracing or when someone listens
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def add_listener(listener):
+    """
+    Register an object with on_span(name, seconds, args) and on_counter(name, values);
+    it is called synchronously at the end of every span / counter sample.
+    """
+    global _active
+    _listeners.append(listener)
+    _active = True
+
+
+def remove_listener(listener):
+    global _active
+    if listener in _listeners:
+        _listeners.remove(listener)
+    _active = _enabled or bool(_listeners)
+
+
+def enable_tracing(path) -> Path:
+    """Start recording to `path`; child processes started afterwards record too."""
+    global _trace_path, _enabled, _active
+    _trace_path = str(path)
+    os.environ[TRACE_ENV] = _trace_path
+    _enabled = _active = True
+    _register_exit()
+    return Path(_trace_path)
+
+
+def _now_us() -> float:
+    # CLOCK_MONOTONIC is shared by all processes, so timestamps line up across them
+    return time.monotonic_ns() / 1000
+
+
+def _parts_dir() -> Path:
+    return Path(f"{_trace_path}.parts")
+
+
+def _record(event: dict):
+    thread = threading.current_thread()
+    event["pid"] = os.getpid()
+    event["tid"] = thread.ident
+    with _lock:
+        if thread.ident not in _named_threads:
+            _named_threads.add(thread.ident)
+            _events.append({
+                "name": "thread_name", "ph": "M", "pid": event["pid"], "tid": thread.ident,
+                "args": {"name": thread.name},
+            })
+        _events.append(event)
+        if len(_events) >= FLUSH_EVERY:
+            _flush_locked()
+
+
+def _flush_locked():
+    global _events
+    if not _events:
+        return
+    parts = _parts_dir()
+    parts.mkdir(parents=True, exist_ok=True)
+    with (parts / f"{os.getpid()}.jsonl").open("a", encoding="utf-8") as f:
+        for event in _events:
+            f.write(json.dumps(event, default=str) + "\n")
+    _events = []
+
+
+def flush():
+    """Append this process's buffered events to its part file."""
+    if _enabled:
+        with _lock:
+            _flush_locked()
+
+
+class _Span:
+    __slots__ = ("name", "args", "start")
+
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.start = _now_us()
+        return self
+
+    def set(self, **args):
+        """Attach attributes known only once the work is done (e.g. result counts)."""
+        self.args.update(args)
+
+    def __exit__(self, exc_type, exc, tb):
+        end = _now_us()
+        if exc_type is not None:
+            self.args["error"] = exc_type.__name__
+        for listener in _listeners:
+            listener.on_span(self.name, (end - self.start) / 1e6, self.args)
+        if not _enabled:
+            return False
+        _record({"name": self.name, "cat": "haratch", "ph": "X", "ts": self.start, "dur": end - self.start, "args": self.args})
+        if multiprocessing.parent_process() is not None:
+            # Pool workers are killed without atexit, so they flush span by span
+            flush()
+        return False
+
+
+class _NoSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def set(self, **args):
+        pass
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NO_SPAN = _NoSpan()
+
+
+def span(name: str, **args):
+    """Context manager recording a complete ("X") event with `args` as attributes."""
+    if not _active:
+        return _NO_SPAN
+    return _Span(name, args)
+
+
+def traced(name: str = None):
+    """Decorator: record every call of the function as a span."""
+    def decorator(fn):
+        span_name = name or fn.__qualname__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _active:
+                return fn(*args, **kwargs)
+            with _Span(span_name, {}):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def counter(name: str, **values):
+    """Record a counter ("C") sample, e.g. counter("image_queue", depth=q.qsize())."""
+    if not _active:
+        return
+    for listener in _listeners:
+        listener.on_counter(name, values)
+    if _enabled:
+        _record({"name": name, "ph": "C", "ts": _now_us(), "args": values})
+
+
+def save_trace(path=None) -> Path:
+    """Merge the part files of every process into one trace JSON (main process only)."""
+    if not _enabled:
+        return None
+    flush()
+    path = Path(path or _trace_path)
+    if not _merged:
+        _merged.append({"name": "process_name", "ph": "M", "pid": os.getpid(), "args": {"name": "haratch-ocr"}})
+    parts = _parts_dir()
+    if parts.exists():
+        for part in sorted(parts.glob("*.jsonl")):
+            with part.open("r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        _merged.append(json.loads(line))
+                    except ValueError:
+                        continue  # Torn line from a worker that was killed mid-write
+            part.unlink()
+        parts.rmdir()
+    # Saving again later (e.g. at exit) rewrites the file with everything so far
+    events = list(_merged)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("w", encoding="utf-8") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+    print(f"[TRACE] Wrote {len(events)} events to {path}")
+    return path
+
+
+_exit_registered = False
+
+
+def _register_exit():
+    global _exit_registered
+    if _exit_registered:
+        return
+    _exit_registered = True
+    if multiprocessing.parent_process() is None:
+        # Parts left over by an earlier run that did not exit cleanly
+        parts = _parts_dir()
+        if parts.exists():
+            for part in parts.glob("*.jsonl"):
+                part.unlink()
+        atexit.register(save_trace)
+    else:
+        atexit.register(flush)
+
+
+if _enabled:
+    _register_exit()
@@ -1,6 +1,12 @@
 import os
 import json
+import time
+import asyncio
+import threading
 from pathlib import Path
+from typing import List
+
+from .translation_cache import get_translation_cache, cache_key
 
 try:
     from dotenv import load_dotenv
@@ -14,9 +20,27 @@ except ImportError:
         "Warning: Translation dependencies not installed. Install with: uv sync --extra translate"
     )
 
+TRANSLATION_MODEL = "gemini-1.5-flash"
+# Bump when the prompts change so cached translations are not reused.
+PROMPT_VERSION = "1"
+CACHE_VERSION = f"{TRANSLATION_MODEL}/{PROMPT_VERSION}"
+# Point the client at another server (e.g. a local fake) over REST.
+GEMINI_ENDPOINT = os.environ.get("HARATCH_GEMINI_ENDPOINT")
+# Packing and concurrency limits of the batched translator.
+TRANSLATION_TOKEN_BUDGET = int(os.environ.get("HARATCH_TRANSLATION_TOKEN_BUDGET", "4000"))
+TRANSLATION_CONCURRENCY = int(os.environ.get("HARATCH_TRANSLATION_CONCURRENCY", "8"))
+TRANSLATION_RPM = float(os.environ.get("HARATCH_TRANSLATION_RPM", "60"))
+TRANSLATION_ATTEMPTS = 3
+
 if TRANSLATION_AVAILABLE:
     load_dotenv()
-    if "GOOGLE_API_KEY" in os.environ:
+    if GEMINI_ENDPOINT:
+        genai.configure(
+            api_key=os.environ.get("GOOGLE_API_KEY"),
+            transport="rest",
+            client_options={"api_endpoint": GEMINI_ENDPOINT},
+        )
+    elif "GOOGLE_API_KEY" in os.environ:
         genai.configure(api_key=os.environ["GOOGLE_API_KEY"])
 
     translate_function = FunctionDeclaration(
@@ -35,13 +59,45 @@ if TRANSLATION_AVAILABLE:
     )
 
     model = genai.GenerativeModel(
-        model_name="gemini-1.5-flash",
+        model_name=TRANSLATION_MODEL,
         tools=[translate_function],
         tool_config={"function_calling_config": {"mode": "any"}},
     )
+
+    translate_batch_function = FunctionDeclaration(
+        name="store_translations",
+        description="Translate each numbered Armenian paragraph to French and return one result per id.",
+        parameters={
+            "type": "object",
+            "properties": {
+                "translations": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "id": {"type": "integer", "description": "The paragraph id"},
+                            "translation": {
+                                "type": "string",
+                                "description": "The translated French version of that paragraph",
+                            },
+                        },
+                        "required": ["id", "translation"],
+                    },
+                }
+            },
+            "required": ["translations"],
+        },
+    )
+
+    batch_model = genai.GenerativeModel(
+        model_name=TRANSLATION_MODEL,
+        tools=[translate_batch_function],
+        tool_config={"function_calling_config": {"mode": "any"}},
+    )
 else:
     model = None
     translate_function = None
+    batch_model = None
 
 
 def translate_paragraph(text: str) -> str:
@@ -52,17 +108,25 @@ def translate_paragraph(text: str) -> str:
     if "GOOGLE_API_KEY" not in os.environ:
         return "[NO_API_KEY]"
 
+    cache = get_translation_cache()
+    key = cache_key(text, CACHE_VERSION)
+    cached = cache.get_many([key])
+    if key in cached:
+        return cached[key]
+
     try:
         response = model.generate_content(
             [f"Translate the following Armenian text into French.\n\n{text}"]
         )
 
         try:
-            return (
+            translation = (
                 response.candidates[0]
                 .content.parts[0]
                 .function_call.args["translation"]
             )
+            cache.put_many([(key, translation)])
+            return translation
         except Exception as e:
             print("❌ Structured generation failed. Raw output:\n", response.text)
             return "[PARSE_ERROR]"
@@ -71,37 +135,239 @@ def translate_paragraph(text: str) -> str:
         return f"[API_ERROR: {str(e)}]"
 
 
-def translate_folder(input_dir: Path, output_dir: Path, min_length: int = 200):
+def is_placeholder(text) -> bool:
+    """True for missing results and the [NO_API_KEY]/[API_ERROR]/[PARSE_ERROR]... markers."""
+    return not text or text.startswith("[")
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count; Armenian script tokenizes at ~2 characters per token."""
+    return len(text) // 2 + 1
+
+
+def pack_batches(texts: List[str], token_budget: int = TRANSLATION_TOKEN_BUDGET) -> List[List[int]]:
+    """
+    Group paragraph indices into requests whose estimated size fits the token budget.
+    Paragraphs keep their order; one larger than the budget is sent on its own.
+    """
+    batches, current, used = [], [], 0
+    for i, text in enumerate(texts):
+        tokens = estimate_tokens(text)
+        if current and used + tokens > token_budget:
+            batches.append(current)
+            current, used = [], 0
+        current.append(i)
+        used += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+
+def build_batch_prompt(texts: List[str]) -> str:
+    parts = [
+        "Translate each of the following Armenian paragraphs into French. "
+        "Return exactly one translation per paragraph id with store_translations."
+    ]
+    for i, text in enumerate(texts):
+        parts.append(f"[{i}]\n{text}")
+    return "\n\n".join(parts)
+
+
+def parse_batch_response(response, count: int) -> List[str]:
+    """Map a store_translations call back to the paragraphs; None where an id is missing."""
+    results = [None] * count
+    for part in response.candidates[0].content.parts:
+        call = part.function_call
+        if not call or call.name != "store_translations":
+            continue
+        for item in call.args.get("translations", []):
+            index = int(item["id"])
+            if 0 <= index < count and item.get("translation"):
+                results[index] = item["translation"]
+    return results
+
+
+class RateLimiter:
+    """
+    Spaces request starts evenly so at most `per_minute` requests begin per minute.
+    Start times are reserved under a thread lock, so one limiter holds across the
+    event loops that asyncio.run() creates in different threads. acquire() blocks,
+    so it is called from the worker threads that send the requests.
+    """
+
+    def __init__(self, per_minute: float):
+        self.interval = 60.0 / per_minute if per_minute > 0 else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Take the next start slot; returns how long to wait for it."""
+        with self._lock:
+            now = time.monotonic()
+            wait = self._next - now
+            self._next = max(now, self._next) + self.interval
+        return wait
+
+    def acquire(self):
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+
+class BatchTranslator:
+    """
+    Translates many paragraphs at once: paragraphs are packed into requests up to a
+    token budget, and requests run concurrently (at most `concurrency` in flight,
+    started no faster than `requests_per_minute`). Paragraphs missing from a batched
+    answer are retried on their own. The blocking client runs in worker threads.
+    """
+
+    def __init__(
+        self,
+        token_budget: int = TRANSLATION_TOKEN_BUDGET,
+        concurrency: int = TRANSLATION_CONCURRENCY,
+        requests_per_minute: float = TRANSLATION_RPM,
+    ):
+        self.token_budget = token_budget
+        self.concurrency = concurrency
+        self.requests_per_minute = requests_per_minute
+        # One limiter and one in-flight bound for every call, whichever thread or event loop it comes from
+        self.limiter = RateLimiter(requests_per_minute)
+        self._in_flight = threading.BoundedSemaphore(concurrency)
+        self.stats = {"requests": 0, "paragraphs": 0, "retried": 0, "errors": 0}
+
+    def _request(self, texts: List[str]) -> List[str]:
+        """Runs in a worker thread: waits for a free slot, then for the rate limit."""
+        with self._in_flight:
+            self.limiter.acquire()
+            response = batch_model.generate_content([build_batch_prompt(texts)])
+        return parse_batch_response(response, len(texts))
+
+    async def _send(self, texts) -> List[str]:
+        error = None
+        for attempt in range(1, TRANSLATION_ATTEMPTS + 1):
+            try:
+                self.stats["requests"] += 1
+                return await asyncio.to_thread(self._request, texts)
+            except Exception as e:
+                error = e
+            if attempt < TRANSLATION_ATTEMPTS:
+                await asyncio.sleep(2 ** attempt)
+        print(f"❌ Translation API error: {error}")
+        self.stats["errors"] += 1
+        return [f"[API_ERROR: {str(error)}]"] * len(texts)
+
+    async def translate_async(self, texts: List[str]) -> List[str]:
+        if not TRANSLATION_AVAILABLE:
+            return ["[TRANSLATION_NOT_AVAILABLE]"] * len(texts)
+        if "GOOGLE_API_KEY" not in os.environ:
+            return ["[NO_API_KEY]"] * len(texts)
+
+        results = [None] * len(texts)
+
+        async def run(indices):
+            translated = await self._send([texts[i] for i in indices])
+            missing = []
+            for i, text in zip(indices, translated):
+                results[i] = text
+                if text is None:
+                    missing.append(i)
+            if len(indices) > 1 and missing:
+                # The model dropped some ids: ask for those paragraphs one by one
+                self.stats["retried"] += len(missing)
+                await asyncio.gather(*(run([i]) for i in missing))
+
+        await asyncio.gather(*(run(batch) for batch in pack_batches(texts, self.token_budget)))
+        self.stats["paragraphs"] += len(texts)
+        return [text if text is not None else "[PARSE_ERROR]" for text in results]
+
+    def translate(self, texts: List[str]) -> List[str]:
+        """Blocking entry point for threads that are not running an event loop."""
+        if not texts:
+            return []
+        return asyncio.run(self.translate_async(texts))
+
+
+_translator = None
+_translator_lock = threading.Lock()
+
+
+def get_batch_translator() -> BatchTranslator:
+    """The process-wide translator, so concurrent stages share its rate limit."""
+    global _translator
+    with _translator_lock:
+        if _translator is None:
+            _translator = BatchTranslator()
+        return _translator
+
+
+def translate_paragraphs(texts: List[str]) -> List[str]:
+    """
+    Translate a list of Armenian paragraphs with batched, concurrent requests.
+    Paragraphs already in the translation cache (or repeated in `texts`) are not sent.
+    """
+    if not TRANSLATION_AVAILABLE or "GOOGLE_API_KEY" not in os.environ:
+        return get_batch_translator().translate(texts)
+
+    cache = get_translation_cache()
+    keys = [cache_key(text, CACHE_VERSION) for text in texts]
+    known = cache.get_many(keys)
+
+    to_send = {}  # key -> text, first occurrence of each uncached paragraph
+    for key, text in zip(keys, texts):
+        if key not in known:
+            to_send.setdefault(key, text)
+    if to_send:
+        translated = get_batch_translator().translate(list(to_send.values()))
+        fresh = dict(zip(to_send, translated))
+        # Placeholders ([API_ERROR], [PARSE_ERROR], ...) are returned but never cached
+        cache.put_many((key, text) for key, text in fresh.items() if not is_placeholder(text))
+        known.update(fresh)
+    return [known[key] for key in keys]
+
+
+def translate_folder(input_dir: Path, output_dir: Path, min_length: int = 200, pages_per_chunk: int = 20):
     if not TRANSLATION_AVAILABLE:
         print("Translation dependencies not available")
         return
 
     output_dir.mkdir(parents=True, exist_ok=True)
 
+    pending = []
     for json_file in sorted(input_dir.glob("page_*.json")):
         page_id = json_file.stem  # e.g. "page_0"
-        output_file = output_dir / f"{page_id}.json"
-
-        if output_file.exists():
+        if (output_dir / f"{page_id}.json").exists():
             print(f"✅ Skipping {page_id} — already translated.")
             continue
+        pending.append(json_file)
 
-        with json_file.open(encoding="utf-8") as f:
-            data = json.load(f)
+    # Paragraphs of several pages share requests; pages are written per chunk so
+    # an interruption only loses the chunk in flight.
+    for start in range(0, len(pending), pages_per_chunk):
+        pages = []
+        for json_file in pending[start:start + pages_per_chunk]:
+            with json_file.open(encoding="utf-8") as f:
+                data = json.load(f)
+            paras = [para for para in data["paragraphs"] if para["length"] >= min_length]
+            pages.append((json_file.stem, data, paras))
 
-        translated = {"metadata": data["metadata"], "paragraphs": []}
+        texts = [para["text"] for _, _, paras in pages for para in paras]
+        print(f"Translating {len(texts)} paragraphs from {len(pages)} pages")
+        translations = iter(translate_paragraphs(texts))
 
-        for para in data["paragraphs"]:
-            if para["length"] >= min_length:
-                print(f"Translating paragraph {para['bbox']} on {page_id}")
-                fr_text = translate_paragraph(para["text"])
+        for page_id, data, paras in pages:
+            translated = {"metadata": data["metadata"], "paragraphs": []}
+            for para in paras:
                 translated["paragraphs"].append(
                     {
                         "bbox": para["bbox"],
                         "original": para["text"],
-                        "translated": fr_text,
+                        "translated": next(translations),
                     }
                 )
 
-        with output_file.open("w", encoding="utf-8") as f:
-            json.dump(translated, f, ensure_ascii=False, indent=2)
+            with (output_dir / f"{page_id}.json").open("w", encoding="utf-8") as f:
+                json.dump(translated, f, ensure_ascii=False, indent=2)
+
+    if pending:
+        print(f"Translation cache: {get_translation_cache().summary()}")
@@ -0,0 +1,121 @@
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+import unicodedata
+from pathlib import Path
+
+CACHE_PATH = Path(os.environ.get("HARATCH_TRANSLATION_CACHE", "data/translation_cache.sqlite"))
+CACHE_MAX_MB = float(os.environ.get("HARATCH_TRANSLATION_CACHE_MB", "256"))
+
+
+def normalize_text(text: str) -> str:
+    """NFC + collapsed whitespace, so OCR spacing differences map to one entry."""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def cache_key(text: str, version: str) -> str:
+    return hashlib.sha256(f"{version}\0{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+
+class TranslationCache:
+    """
+    Persistent translation cache in a local SQLite file, keyed by a hash of the
+    normalized Armenian text and the model/prompt version. Least recently used
+    entries are evicted once the stored translations exceed `max_mb`.
+    """
+
+    def __init__(self, path: Path = CACHE_PATH, max_mb: float = CACHE_MAX_MB):
+        self.path = Path(path)
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS translations ("
+            "key TEXT PRIMARY KEY, translation TEXT NOT NULL, size INTEGER NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS translations_last_used ON translations (last_used)")
+        self._conn.commit()
+        self._size = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM translations").fetchone()[0]
+
+    def get_many(self, keys):
+        """{key: translation} for the keys that are cached; counts hits and misses."""
+        keys = list(dict.fromkeys(keys))
+        found = {}
+        with self._lock:
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT key, translation FROM translations WHERE key IN ({','.join('?' * len(chunk))})",
+                    chunk,
+                ).fetchall()
+                found.update(rows)
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE translations SET last_used = ? WHERE key = ?", [(now, key) for key in found]
+                )
+                self._conn.commit()
+            self.stats["hits"] += len(found)
+            self.stats["misses"] += len(keys) - len(found)
+        return found
+
+    def put_many(self, items):
+        """Store (key, translation) pairs, then evict down to the size bound."""
+        now = time.time()
+        rows = [(key, text, len(text.encode("utf-8")), now) for key, text in items]
+        if not rows:
+            return
+        with self._lock:
+            for key, _, _, _ in rows:
+                old = self._conn.execute("SELECT size FROM translations WHERE key = ?", (key,)).fetchone()
+                if old:
+                    self._size -= old[0]
+            self._conn.executemany("INSERT OR REPLACE INTO translations VALUES (?, ?, ?, ?)", rows)
+            self._size += sum(row[2] for row in rows)
+            self.stats["stores"] += len(rows)
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        if self._size <= self.max_bytes:
+            return
+        victims = []
+        for key, size in self._conn.execute("SELECT key, size FROM translations ORDER BY last_used"):
+            if self._size <= self.max_bytes:
+                break
+            victims.append((key,))
+            self._size -= size
+        self._conn.executemany("DELETE FROM translations WHERE key = ?", victims)
+        self.stats["evictions"] += len(victims)
+
+    def summary(self) -> dict:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+            lookups = self.stats["hits"] + self.stats["misses"]
+            return {
+                **self.stats,
+                "hit_rate": round(self.stats["hits"] / lookups, 4) if lookups else 0.0,
+                "entries": entries,
+                "size_mb": round(self._size / (1024 * 1024), 3),
+            }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_translation_cache() -> TranslationCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = TranslationCache()
+        return _cache
@@ -0,0 +1,197 @@
+import json
+import threading
+from pathlib import Path
+from queue import Queue, Full
+from typing import Any, Dict
+
+from .paths import get_issue_id, get_ocr_dir, get_output_dir
+from .results import write_page_json
+from .translate import translate_paragraphs, is_placeholder
+from .sync_gcs import notify_written
+from .cleanup import get_disk_budget
+
+PAGES_PER_BATCH = 8  # Pages whose paragraphs share translation requests
+QUEUE_SIZE = 32
+
+# Stages finishing in the background; joined by wait_for_translations() at shutdown
+_finishing = []
+_finishing_lock = threading.Lock()
+
+
+def get_translation_dir(output_dir: Path) -> Path:
+    """Per-page translations (and the resume checkpoint) live under data/output/<issue>/translations."""
+    return output_dir / "translations"
+
+
+def translate_pages(pages, min_length: int = 200):
+    """
+    Translate several pages at once: all their paragraphs of at least `min_length`
+    characters go through one batched translate_paragraphs call. Returns one
+    ({"metadata", "paragraphs": [{bbox, original, translated}]}, failed) pair per page,
+    `failed` counting the paragraphs that were eligible but got no translation.
+    """
+    long_paras = [
+        para for page in pages for para in page["paragraphs"] if len(para["hye"]) >= min_length
+    ]
+    translations = dict(zip(map(id, long_paras), translate_paragraphs([p["hye"] for p in long_paras])))
+
+    results = []
+    for page in pages:
+        translated = {"metadata": page["metadata"], "paragraphs": []}
+        failed = 0
+        for para in page["paragraphs"]:
+            fr_text = None
+            if id(para) in translations:
+                fr_text = translations[id(para)]
+                # Placeholders (no API key, errors) stay untranslated, short paragraphs on purpose
+                if is_placeholder(fr_text):
+                    fr_text = None
+                    failed += 1
+            translated["paragraphs"].append(
+                {"bbox": para["bbox"], "original": para["hye"], "translated": fr_text}
+            )
+        results.append((translated, failed))
+    return results
+
+
+class TranslationStage:
+    """
+    Translation as its own pipeline stage: OCR hands finished pages over with
+    offer(), which never blocks (pages that do not fit in the bounded queue are
+    deferred and picked up by finish()). A worker thread translates them in
+    multi-page batches and writes one JSON per page to data/output/<issue>/translations,
+    which doubles as the checkpoint: pages already there are never translated again.
+    """
+
+    def __init__(self, issue_id: str, ocr_dir: Path, output_dir: Path, min_length: int = 200, queue_size: int = QUEUE_SIZE):
+        self.issue_id = issue_id
+        self.ocr_dir = ocr_dir
+        self.translation_dir = get_translation_dir(output_dir)
+        self.min_length = min_length
+        self.stats = {"translated": 0, "skipped": 0, "deferred": 0, "failed": 0}
+        self._queue = Queue(maxsize=queue_size)
+        self._deferred = []
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name=f"translate-{issue_id}", daemon=True)
+
+    def start(self):
+        self.translation_dir.mkdir(parents=True, exist_ok=True)
+        self._thread.start()
+        return self
+
+    def is_translated(self, page_stem: str) -> bool:
+        return (self.translation_dir / f"{page_stem}.json").exists()
+
+    def offer(self, page_stem: str, json_data: Dict[str, Any]):
+        """Hand a page over without blocking the caller."""
+        try:
+            self._queue.put_nowait((page_stem, json_data))
+        except Full:
+            with self._lock:
+                self._deferred.append(page_stem)
+                self.stats["deferred"] += 1
+
+    def finish(self, page_count: int = None):
+        """
+        Queue deferred pages and, with page_count, every OCR'd page that still has
+        no translation (e.g. local cache hits), then wait for the worker to drain.
+        """
+        with self._lock:
+            pending, self._deferred = self._deferred, []
+        if page_count is not None:
+            pending += [f"page_{i}" for i in range(page_count)]
+        for page_stem in dict.fromkeys(pending):
+            page_json = self.ocr_dir / f"{page_stem}.json"
+            if self.is_translated(page_stem) or not page_json.exists():
+                continue
+            with page_json.open("r", encoding="utf-8") as f:
+                self._queue.put((page_stem, json.load(f)))
+        self._queue.put(None)
+        self._thread.join()
+        print(f"[TRANSLATE] {self.issue_id}: {self.stats}")
+        return self.stats
+
+    def finish_in_background(self, page_count: int = None) -> threading.Thread:
+        """finish() on its own thread, so the caller can move on; wait_for_translations() joins it."""
+        thread = threading.Thread(
+            target=self.finish, args=(page_count,), name=f"translate-finish-{self.issue_id}", daemon=True
+        )
+        with _finishing_lock:
+            _finishing[:] = [t for t in _finishing if t.is_alive()]
+            _finishing.append(thread)
+        thread.start()
+        return thread
+
+    def _next_batch(self):
+        item = self._queue.get()
+        if item is None:
+            return [], True
+        batch = [item]
+        while len(batch) < PAGES_PER_BATCH and not self._queue.empty():
+            item = self._queue.get()
+            if item is None:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run(self):
+        finished = False
+        while not finished:
+            batch, finished = self._next_batch()
+            batch = list(dict(batch).items())  # A page offered twice is translated once
+            todo = [(stem, data) for stem, data in batch if not self.is_translated(stem)]
+            self.stats["skipped"] += len(batch) - len(todo)
+            if not todo:
+                continue
+            try:
+                translated = translate_pages([data for _, data in todo], self.min_length)
+            except Exception as e:
+                # Left without a checkpoint, so the next run or a backfill retries them
+                print(f"[ERROR] Translation of {len(todo)} pages of {self.issue_id} failed: {e}")
+                self.stats["failed"] += len(todo)
+                continue
+            for (page_stem, _), (page, failed) in zip(todo, translated):
+                if failed:
+                    # No checkpoint: the next run or a backfill retries the whole page
+                    self.stats["failed"] += 1
+                    continue
+                output_path = self.translation_dir / f"{page_stem}.json"
+                try:
+                    write_page_json(page, output_path)
+                except Exception as e:
+                    print(f"[ERROR] Failed to write translation of {page_stem} of {self.issue_id}: {e}")
+                    self.stats["failed"] += 1
+                    continue
+                get_disk_budget().record_write(output_path)
+                notify_written(output_path)
+                self.stats["translated"] += 1
+
+
+def wait_for_translations():
+    """Block until every stage handed to finish_in_background() has written its pages."""
+    with _finishing_lock:
+        threads, _finishing[:] = list(_finishing), []
+    for thread in threads:
+        thread.join()
+
+
+def backfill_translations(year: int, month: int, min_length: int = 200):
+    """
+    Translate an already OCR'd issue outside the OCR pipeline. Page JSONs missing
+    locally are fetched from GCS first; pages translated before are skipped.
+    """
+    from .gcs import get_gcs_client, BUCKET_NAME, build_issue_manifest, download_cached_pages
+
+    issue_id = get_issue_id(year, month)
+    ocr_dir = get_ocr_dir(year, month)
+    try:
+        download_cached_pages(build_issue_manifest(get_gcs_client().bucket(BUCKET_NAME), issue_id), ocr_dir)
+    except Exception as e:
+        print(f"[WARNING] Could not fetch OCR results of {issue_id} from GCS, using local files: {e}")
+
+    pages = [int(p.stem.rsplit("_", 1)[1]) for p in ocr_dir.glob("page_*.json")]
+    if not pages:
+        print(f"[TRANSLATE] No OCR results for {issue_id}, nothing to translate.")
+        return {}
+    stage = TranslationStage(issue_id, ocr_dir, get_output_dir(year, month), min_length=min_length).start()
+    return stage.finish(page_count=max(pages) + 1)
@@ -0,0 +1,277 @@
+"""
+Shared work queue for running the archive on several processes or machines.
+Everything lives in the storage backend (GCS, or the local stand-in) under queue/:
+  queue/plan.json            ordered issues to process (broken ones first), written once
+  queue/leases/<issue>.json  who holds an issue and until when; renewed by a heartbeat
+  queue/done/<issue>.json    finished issues
+  queue/failed/<issue>.json  issues given up after MAX_ATTEMPTS claims
+Leases are taken and renewed with if_generation_match preconditions, so two workers
+never hold the same issue, and a lease whose holder stopped heartbeating expires
+and is claimed again by someone else. A finished or failed issue keeps its lease,
+overwritten (still conditionally) with a terminal "state", so a worker whose listing
+of the markers is stale cannot take it again.
+"""
+import os
+import json
+import time
+import socket
+import threading
+from datetime import datetime
+
+from google.api_core.exceptions import PreconditionFailed, NotFound
+
+QUEUE_PREFIX = "queue"
+LEASE_SECONDS = int(os.environ.get("HARATCH_LEASE_SECONDS", 600))
+MAX_ATTEMPTS = 3  # Claims of one issue before it is marked failed
+TERMINAL_STATES = ("done", "failed")
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class Lease:
+    """An issue held by this worker; a heartbeat thread keeps it alive until released."""
+
+    def __init__(self, queue, issue_id: str, generation: int, attempts: int):
+        self.queue = queue
+        self.issue_id = issue_id
+        self.generation = generation
+        self.attempts = attempts
+        self.lost = False
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._heartbeat, name=f"lease-{issue_id}", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _write(self, expires: float) -> bool:
+        """Rewrite the lease if it is still ours; False once someone else took it over."""
+        with self._lock:
+            if self.lost:
+                return False
+            blob = self.queue.bucket.blob(self.queue.lease_name(self.issue_id))
+            try:
+                blob.upload_from_string(
+                    json.dumps(self.queue.lease_record(self.issue_id, expires, self.attempts)),
+                    content_type="application/json",
+                    if_generation_match=self.generation,
+                )
+            except PreconditionFailed:
+                self.lost = True
+                print(f"[QUEUE] Lost the lease on {self.issue_id}")
+                return False
+            self.generation = blob.generation
+            return True
+
+    def _heartbeat(self):
+        interval = self.queue.lease_seconds / 3
+        while not self._stop.wait(interval):
+            try:
+                if not self._write(time.time() + self.queue.lease_seconds):
+                    return
+            except Exception as e:
+                # Transient errors are retried at the next beat, well before expiry
+                print(f"[WARNING] Heartbeat for {self.issue_id} failed: {e}")
+
+    def _stop_heartbeat(self):
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+
+    def complete(self) -> bool:
+        """
+        Mark the issue done: the lease becomes a terminal record, then the done marker
+        is written. False (and nothing written) if the lease was lost in the meantime.
+        """
+        self._stop_heartbeat()
+        record = {
+            "issue": self.issue_id,
+            "worker": self.queue.worker_id,
+            "state": "done",
+            "finished": datetime.now().isoformat(),
+            "attempts": self.attempts,
+        }
+        with self._lock:
+            if self.lost:
+                return False
+            blob = self.queue.bucket.blob(self.queue.lease_name(self.issue_id))
+            try:
+                blob.upload_from_string(json.dumps(record), content_type="application/json", if_generation_match=self.generation)
+            except PreconditionFailed:
+                self.lost = True
+                print(f"[QUEUE] Lost the lease on {self.issue_id} before completing it")
+                return False
+            self.generation = blob.generation
+        self.queue.write_marker("done", self.issue_id, record)
+        return True
+
+    def release(self):
+        """Give the issue back after a failure: the lease expires now, attempts are kept."""
+        self._stop_heartbeat()
+        self._write(0)
+
+
+class WorkQueue:
+    def __init__(self, bucket, worker_id: str = None, lease_seconds: int = LEASE_SECONDS):
+        self.bucket = bucket
+        self.worker_id = worker_id or default_worker_id()
+        self.lease_seconds = lease_seconds
+        self._plan = None
+
+    @staticmethod
+    def plan_name() -> str:
+        return f"{QUEUE_PREFIX}/plan.json"
+
+    @staticmethod
+    def lease_name(issue_id: str) -> str:
+        return f"{QUEUE_PREFIX}/leases/{issue_id}.json"
+
+    @staticmethod
+    def marker_name(kind: str, issue_id: str) -> str:
+        return f"{QUEUE_PREFIX}/{kind}/{issue_id}.json"
+
+    def lease_record(self, issue_id: str, expires: float, attempts: int) -> dict:
+        return {
+            "issue": issue_id,
+            "worker": self.worker_id,
+            "expires": expires,
+            "heartbeat": datetime.now().isoformat(),
+            "attempts": attempts,
+        }
+
+    def seed(self, tasks, replace: bool = False) -> bool:
+        """
+        Publish the plan: (issue_id, is_priority) pairs in processing order.
+        Without `replace` only the first seeder wins, so every worker may call it.
+        """
+        plan = {
+            "created": datetime.now().isoformat(),
+            "issues": [{"issue": issue_id, "priority": priority} for issue_id, priority in tasks],
+        }
+        try:
+            self.bucket.blob(self.plan_name()).upload_from_string(
+                json.dumps(plan), content_type="application/json", if_generation_match=None if replace else 0
+            )
+        except PreconditionFailed:
+            return False
+        if replace:
+            # Planned issues are incomplete by construction; markers from an earlier plan would hide them
+            planned = {item["issue"] for item in plan["issues"]}
+            for kind in TERMINAL_STATES:
+                for issue_id in self._issues_under(kind) & planned:
+                    self.bucket.blob(self.marker_name(kind, issue_id)).delete()
+            for issue_id, blob in self._leases().items():
+                if issue_id not in planned:
+                    continue
+                try:
+                    if json.loads(blob.download_as_text()).get("state") in TERMINAL_STATES:
+                        blob.delete(if_generation_match=blob.generation)
+                except (PreconditionFailed, NotFound, FileNotFoundError, ValueError):
+                    continue
+        self._plan = None
+        print(f"[QUEUE] Seeded {len(plan['issues'])} issues.")
+        return True
+
+    def plan(self) -> list:
+        if self._plan is None:
+            try:
+                data = json.loads(self.bucket.blob(self.plan_name()).download_as_text())
+            except (NotFound, FileNotFoundError):
+                return []
+            self._plan = [item["issue"] for item in data["issues"]]
+        return self._plan
+
+    def write_marker(self, kind: str, issue_id: str, record: dict):
+        self.bucket.blob(self.marker_name(kind, issue_id)).upload_from_string(
+            json.dumps(record), content_type="application/json"
+        )
+
+    def _issues_under(self, kind: str) -> set:
+        prefix = f"{QUEUE_PREFIX}/{kind}/"
+        return {blob.name[len(prefix):-len(".json")] for blob in self.bucket.list_blobs(prefix=prefix)}
+
+    def _leases(self) -> dict:
+        prefix = f"{QUEUE_PREFIX}/leases/"
+        return {blob.name[len(prefix):-len(".json")]: blob for blob in self.bucket.list_blobs(prefix=prefix)}
+
+    def _mark_failed(self, issue_id: str, lease: dict, generation: int):
+        record = {
+            "issue": issue_id,
+            "state": "failed",
+            "attempts": lease.get("attempts", 0),
+            "last_worker": lease.get("worker"),
+        }
+        try:
+            self.bucket.blob(self.lease_name(issue_id)).upload_from_string(
+                json.dumps(record), content_type="application/json", if_generation_match=generation
+            )
+        except PreconditionFailed:
+            return  # Changed under us: someone else decided first
+        self.write_marker("failed", issue_id, record)
+        print(f"[QUEUE] Giving up on {issue_id} after {record['attempts']} attempts")
+
+    def claim(self):
+        """Lease the first issue in plan order that is neither finished nor held; None if there is none."""
+        finished = self._issues_under("done") | self._issues_under("failed")
+        leases = self._leases()
+        now = time.time()
+        for issue_id in self.plan():
+            if issue_id in finished:
+                continue
+            blob = leases.get(issue_id)
+            generation, attempts = 0, 0
+            if blob is not None:
+                try:
+                    lease = json.loads(blob.download_as_text())
+                except (NotFound, FileNotFoundError, ValueError):
+                    continue  # Changing under us: someone else is on it
+                if lease.get("state") in TERMINAL_STATES:
+                    # Finished, and the marker was missing from our listing or never written
+                    # (its writer stopped in between): write it so the queue can drain
+                    self.write_marker(lease["state"], issue_id, lease)
+                    continue
+                if lease.get("expires", 0) > now:
+                    continue
+                generation, attempts = blob.generation, lease.get("attempts", 0)
+                if attempts >= MAX_ATTEMPTS:
+                    self._mark_failed(issue_id, lease, generation)
+                    continue
+                if lease.get("expires", 0) > 0:
+                    print(f"[QUEUE] Reclaiming {issue_id} from {lease.get('worker')} (lease expired)")
+            target = self.bucket.blob(self.lease_name(issue_id))
+            try:
+                target.upload_from_string(
+                    json.dumps(self.lease_record(issue_id, now + self.lease_seconds, attempts + 1)),
+                    content_type="application/json",
+                    if_generation_match=generation,
+                )
+            except PreconditionFailed:
+                continue  # Another worker claimed it first
+            return Lease(self, issue_id, target.generation, attempts + 1).start()
+        return None
+
+    def is_drained(self) -> bool:
+        """True when every planned issue is done or failed (not merely leased)."""
+        finished = self._issues_under("done") | self._issues_under("failed")
+        return all(issue_id in finished for issue_id in self.plan())
+
+    def summary(self) -> dict:
+        plan = self.plan()
+        done, failed = self._issues_under("done"), self._issues_under("failed")
+        now = time.time()
+        leased = 0
+        for issue_id, blob in self._leases().items():
+            try:
+                if json.loads(blob.download_as_text()).get("expires", 0) > now:
+                    leased += 1
+            except (NotFound, FileNotFoundError, ValueError):
+                continue
+        return {
+            "planned": len(plan),
+            "done": len(done & set(plan)),
+            "failed": len(failed & set(plan)),
+            "leased": leased,
+        }
@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+from src.ocr import enhance_and_binarize, prepare_page, binarize_region
+
+WIDTH, HEIGHT = 640, 480
+
+
+@pytest.fixture(scope="module")
+def page():
+    """Synthetic scan: paper gradient, dark text-like strokes and noise, in RGB like the renderers produce."""
+    rng = np.random.default_rng(0)
+    y, x = np.mgrid[0:HEIGHT, 0:WIDTH]
+    gray = 150 + 80 * x / WIDTH + 20 * np.sin(y / 7.0)
+    gray[(y % 24 < 4) & (x % 50 < 35)] = 30  # "lines of text"
+    gray[300:420, 40:260] = 60  # dark photo block
+    gray += rng.normal(0, 25, gray.shape)
+    gray = np.clip(gray, 0, 255).astype(np.uint8)
+    rgb = np.stack([gray, np.roll(gray, 1, axis=1), np.roll(gray, 2, axis=0)], axis=-1)
+    return Image.fromarray(rgb, mode="RGB")
+
+
+@pytest.mark.parametrize(
+    "bbox",
+    [
+        (10, 10, 200, 100),  # inside the page
+        (300, 300, 420, 440),  # over the dark block
+        (0, 0, WIDTH, HEIGHT),  # whole page
+        (500, 400, WIDTH, HEIGHT),  # touching the right and bottom edges
+        (0, 0, 1, 1),  # single pixel
+        (12.7, 33.2, 140.9, 71.5),  # float coordinates, as the detector returns them
+        (-15, 20, 80, 90),  # past the left edge
+        (600, 450, WIDTH + 40, HEIGHT + 25),  # past the right and bottom edges
+        (-10, -10, WIDTH + 10, HEIGHT + 10),  # around the whole page
+    ],
+)
+def test_binarize_region_matches_enhance_and_binarize(page, bbox):
+    gray = prepare_page(page)
+    box = tuple(int(v) for v in bbox)
+    expected = enhance_and_binarize(page.crop(box))
+    actual = binarize_region(gray, bbox)
+    assert actual.mode == expected.mode
+    assert actual.size == expected.size
+    assert actual.tobytes() == expected.tobytes()
+
+
+@pytest.mark.parametrize("mean", range(256))
+def test_binarize_region_every_gray_level(mean):
+    """Every gray level under a crop mean of `mean`: one row 0..255, the rest filled so the mean rounds to it."""
+    gray = np.full((300, 256), mean, dtype=np.uint8)
+    gray[0] = np.arange(256, dtype=np.uint8)
+    page = Image.fromarray(gray, mode="L")
+    expected = enhance_and_binarize(page)
+    actual = binarize_region(prepare_page(page), (0, 0, 256, 300))
+    assert actual.tobytes() == expected.tobytes()
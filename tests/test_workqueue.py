@@ -0,0 +1,98 @@
+import json
+import multiprocessing
+
+import pytest
+
+from src.local_storage import LocalClient
+from src.workqueue import WorkQueue
+
+ISSUES = [f"1950_{month:02d}_{day:02d}" for month in range(1, 5) for day in range(1, 7)]
+
+
+def make_queue(root, worker_id: str, lease_seconds: int = 600) -> WorkQueue:
+    return WorkQueue(LocalClient(root).create_bucket("archive"), worker_id=worker_id, lease_seconds=lease_seconds)
+
+
+def drain(root, worker_id: str, claims_path):
+    """Claim and complete issues until none are left, appending each claim to claims_path."""
+    queue = make_queue(root, worker_id)
+    while True:
+        lease = queue.claim()
+        if lease is None:
+            return
+        with open(claims_path, "a") as f:
+            f.write(f"{worker_id} {lease.issue_id}\n")
+        assert lease.complete()
+
+
+@pytest.fixture
+def root(tmp_path):
+    make_queue(tmp_path, "seeder").seed([(issue_id, False) for issue_id in ISSUES])
+    return tmp_path
+
+
+def test_completed_issue_is_not_claimed_with_stale_done_listing(root, monkeypatch):
+    first = make_queue(root, "a")
+    lease = first.claim()
+    assert lease.complete()
+
+    # A second worker that listed done/ before the marker was written
+    second = make_queue(root, "b")
+    listed = second._issues_under
+    monkeypatch.setattr(second, "_issues_under", lambda kind: set() if kind == "done" else listed(kind))
+    other = second.claim()
+    assert other.issue_id != lease.issue_id
+    other.release()
+
+
+def test_missing_done_marker_is_repaired_from_the_lease(root):
+    queue = make_queue(root, "a")
+    lease = queue.claim()
+    assert lease.complete()
+    queue.bucket.blob(queue.marker_name("done", lease.issue_id)).delete()
+
+    other = queue.claim()
+    assert other.issue_id != lease.issue_id
+    assert json.loads(queue.bucket.blob(queue.marker_name("done", lease.issue_id)).download_as_text())["state"] == "done"
+    other.release()
+
+
+def test_lost_lease_does_not_complete(root):
+    holder = make_queue(root, "a")
+    lease = holder.claim()
+    lease._stop_heartbeat()
+    # The holder stalled past its lease
+    expired = holder.lease_record(lease.issue_id, 0, lease.attempts)
+    holder.bucket.blob(holder.lease_name(lease.issue_id)).upload_from_string(json.dumps(expired))
+    taker = make_queue(root, "b").claim()
+    assert taker.issue_id == lease.issue_id
+
+    assert not lease.complete()
+    assert lease.lost
+    assert not holder.bucket.blob(holder.marker_name("done", lease.issue_id)).exists()
+    assert taker.complete()
+
+
+def test_reseed_makes_finished_issues_claimable(root):
+    queue = make_queue(root, "a")
+    lease = queue.claim()
+    assert lease.complete()
+    queue.seed([(lease.issue_id, True)], replace=True)
+    again = queue.claim()
+    assert again.issue_id == lease.issue_id
+    assert again.complete()
+
+
+def test_processes_claim_each_issue_once(root):
+    claims_path = root / "claims.txt"
+    context = multiprocessing.get_context("spawn")
+    workers = [context.Process(target=drain, args=(root, f"w{i}", claims_path)) for i in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(timeout=120)
+        assert worker.exitcode == 0
+
+    claimed = [line.split()[1] for line in claims_path.read_text().splitlines()]
+    assert sorted(claimed) == sorted(ISSUES)
+    assert make_queue(root, "check").summary() == {"planned": len(ISSUES), "done": len(ISSUES), "failed": 0, "leased": 0}